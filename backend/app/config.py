@@ -8,6 +8,132 @@ class Settings(BaseSettings):
     GITHUB_CLIENT_ID: str = ""
     GITHUB_CLIENT_SECRET: str = ""
     GITHUB_REDIRECT_URI: str = "http://localhost:8000/oauth/callback"
+
+    # Tokens are only ever stored as salted hashes. Set this when running multiple workers.
+    TOKEN_HASH_SALT: str = ""
+
+    # Where per-user session state (selected repo, deployment settings) lives:
+    # "memory" for a single worker, "sqlite" to share it between uvicorn workers on one host
+    SESSION_STORE: str = "memory"
+    SESSION_DB_PATH: str = "data/sessions.db"
+    SESSION_TTL: int = 86400
+    SESSION_MAX_ENTRIES: int = 10000
+
+    # Validated identity (GET /user) cache
+    IDENTITY_CACHE_TTL: int = 300
+    IDENTITY_NEGATIVE_TTL: int = 30
+    IDENTITY_CACHE_SIZE: int = 10000
+
+    GITHUB_TIMEOUT: float = 30.0
+    GITHUB_MAX_CONNECTIONS: int = 100
+    GITHUB_COMMIT_RETRIES: int = 2  # rebuilds of a multi-file commit when the branch moved underneath us
+
+    # Repo listing: pages are fetched concurrently, the merged list is cached per token
+    GITHUB_MAX_REPO_PAGES: int = 100
+    GITHUB_PAGE_CONCURRENCY: int = 8
+    REPO_LIST_CACHE_TTL: int = 300
+    REPO_LIST_CACHE_SIZE: int = 256
+
+    # Cache of repo contents/analysis. Raise the TTL (e.g. 86400) once the GitHub webhook is set up,
+    # pushes then invalidate exactly what changed.
+    REPO_CACHE_TTL: int = 60
+    REPO_CACHE_MAX_ENTRIES: int = 50000
+    GITHUB_WEBHOOK_SECRET: str = ""
+
+    # Rendered CI workflows kept in memory (keyed by steps + stack)
+    WORKFLOW_CACHE_SIZE: int = 1024
+
+    # Pooled client for non-GitHub upstreams (metrics endpoints) and the metrics proxy
+    UPSTREAM_TIMEOUT: float = 30.0
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    METRICS_PROXY_MAX_BYTES: int = 50 * 1024 * 1024
+    METRICS_PROXY_CHUNK_SIZE: int = 64 * 1024
+    # Scrape/proxy hosts get their own label in /metrics up to this many, the rest count as "other"
+    UPSTREAM_METRIC_MAX_HOSTS: int = 50
+
+    # Push ingestion (/ingest): batches are acknowledged with 202 and decoded in the background.
+    # Once INGEST_MAX_PENDING_BYTES are waiting to be decoded, pushes get 429 + Retry-After.
+    INGEST_TOKEN: str = ""  # when set, pushes need "Authorization: Bearer <token>"
+    INGEST_MAX_BATCH_BYTES: int = 16 * 1024 * 1024
+    INGEST_MAX_PENDING_BYTES: int = 64 * 1024 * 1024
+    INGEST_BATCH_HISTORY: int = 1000
+    SAMPLE_STORE_MAX_SERIES: int = 200000
+    SAMPLE_STORE_POINTS_PER_SERIES: int = 360
+    SAMPLE_STORE_SERIES_TTL: int = 3600  # series nobody pushed to for this long are dropped (finished jobs)
+
+    # Scrape targets: circuit breaker, adaptive timeouts (p99 x multiplier, clamped) and hedged requests
+    SCRAPE_TIMEOUT: float = 10.0             # also the ceiling for adaptive timeouts
+    SCRAPE_TIMEOUT_MIN: float = 1.0
+    SCRAPE_TIMEOUT_MULTIPLIER: float = 3.0
+    SCRAPE_MIN_LATENCY_SAMPLES: int = 5      # scrapes before timeouts adapt / hedging kicks in
+    SCRAPE_LATENCY_WINDOW: int = 100
+    SCRAPE_BREAKER_FAILURES: int = 3
+    SCRAPE_BREAKER_COOLDOWN: float = 30.0
+    SCRAPE_BREAKER_MAX_COOLDOWN: float = 300.0
+    SCRAPE_HEDGE_ENABLED: bool = False       # per request with ?hedge=true otherwise
+    SCRAPE_HEDGE_QUANTILE: float = 0.9
+    SCRAPE_HEDGE_MIN_DELAY: float = 0.05
+    SCRAPE_MAX_TARGETS: int = 10000
+
+    # Live agent signals (/stream): one evaluation per target every STREAM_INTERVAL seconds, shared by its subscribers
+    STREAM_INTERVAL: float = 15.0
+    STREAM_HEARTBEAT: float = 15.0
+    STREAM_MAX_PENDING: int = 100           # queued messages per client before the oldest are dropped
+    STREAM_MAX_TARGETS_PER_CLIENT: int = 20
+
+    # Cursors handed out by the telemetry/agent endpoints (?since=): results kept per endpoint + target.
+    # Every client polling a target adds versions, so they're kept by age; DELTA_VERSIONS only caps memory
+    # (more than that many changed results within DELTA_RETENTION_SECONDS still expire older cursors)
+    DELTA_RETENTION_SECONDS: float = 120.0
+    DELTA_VERSIONS: int = 64
+    DELTA_MAX_STREAMS: int = 64
+
+    # Expositions this big are parsed in a process pool, in shards of about PARSE_POOL_SHARD_BYTES
+    PARSE_POOL_ENABLED: bool = True
+    PARSE_POOL_THRESHOLD_BYTES: int = 2 * 1024 * 1024
+    PARSE_POOL_SHARD_BYTES: int = 1024 * 1024
+    PARSE_POOL_WORKERS: int = 0  # 0 = one per CPU (at least 2)
+
+    # Logs: pushed to /logs/ingest or tailed from LOG_TAIL_PATHS (comma separated files)
+    LOG_TAIL_PATHS: str = ""
+    LOG_TAIL_INTERVAL: float = 1.0
+    LOG_INGEST_MAX_BYTES: int = 16 * 1024 * 1024
+    LOG_CHUNK_MAX_LINES: int = 2000
+    LOG_CHUNK_MAX_AGE: int = 60       # seconds before a partly filled chunk is sealed anyway
+    LOG_MAX_CHUNKS: int = 5000
+    LOG_RATE_HISTORY_MINUTES: int = 1440
+    # Error-rate spike: the last LOG_SPIKE_WINDOW seconds against the LOG_SPIKE_BASELINE seconds before
+    LOG_SPIKE_WINDOW: int = 300
+    LOG_SPIKE_BASELINE: int = 3600
+    LOG_SPIKE_MIN_ERRORS: int = 5
+    LOG_SPIKE_MIN_RATE: float = 0.05
+    LOG_SPIKE_FACTOR: float = 2.0
+
+    # Repo public keys used to encrypt Actions secrets are cached this long (seconds)
+    SECRETS_PUBLIC_KEY_TTL: int = 3600
+
+    # Bulk rollouts
+    BULK_ROLLOUT_CONCURRENCY: int = 8
+    BULK_MAX_REPOS: int = 1000
+    BULK_MAX_JOBS: int = 100
+    BULK_HEARTBEAT_SECONDS: int = 15     # running jobs re-save their state this often
+    BULK_STALE_AFTER_SECONDS: int = 120  # a running job not saved for this long lost its worker
+
+    # Org-wide stack inventory (/inventory)
+    INVENTORY_CONCURRENCY: int = 8
+    INVENTORY_MAX_REPOS: int = 5000
+    INVENTORY_MAX_JOBS: int = 100
+    INVENTORY_MAX_USERS: int = 1000
+
+    # GitHub request scheduler (per token)
+    GITHUB_RATE_PER_SECOND: float = 10.0
+    GITHUB_BURST: int = 20
+    GITHUB_INTERACTIVE_RESERVE: int = 5      # bucket tokens background calls leave for interactive ones
+    GITHUB_BUDGET_LOW_WATERMARK: int = 100   # background calls pause below this many remaining requests
+    GITHUB_MAX_RETRIES: int = 4
+    GITHUB_BACKOFF_BASE: float = 1.0
+    GITHUB_BACKOFF_MAX: float = 60.0
+    GITHUB_INTERACTIVE_MAX_WAIT: float = 5.0  # interactive calls fail with 429 rather than wait longer for the rate limit
     
     class Config:
         env_file = ".env"
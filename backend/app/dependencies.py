@@ -1,6 +1,22 @@
-from fastapi import Header, HTTPException
+import hmac
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException
+from app.config import settings
 
 def get_token(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
          raise HTTPException(status_code=401, detail="Invalid Authorization header format")
     return authorization.split(" ")[1]
+
+async def get_current_user(token: str = Depends(get_token)) -> dict:
+    """The GitHub user behind the bearer token, from the identity cache (no GitHub call on a hit)."""
+    from app.services.identity import identity_cache
+    return await identity_cache.get_user(token)
+
+def check_ingest_token(authorization: Optional[str] = Header(None)):
+    """Push endpoints (/ingest, /logs/ingest) need INGEST_TOKEN as a bearer token, when it's set."""
+    if not settings.INGEST_TOKEN:
+        return
+    if not hmac.compare_digest(f"Bearer {settings.INGEST_TOKEN}", authorization or ""):
+        raise HTTPException(status_code=401, detail="Invalid ingest token")
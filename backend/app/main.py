@@ -1,9 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, repos, pipeline, oauth, automation
 from app.config import settings
+from app.services.github import github_client
+from app.services.http_pool import upstream_http
+from app.services.push_ingestion import push_ingestor
+from app.services.log_store import log_tailer
+from app.services.metrics_parsing import parse_pool
+from app.services.instrumentation import MetricsMiddleware
 
-app = FastAPI(title="Hackathon Backend", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_tailer.start()  # no-op unless LOG_TAIL_PATHS is set
+    yield
+    log_tailer.stop()
+    # Close the pooled GitHub / upstream connections on shutdown
+    await github_client.aclose()
+    await upstream_http.aclose()
+    # Let queued pushes land in the sample store
+    push_ingestor.shutdown()
+    parse_pool.shutdown()
+
+app = FastAPI(title="Hackathon Backend", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,17 +30,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Cursor"],  # cursors/ETags of the telemetry and agent endpoints
 )
+# Route latency for GET /metrics (added last, so it wraps CORS too)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(oauth.router, prefix="/oauth", tags=["OAuth"])
 app.include_router(repos.router, prefix="/repos", tags=["Repos"])
 app.include_router(pipeline.router, prefix="/pipeline", tags=["Pipeline"])
 app.include_router(automation.router, prefix="/automation", tags=["Automation"])
-from app.routers import deployment, telemetry, agents
+from app.routers import deployment, telemetry, agents, bulk, webhooks, ingest, logs, stream, metrics, inventory
 app.include_router(deployment.router, tags=["Deployment"])
+app.include_router(bulk.router, tags=["Bulk"])
+app.include_router(inventory.router, tags=["Inventory"])
 app.include_router(telemetry.router, tags=["Telemetry"])
 app.include_router(agents.router, tags=["Agents"])
+app.include_router(webhooks.router, tags=["Webhooks"])
+app.include_router(ingest.router, tags=["Ingest"])
+app.include_router(logs.router, tags=["Logs"])
+app.include_router(stream.router, tags=["Stream"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/")
 def root():
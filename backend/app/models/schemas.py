@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class TokenRequest(BaseModel):
@@ -22,7 +22,29 @@ class WorkflowStep(BaseModel):
 
 class PipelineGenerateRequest(BaseModel):
     steps: List[str] # List of step IDs like "checkout", "install_deps"
+    parallel_jobs: bool = False # lint / test / build as separate parallel jobs
+    test_shards: int = Field(1, ge=1, le=16) # matrix shards for the tests (> 1 implies parallel_jobs)
 
 class PipelineCommitRequest(BaseModel):
     type: str # "ci" or "cd"
     yaml: str
+
+class PipelineBundleCommitRequest(BaseModel):
+    pipelines: List[PipelineCommitRequest]
+    include_dockerfile: bool = False # Commit a generated Dockerfile too if the repo has none
+    message: Optional[str] = None
+
+class BulkDeploymentConfig(BaseModel):
+    azure_credentials: str
+    acr_name: str
+    aks_cluster: str
+    resource_group: str
+
+class BulkRolloutRequest(BaseModel):
+    repos: List[RepoSelectRequest]
+    steps: Optional[List[str]] = None # Defaults to the suggested steps for each repo's stack
+    deployment: Optional[BulkDeploymentConfig] = None # Also set AKS secrets and commit cd.yml
+    message: Optional[str] = None
+
+class BulkRetryRequest(BaseModel):
+    azure_credentials: Optional[str] = None # Required again for rollouts with a deployment
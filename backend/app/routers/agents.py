@@ -1,48 +1,88 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from typing import Optional
 from app.services.prometheus_ingestion import prometheus_service
 from app.services.normalization import normalization_service
 from app.services.agent_input import agent_input_service
+from app.services.target_health import target_health, CircuitOpenError
+from app.services.delta_tracker import delta_tracker, comparable
+from app.services.fast_json import json_response
 
 router = APIRouter(
     prefix="/agents",
     tags=["Agents"]
 )
 
+def _raw_metrics(url: str, instance: Optional[str], hedge: Optional[bool] = None):
+    """Returns (raw metrics, scrape target state). A target with an open circuit gives no metrics."""
+    if instance:
+        raw_metrics = prometheus_service.pushed_metrics(instance)
+        if not raw_metrics:
+            raise HTTPException(status_code=404, detail=f"No pushed samples for instance {instance}")
+        return raw_metrics, None
+    try:
+        raw_text = prometheus_service.fetch_prometheus_metrics(url, hedge=hedge)
+    except CircuitOpenError:
+        return [], target_health.snapshot(url)
+    return prometheus_service.parse_metrics(raw_text), target_health.snapshot(url)
+
 @router.get("/input/prometheus")
-def get_agent_input_prometheus(url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL")):
+def get_agent_input_prometheus(
+    request: Request,
+    url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL"),
+    instance: Optional[str] = Query(None, description="Use the samples this instance pushed to /ingest instead of scraping url"),
+    hedge: Optional[bool] = Query(None, description="Hedge slow scrapes with a second request (default SCRAPE_HEDGE_ENABLED)"),
+    since: Optional[str] = Query(None, description="Cursor from a previous response (X-Cursor header): only return the signals that changed since. Empty to start")
+):
     """
     Returns high-level signals for AI agents, including trends.
+    Scraped targets also get scrape_target_up / latency signals from their circuit breaker.
+    With `since`, "signals" is replaced by "changed"/"removed" (see delta_tracker).
     """
     try:
         target_url = url if url else "http://demo.robustperception.io:9090/metrics"
         
         # Pipeline: Fetch -> Parse -> Normalize -> Agent Signal
-        raw_text = prometheus_service.fetch_prometheus_metrics(target_url)
-        raw_metrics = prometheus_service.parse_metrics(raw_text)
+        raw_metrics, target_state = _raw_metrics(target_url, instance, hedge)
         normalized = normalization_service.normalize_metrics(raw_metrics)
-        agent_input = agent_input_service.build_agent_signals(normalized)
-        
-        return agent_input
+        agent_input = agent_input_service.build_agent_signals(normalized, target_state)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    cursor, delta = delta_tracker.changes(
+        ("signals", "instance" if instance else "url", instance or target_url), agent_input["signals"], since,
+        key=lambda s: s["name"], value=lambda s: (comparable(s["value"]), s["trend"])
+    )
+    if since is not None:
+        agent_input = {**{k: v for k, v in agent_input.items() if k != "signals"}, **delta}
+    return json_response(request, agent_input, {"X-Cursor": cursor} if cursor else None)
+
 @router.get("/health")
-def get_health_agent_analysis(url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL")):
+def get_health_agent_analysis(
+    request: Request,
+    url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL"),
+    instance: Optional[str] = Query(None, description="Use the samples this instance pushed to /ingest instead of scraping url"),
+    hedge: Optional[bool] = Query(None, description="Hedge slow scrapes with a second request (default SCRAPE_HEDGE_ENABLED)"),
+    log_source: Optional[str] = Query(None, description="Correlate with the error rate of this log source (all sources if omitted)")
+):
     """
     Evaluates system health using the Health Agent rules.
+    When logs are being ingested, error-rate spikes are correlated with the metric issues.
     """
     try:
         from app.services.health_agent import health_agent
+        from app.services.log_store import log_store
         
         target_url = url if url else "http://demo.robustperception.io:9090/metrics"
         
         # Pipeline: Fetch -> Parse -> Normalize -> Health Check
-        raw_text = prometheus_service.fetch_prometheus_metrics(target_url)
-        raw_metrics = prometheus_service.parse_metrics(raw_text)
+        raw_metrics, target_state = _raw_metrics(target_url, instance, hedge)
         normalized = normalization_service.normalize_metrics(raw_metrics)
         
-        health_report = health_agent.evaluate_health(normalized)
-        return health_report
+        health_report = health_agent.evaluate_health(normalized, log_store.error_rate(source=log_source), target_state)
+        return json_response(request, health_report)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
 from app.models.schemas import TokenRequest, UserResponse
-from app.services.github import github_client
+from app.services.identity import identity_cache
+from app.dependencies import get_current_user
 from app.config import settings
 
 router = APIRouter()
 
 @router.post("/github", response_model=UserResponse)
-def authenticate_github(request: TokenRequest):
+async def authenticate_github(request: TokenRequest):
     """
     Validates the GitHub token and returns user info.
     In a real app, we might issue a session cookie here, 
@@ -16,7 +17,7 @@ def authenticate_github(request: TokenRequest):
     For simplicity, let's keep it stateless for now and require the token in headers or body for other requests,
     BUT the requirement says "Store token in memory per session (do NOT persist)".
     """
-    user = github_client.validate_user(request.token)
+    user = await identity_cache.get_user(request.token)
     
     return UserResponse(
         login=user["login"],
@@ -24,3 +25,15 @@ def authenticate_github(request: TokenRequest):
         avatar_url=user["avatar_url"],
         name=user.get("name")
     )
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(user: dict = Depends(get_current_user)):
+    """
+    Returns the user behind the bearer token (served from the identity cache).
+    """
+    return UserResponse(
+        login=user["login"],
+        id=user["id"],
+        avatar_url=user["avatar_url"],
+        name=user.get("name")
+    )
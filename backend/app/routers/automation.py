@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 import httpx
 import logging
+import time
+import zlib
+from app.config import settings
+from app.services.http_pool import upstream_http
+from app.services.instrumentation import observe_upstream, target_host
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -9,47 +16,153 @@ logger = logging.getLogger(__name__)
 class MetricsRequest(BaseModel):
     endpoint: str
 
-@router.post("/metrics")
-async def fetch_metrics(request: MetricsRequest):
+class BodyTooLarge(Exception):
+    pass
+
+def _normalize_endpoint(endpoint: str) -> str:
+    # Add http:// if not present
+    if not endpoint.startswith(('http://', 'https://')):
+        endpoint = f'http://{endpoint}'
+
+    # Ensure /metrics path
+    if not endpoint.endswith('/metrics'):
+        endpoint = f'{endpoint}/metrics'
+    return endpoint
+
+async def _open_upstream(endpoint: str, headers: dict = None) -> httpx.Response:
     """
-    Proxy endpoint to fetch metrics from a given endpoint.
-    This avoids CORS issues by fetching server-side.
+    Sends the GET on the pooled client and returns the response with the body still unread.
+    The caller must close it. Upstream errors are mapped to HTTPExceptions.
     """
+    client = upstream_http.client()
     try:
-        # Add http:// if not present
-        endpoint = request.endpoint
-        if not endpoint.startswith(('http://', 'https://')):
-            endpoint = f'http://{endpoint}'
-        
-        # Ensure /metrics path
-        if not endpoint.endswith('/metrics'):
-            endpoint = f'{endpoint}/metrics'
-        
-        logger.info(f"Fetching metrics from: {endpoint}")
-        
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            logger.info(f"Sending GET request to {endpoint}")
-            response = await client.get(endpoint)
-            logger.info(f"Received response with status: {response.status_code}")
-            response.raise_for_status()
-            
-            data = response.text
-            logger.info(f"Successfully fetched {len(data)} characters of metrics data")
-            
-            return {
-                "success": True,
-                "data": data,
-                "endpoint": endpoint
-            }
+        logger.info(f"Sending GET request to {endpoint}")
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await client.send(client.build_request("GET", endpoint, headers=headers), stream=True)
+            status = response.status_code
+        finally:
+            # Time to the response headers: the body is streamed to the client afterwards
+            observe_upstream("proxy", target_host(endpoint), status, time.perf_counter() - start)
+        logger.info(f"Received response with status: {response.status_code}")
     except httpx.TimeoutException as e:
         logger.error(f"Timeout fetching from {endpoint}: {str(e)}")
         raise HTTPException(status_code=408, detail="Request timeout - endpoint took too long to respond")
     except httpx.ConnectError as e:
         logger.error(f"Connection error to {endpoint}: {str(e)}")
         raise HTTPException(status_code=503, detail=f"Could not connect to {endpoint}. Please check if the endpoint is accessible.")
-    except httpx.HTTPStatusError as e:
-        logger.error(f"HTTP error from {endpoint}: {e.response.status_code}")
-        raise HTTPException(status_code=e.response.status_code, detail=f"HTTP error: {e.response.status_code}")
-    except Exception as e:
+    except httpx.HTTPError as e:
         logger.error(f"Unexpected error fetching from {endpoint}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching metrics: {str(e)}")
+
+    if response.status_code >= 400:
+        await response.aclose()
+        logger.error(f"HTTP error from {endpoint}: {response.status_code}")
+        raise HTTPException(status_code=response.status_code, detail=f"HTTP error: {response.status_code}")
+
+    # Refuse up front when the exporter tells us it's too big
+    length = response.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.METRICS_PROXY_MAX_BYTES:
+        await response.aclose()
+        raise HTTPException(status_code=413, detail=f"Metrics body is larger than {settings.METRICS_PROXY_MAX_BYTES} bytes")
+
+    return response
+
+def _limited(chunks, limit: int):
+    """Passes chunks through, raising BodyTooLarge once more than `limit` bytes went by."""
+    async def generate():
+        total = 0
+        async for chunk in chunks:
+            total += len(chunk)
+            if total > limit:
+                raise BodyTooLarge(f"Metrics body is larger than {limit} bytes")
+            yield chunk
+    return generate()
+
+@router.post("/metrics")
+async def fetch_metrics(request: MetricsRequest):
+    """
+    Proxy endpoint to fetch metrics from a given endpoint.
+    This avoids CORS issues by fetching server-side.
+    Use GET /automation/metrics/stream to pass large bodies through without buffering them.
+    """
+    endpoint = _normalize_endpoint(request.endpoint)
+    logger.info(f"Fetching metrics from: {endpoint}")
+
+    response = await _open_upstream(endpoint)
+    try:
+        body = bytearray()
+        async for chunk in _limited(response.aiter_bytes(), settings.METRICS_PROXY_MAX_BYTES):
+            body += chunk
+        data = body.decode(response.encoding or "utf-8", errors="replace")
+    except BodyTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except httpx.HTTPError as e:
+        logger.error(f"Error reading from {endpoint}: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Error reading metrics: {str(e)}")
+    finally:
+        await response.aclose()
+
+    logger.info(f"Successfully fetched {len(data)} characters of metrics data")
+    return {
+        "success": True,
+        "data": data,
+        "endpoint": endpoint
+    }
+
+@router.get("/metrics/stream")
+async def stream_metrics(
+    request: Request,
+    endpoint: str = Query(..., description="Metrics endpoint, /metrics is appended if missing"),
+    gzip: bool = Query(False, description="gzip the response (if the client accepts it)")
+):
+    """
+    Streams the exporter's body straight through in chunks, so memory stays flat no matter
+    how big the exporter is. Bodies over METRICS_PROXY_MAX_BYTES are cut off.
+    """
+    endpoint = _normalize_endpoint(endpoint)
+    use_gzip = gzip and "gzip" in request.headers.get("accept-encoding", "")
+
+    # Ask for gzip upstream only when we'd forward it as-is
+    response = await _open_upstream(endpoint, headers=None if use_gzip else {"Accept-Encoding": "identity"})
+    headers = {"X-Metrics-Endpoint": endpoint}
+    limit = settings.METRICS_PROXY_MAX_BYTES
+    chunk_size = settings.METRICS_PROXY_CHUNK_SIZE
+
+    if use_gzip and response.headers.get("content-encoding") == "gzip":
+        # Already gzipped upstream: forward the raw bytes untouched
+        body = _limited(response.aiter_raw(chunk_size), limit)
+        headers["Content-Encoding"] = "gzip"
+    elif use_gzip:
+        body = _gzipped(_limited(response.aiter_bytes(chunk_size), limit))
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = _limited(response.aiter_bytes(chunk_size), limit)
+
+    return StreamingResponse(
+        _logged(body, endpoint),
+        media_type=response.headers.get("content-type", "text/plain; version=0.0.4"),
+        headers=headers,
+        background=BackgroundTask(response.aclose)
+    )
+
+async def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def _logged(chunks, endpoint: str):
+    # Headers are already sent once streaming starts, so a failure can only cut the response short
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except BodyTooLarge as e:
+        logger.error(f"Aborting stream from {endpoint}: {e}")
+        raise
+    except httpx.HTTPError as e:
+        logger.error(f"Error streaming from {endpoint}: {str(e)}")
+        raise
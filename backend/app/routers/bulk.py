@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.dependencies import get_token, get_current_user
+from typing import Optional
+from app.models.schemas import BulkRolloutRequest, BulkRetryRequest
+from app.services.bulk_rollout import bulk_rollout_service
+from app.config import settings
+
+router = APIRouter(prefix="/bulk", tags=["Bulk"])
+
+@router.post("/rollouts", status_code=202)
+async def start_bulk_rollout(
+    request: BulkRolloutRequest,
+    token: str = Depends(get_token),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Starts a background job that analyzes, generates, (optionally) configures AKS secrets
+    and commits CI/CD for every listed repo. Poll GET /bulk/rollouts/{job_id} for progress.
+    """
+    if not request.repos:
+        raise HTTPException(status_code=400, detail="No repositories given.")
+    if len(request.repos) > settings.BULK_MAX_REPOS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_REPOS} repositories per job.")
+
+    job = bulk_rollout_service.start(
+        token,
+        repos=[{"owner": r.owner, "repo": r.repo} for r in request.repos],
+        steps=request.steps,
+        deployment=request.deployment.model_dump() if request.deployment else None,
+        message=request.message,
+        created_by=user["login"]
+    )
+    return job.to_dict(include_items=False)
+
+@router.get("/rollouts/{job_id}")
+async def get_bulk_rollout(job_id: str, token: str = Depends(get_token)):
+    """
+    Progress of a bulk rollout, with the status of every repo.
+    """
+    return bulk_rollout_service.get(job_id, token).to_dict()
+
+@router.post("/rollouts/{job_id}/retry", status_code=202)
+async def retry_bulk_rollout(job_id: str, request: Optional[BulkRetryRequest] = None, token: str = Depends(get_token)):
+    """
+    Re-runs the repos that failed (e.g. rate limited or missing permissions) without touching the rest.
+    Azure credentials are never kept by the job, so deployment rollouts must send them again.
+    """
+    azure_creds = request.azure_credentials if request else None
+    return bulk_rollout_service.retry(job_id, token, azure_creds).to_dict(include_items=False)
@@ -4,12 +4,13 @@ from typing import Dict, Any, Optional
 from app.dependencies import get_token
 from app.services.secrets import GitHubSecretsService
 from app.routers.repos import get_current_repo_context
+from app.services.session_store import session_store, DEPLOYMENT
 
 router = APIRouter(prefix="/deployment", tags=["deployment"])
 
-# In-memory store for "configured" state per user-session (token)
-# For hackathon only.
-DEPLOYMENT_CONFIGS = {}
+def get_deployment_config(token: str) -> Optional[dict]:
+    """The non-secret deployment settings saved by /deployment/aks/configure for this session."""
+    return session_store.get(DEPLOYMENT, token)
 
 class AKSConfig(BaseModel):
     owner: Optional[str] = None
@@ -20,7 +21,7 @@ class AKSConfig(BaseModel):
     resource_group: str
 
 @router.post("/aks/configure")
-def configure_aks_deployment(config: AKSConfig, token: str = Depends(get_token)):
+async def configure_aks_deployment(config: AKSConfig, token: str = Depends(get_token)):
     """
     Configure AKS deployment by setting GitHub Secrets.
     DOES NOT STORE SECRETS LOCALLY.
@@ -38,7 +39,7 @@ def configure_aks_deployment(config: AKSConfig, token: str = Depends(get_token))
             repo = config.repo
 
         # Create secrets on GitHub
-        results = secrets_service.setup_deployment_secrets(
+        results = await secrets_service.setup_deployment_secrets(
             owner=owner,
             repo=repo,
             azure_creds=config.azure_credentials,
@@ -47,15 +48,15 @@ def configure_aks_deployment(config: AKSConfig, token: str = Depends(get_token))
             resource_group=config.resource_group
         )
         
-        # Mark as configured in memory so we can enable CD generation
+        # Mark as configured in the session so we can enable CD generation
         # We store just boolean flags or non-sensitive info
-        DEPLOYMENT_CONFIGS[token] = {
+        session_store.set(DEPLOYMENT, token, {
             "configured": True,
             "provider": "aks",
             "acr_name": config.acr_name,
             "aks_cluster": config.aks_cluster,
             "resource_group": config.resource_group
-        }
+        })
         
         return {"status": "success", "message": "Deployment secrets configured on GitHub", "details": results}
         
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Optional
+
+from app.config import settings
+from app.dependencies import check_ingest_token
+from app.services.fast_json import json_response
+from app.services.push_ingestion import push_ingestor, IngestBackpressure, REMOTE_WRITE, OTLP
+from app.services.sample_store import sample_store
+
+router = APIRouter(
+    prefix="/ingest",
+    tags=["ingest"]
+)
+
+
+async def _accept(request: Request, fmt: str) -> dict:
+    content_type = request.headers.get("content-type", "")
+    encoding = request.headers.get("content-encoding", "").lower() or None
+    if "protobuf" in content_type or encoding == "snappy":
+        raise HTTPException(status_code=415, detail="Only the JSON encoding is supported, send Content-Type: application/json")
+    if encoding not in (None, "identity", "gzip"):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.INGEST_MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch is larger than {settings.INGEST_MAX_BATCH_BYTES} bytes")
+    body = await request.body()
+    if len(body) > settings.INGEST_MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch is larger than {settings.INGEST_MAX_BATCH_BYTES} bytes")
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty batch")
+
+    try:
+        return push_ingestor.submit(fmt, body, encoding if encoding == "gzip" else None)
+    except IngestBackpressure as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@router.post("/remote-write", status_code=202, dependencies=[Depends(check_ingest_token)])
+async def push_remote_write(request: Request):
+    """
+    Prometheus remote-write, JSON form of the WriteRequest (timeseries of labels + samples).
+    Acknowledged once queued; GET /ingest/batches/{batch_id} tells how decoding went.
+    """
+    return await _accept(request, REMOTE_WRITE)
+
+
+@router.post("/otlp/v1/metrics", status_code=202, dependencies=[Depends(check_ingest_token)])
+async def push_otlp_metrics(request: Request):
+    """
+    OTLP/HTTP metrics export with JSON encoding (point an OTLP exporter's metrics endpoint here).
+    """
+    return await _accept(request, OTLP)
+
+
+@router.get("/batches/{batch_id}")
+def get_batch(batch_id: str):
+    """Decode status of a recently pushed batch: queued, done (with sample count) or failed."""
+    batch = push_ingestor.batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Unknown batch (or too old)")
+    return batch
+
+
+@router.get("/stats")
+def get_ingest_stats():
+    """Queue depth, rejections and sample store usage."""
+    return push_ingestor.stats()
+
+
+@router.get("/targets")
+def get_pushed_targets():
+    """Instances that pushed samples, usable as ?instance= on the telemetry and agent routes."""
+    return sample_store.targets()
+
+
+@router.get("/series")
+def get_pushed_series(
+    request: Request,
+    instance: Optional[str] = Query(None, description="instance label of the pushing target"),
+    job: Optional[str] = Query(None, description="job label")
+):
+    """
+    Latest value of every pushed series, in the same shape as /telemetry/prometheus/raw.
+    NaN (e.g. remote-write staleness markers) and +/-Inf come back as null.
+    """
+    return json_response(request, sample_store.latest(instance=instance, job=job))
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.dependencies import get_token
+from app.services.fast_json import dumps, NDJSON_MEDIA_TYPE
+from app.services.inventory import inventory_service
+from app.services.repo_search import repo_listing_cache, load_repo_listing
+
+router = APIRouter(prefix="/inventory", tags=["Inventory"])
+
+@router.post("/refresh", status_code=202)
+async def refresh_inventory(
+    force: bool = Query(False, description="Reanalyze every repo, even unchanged ones"),
+    token: str = Depends(get_token)
+):
+    """
+    Starts analyzing every repo the token can access (only the ones that changed since the last refresh).
+    Follow GET /inventory/jobs/{job_id}/results for the results as they complete.
+    """
+    # A fresh listing, so new repos and new pushes (pushed_at) are seen
+    index = await repo_listing_cache.get_index(token, lambda: load_repo_listing(token), refresh=True)
+    return inventory_service.refresh(token, index.repos, force=force).to_dict()
+
+@router.get("/jobs/{job_id}")
+async def get_inventory_job(job_id: str, token: str = Depends(get_token)):
+    """
+    Progress of a refresh: how many repos were analyzed, unchanged (reused by head SHA) or failed.
+    """
+    return inventory_service.get_job(job_id, token).to_dict()
+
+@router.get("/jobs/{job_id}/results")
+async def stream_inventory_results(job_id: str, token: str = Depends(get_token)):
+    """
+    NDJSON, one {"full_name", "outcome", "summary"} line per repo as soon as it's done;
+    the response ends with the job. Results that are already in are sent first.
+    """
+    job = inventory_service.get_job(job_id, token)
+
+    async def lines():
+        async for result in job.follow():
+            yield dumps(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers={"X-Accel-Buffering": "no"})
+
+@router.get("/", response_model=List[dict])
+async def query_inventory(
+    response: Response,
+    language: Optional[str] = Query(None, description="e.g. python, javascript, java (also matches monorepo services)"),
+    framework: Optional[str] = Query(None),
+    has_dockerfile: Optional[bool] = Query(None),
+    has_workflows: Optional[bool] = Query(None, description="false: repos without any GitHub Actions workflow"),
+    q: Optional[str] = Query(None, description="Substring of owner/name"),
+    page: int = Query(1, ge=1),
+    per_page: Optional[int] = Query(None, ge=1, le=1000, description="Omit to return every match"),
+    token: str = Depends(get_token)
+):
+    """
+    The stored inventory, filtered. The total number of matches is returned in the X-Total-Count header.
+    """
+    total, repos = inventory_service.query(token, language, framework, has_dockerfile, has_workflows, q, page, per_page)
+    response.headers["X-Total-Count"] = str(total)
+    return repos
+
+@router.get("/summary")
+async def get_inventory_summary(token: str = Depends(get_token)):
+    """
+    Repo counts by language and framework, and how many have a Dockerfile / workflows.
+    """
+    return inventory_service.summary(token)
@@ -0,0 +1,83 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from app.config import settings
+from app.dependencies import check_ingest_token
+from app.services.log_parsing import FORMATS
+from app.services.log_store import log_store
+
+router = APIRouter(
+    prefix="/logs",
+    tags=["logs"]
+)
+
+
+@router.post("/ingest", dependencies=[Depends(check_ingest_token)])
+async def ingest_logs(
+    request: Request,
+    source: str = Query("default", description="Stream name, e.g. the service or file the lines come from"),
+    format: Optional[str] = Query(None, description="json, logfmt, nginx or text; detected per line when omitted")
+):
+    """
+    Pushes a batch of log lines: newline separated text (NDJSON works too),
+    or a JSON body {"lines": [...]}.
+    """
+    if format is not None and format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.LOG_INGEST_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch is larger than {settings.LOG_INGEST_MAX_BYTES} bytes")
+    body = await request.body()
+    if len(body) > settings.LOG_INGEST_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch is larger than {settings.LOG_INGEST_MAX_BYTES} bytes")
+
+    text = body.decode("utf-8", errors="replace")
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            lines = json.loads(text)["lines"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail='Expected a JSON body {"lines": [...]}')
+        lines = [line if isinstance(line, str) else json.dumps(line) for line in lines]
+    else:
+        lines = text.split("\n")
+
+    # Parsing + indexing is CPU work, keep it off the event loop
+    stored = await run_in_threadpool(log_store.add, lines, source, format)
+    return {"source": source, "stored": stored}
+
+
+@router.get("/search")
+def search_logs(
+    q: str = Query("", description="Terms that must all appear (message or field values)"),
+    start: Optional[float] = Query(None, description="Unix seconds"),
+    end: Optional[float] = Query(None, description="Unix seconds"),
+    level: Optional[str] = Query(None, description="error, warn, info or debug"),
+    source: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Term and time-range search, newest lines first. Only chunks whose index entry and
+    time range can match are decompressed (see chunks_scanned).
+    """
+    return log_store.search(q, start=start, end=end, level=level, source=source, limit=limit)
+
+
+@router.get("/error-rate")
+def get_error_rate(
+    source: Optional[str] = Query(None),
+    window: int = Query(settings.LOG_SPIKE_WINDOW, ge=60, description="Seconds"),
+    baseline: int = Query(settings.LOG_SPIKE_BASELINE, ge=60, description="Seconds before the window to compare with")
+):
+    """Error rate of the recent window against its baseline, and whether that's a spike."""
+    signal = log_store.error_rate(window=window, baseline=baseline, source=source)
+    if signal is None:
+        raise HTTPException(status_code=404, detail="No log lines in the window")
+    return signal
+
+
+@router.get("/stats")
+def get_log_stats():
+    return log_store.stats()
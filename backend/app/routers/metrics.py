@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.services.instrumentation import exposition
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def get_backend_metrics():
+    """
+    The backend's own metrics in Prometheus text format: route and upstream latencies,
+    parse/normalize/YAML durations, cache hit ratios, threadpool saturation.
+    Async on purpose: the threadpool gauges can only be read on the event loop.
+    """
+    return Response(content=exposition(), media_type=CONTENT_TYPE_LATEST)
@@ -2,12 +2,13 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import RedirectResponse
 from app.models.schemas import UserResponse
 from app.services.github import github_client
+from app.services.identity import identity_cache
 from app.config import settings
 
 router = APIRouter()
 
 @router.get("/login")
-def login_github():
+async def login_github():
     """
     Redirects the user to GitHub's OAuth login page.
     """
@@ -24,20 +25,20 @@ def login_github():
     return RedirectResponse(github_oauth_url)
 
 @router.get("/callback", response_model=UserResponse)
-def github_callback(code: str):
+async def github_callback(code: str):
     """
     Handles the callback from GitHub.
     Exchanges the code for a token, then fetches user info.
     """
     try:
         # 1. Exchange code for token
-        token = github_client.exchange_code_for_token(code)
+        token = await github_client.exchange_code_for_token(code)
         
         if not token:
              raise HTTPException(status_code=400, detail="Failed to retrieve access token from GitHub")
 
-        # 2. Validate user / Get user info
-        user = github_client.validate_user(token)
+        # 2. Validate user / Get user info (also warms the identity cache for the next requests)
+        user = await identity_cache.get_user(token)
         
         return UserResponse(
             login=user["login"],
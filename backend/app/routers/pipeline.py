@@ -3,34 +3,30 @@ from app.services.analyzer import repo_analyzer
 from app.services.generator import workflow_generator
 from app.services.github import github_client
 from app.routers.repos import get_current_repo_context
+from app.routers.deployment import get_deployment_config
 from app.dependencies import get_token
-from app.models.schemas import PipelineGenerateRequest, PipelineCommitRequest
-import base64
+from app.models.schemas import PipelineGenerateRequest, PipelineCommitRequest, PipelineBundleCommitRequest
+import asyncio
 
 router = APIRouter()
 
 @router.get("/suggest")
 @router.post("/suggest")
 # ... existing suggest_pipeline ...
-def suggest_pipeline(token: str = Depends(get_token)):
+async def suggest_pipeline(token: str = Depends(get_token)):
     """
     Analyzes the selected repo and returns suggested pipeline steps.
     """
     context = get_current_repo_context(token)
-    stack = repo_analyzer.analyze(token, context["owner"], context["repo"])
+    stack = await repo_analyzer.analyze(token, context["owner"], context["repo"])
     
-    steps = ["checkout", "install_deps", "run_tests"]
-    
-    if stack["has_dockerfile"]:
-        steps.append("docker_build")
-        
     return {
         "stack": stack,
-        "suggested_steps": steps
+        "suggested_steps": workflow_generator.suggest_steps(stack)
     }
 
 @router.post("/generate-and-commit")
-def generate_and_commit_pipeline(
+async def generate_and_commit_pipeline(
     request: PipelineGenerateRequest, 
     token: str = Depends(get_token)
 ):
@@ -41,47 +37,44 @@ def generate_and_commit_pipeline(
     owner = context["owner"]
     repo = context["repo"]
     
-    # 1. Analyze to get stack info (needed for generator to know language)
-    stack = repo_analyzer.analyze(token, owner, repo)
+    file_path = ".github/workflows/ci.yml"
+
+    # 1. Analyze to get stack info (needed for generator to know language),
+    #    and resolve the branch head we'll commit on top of at the same time
+    stack, head = await asyncio.gather(
+        repo_analyzer.analyze(token, owner, repo),
+        github_client.get_branch_head(token, owner, repo)
+    )
     
     # 2. Generate YAML
-    yaml_content = workflow_generator.generate_yaml(request.steps, stack)
+    yaml_content = workflow_generator.generate_yaml(
+        request.steps, stack, parallel_jobs=request.parallel_jobs, test_shards=request.test_shards
+    )
     
     # 3. Commit to GitHub
-    file_path = ".github/workflows/ci.yml"
     message = "Add CI pipeline generated by Hackathon Backend"
-    content_b64 = base64.b64encode(yaml_content.encode("utf-8")).decode("utf-8")
-    
-    # Check if file exists to get SHA (for update)
-    existing_file = github_client.get_repo_contents(token, owner, repo, file_path)
-    sha = existing_file["sha"] if existing_file else None
-    
-    result = github_client.create_or_update_file(
-        token, owner, repo, file_path, message, content_b64, sha
-    )
+    result = await github_client.commit_files(token, owner, repo, {file_path: yaml_content}, message, head=head)
     
     return {
-        "message": "Pipeline created successfully",
+        "message": "Pipeline unchanged, nothing to commit" if result["noop"] else "Pipeline created successfully",
         "file_path": file_path,
-        "commit": result["commit"]["sha"],
+        "commit": result["commit"],
+        "noop": result["noop"],
         "yaml_preview": yaml_content
     }
 
 @router.post("/generate-cd")
-def generate_cd_pipeline(token: str = Depends(get_token)):
+async def generate_cd_pipeline(token: str = Depends(get_token)):
     """
     Generates and commits a CD pipeline (Infra-aware).
     Requires deployment to be configured first.
     """
-    from app.routers.deployment import DEPLOYMENT_CONFIGS
-    
-    config = DEPLOYMENT_CONFIGS.get(token)
+    config = get_deployment_config(token)
     if not config or not config.get("configured"):
         raise HTTPException(status_code=400, detail="Deployment not configured. Please configure AKS deployment first.")
 
     # Get Repo Context
     # Fixed to use the function instead of direct dict access which was incorrect 
-    # (SELECTED_REPOS didn't exist, it's token_repo_map in repos.py)
     try:
         repo_context = get_current_repo_context(token)
     except HTTPException:
@@ -90,8 +83,13 @@ def generate_cd_pipeline(token: str = Depends(get_token)):
     owner = repo_context["owner"]
     repo = repo_context["repo"]
     
-    # Get Stack Info for CD (to check for Dockerfile)
-    stack = repo_analyzer.analyze(token, owner, repo)
+    file_path = ".github/workflows/cd.yml"
+
+    # Get Stack Info for CD (to check for Dockerfile) and the branch head concurrently
+    stack, head = await asyncio.gather(
+        repo_analyzer.analyze(token, owner, repo),
+        github_client.get_branch_head(token, owner, repo)
+    )
 
     # Generate CD YAML
     from app.services.cd_generator import CDWorkflowGenerator
@@ -104,60 +102,47 @@ def generate_cd_pipeline(token: str = Depends(get_token)):
     )
     
     # Commit to GitHub
-    file_path = ".github/workflows/cd.yml"
     message = "Add AKS CD Pipeline"
-    content_b64 = base64.b64encode(yaml_content.encode()).decode()
-    
-    existing = github_client.get_repo_contents(token, owner, repo, file_path)
-    sha = existing["sha"] if existing else None
-    
-    result = github_client.create_or_update_file(
-        token=token,
-        owner=owner,
-        repo=repo,
-        path=file_path,
-        message=message,
-        content_b64=content_b64,
-        sha=sha
-    )
+    result = await github_client.commit_files(token, owner, repo, {file_path: yaml_content}, message, head=head)
     
     return {
         "status": "success",
-        "message": "CD Pipeline generated and committed.",
+        "message": "CD Pipeline unchanged, nothing committed." if result["noop"] else "CD Pipeline generated and committed.",
         "file_path": file_path,
-        "commit": result["content"]["sha"],
+        "commit": result["commit"],
+        "noop": result["noop"],
         "yaml_preview": yaml_content
     }
 
 # --- New Preview & Commit Endpoints ---
 
 @router.post("/ci/preview")
-def preview_ci_pipeline(request: PipelineGenerateRequest, token: str = Depends(get_token)):
+async def preview_ci_pipeline(request: PipelineGenerateRequest, token: str = Depends(get_token)):
     """
     Generates CI YAML but does NOT commit.
     Returns the YAML for user review.
     """
     context = get_current_repo_context(token)
-    stack = repo_analyzer.analyze(token, context["owner"], context["repo"])
+    stack = await repo_analyzer.analyze(token, context["owner"], context["repo"])
     
-    yaml_content = workflow_generator.generate_yaml(request.steps, stack)
+    yaml_content = workflow_generator.generate_yaml(
+        request.steps, stack, parallel_jobs=request.parallel_jobs, test_shards=request.test_shards
+    )
     
     return {"yaml": yaml_content}
 
 @router.post("/cd/preview")
-def preview_cd_pipeline(token: str = Depends(get_token)):
+async def preview_cd_pipeline(token: str = Depends(get_token)):
     """
     Generates CD YAML but does NOT commit.
     Returns the YAML for user review.
     """
-    from app.routers.deployment import DEPLOYMENT_CONFIGS
-    
-    config = DEPLOYMENT_CONFIGS.get(token)
+    config = get_deployment_config(token)
     if not config or not config.get("configured"):
         raise HTTPException(status_code=400, detail="Deployment not configured.")
 
     context = get_current_repo_context(token)
-    stack = repo_analyzer.analyze(token, context["owner"], context["repo"])
+    stack = await repo_analyzer.analyze(token, context["owner"], context["repo"])
 
     from app.services.cd_generator import CDWorkflowGenerator
     generator = CDWorkflowGenerator()
@@ -171,7 +156,7 @@ def preview_cd_pipeline(token: str = Depends(get_token)):
     return {"yaml": yaml_content}
 
 @router.post("/commit")
-def commit_pipeline(request: PipelineCommitRequest, token: str = Depends(get_token)):
+async def commit_pipeline(request: PipelineCommitRequest, token: str = Depends(get_token)):
     """
     Commits the approved YAML to GitHub.
     """
@@ -187,21 +172,60 @@ def commit_pipeline(request: PipelineCommitRequest, token: str = Depends(get_tok
     
     file_path = f".github/workflows/{request.type}.yml"
     message = f"Add {request.type.upper()} pipeline (generated)"
-    content_b64 = base64.b64encode(request.yaml.encode("utf-8")).decode("utf-8")
-    
-    # Check if file exists (for update SHA)
-    existing_file = github_client.get_repo_contents(token, owner, repo, file_path)
-    sha = existing_file["sha"] if existing_file else None
     
     try:
-        result = github_client.create_or_update_file(
-            token, owner, repo, file_path, message, content_b64, sha
-        )
+        result = await github_client.commit_files(token, owner, repo, {file_path: request.yaml}, message)
         return {
             "status": "success",
-            "message": f"{request.type.upper()} pipeline committed.",
+            "message": f"{request.type.upper()} pipeline unchanged, nothing committed." if result["noop"] else f"{request.type.upper()} pipeline committed.",
             "file_path": file_path,
-            "commit": result["content"]["sha"]
+            "commit": result["commit"],
+            "noop": result["noop"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
          raise HTTPException(status_code=500, detail=f"Failed to commit: {str(e)}")
+
+@router.post("/commit-all")
+async def commit_pipelines(request: PipelineBundleCommitRequest, token: str = Depends(get_token)):
+    """
+    Commits several approved pipelines (and optionally a generated Dockerfile)
+    to GitHub as a single atomic commit.
+    """
+    if not request.pipelines:
+        raise HTTPException(status_code=400, detail="No pipelines to commit.")
+    for pipeline in request.pipelines:
+        if pipeline.type not in ["ci", "cd"]:
+            raise HTTPException(status_code=400, detail="Invalid pipeline type. Must be 'ci' or 'cd'.")
+
+    context = get_current_repo_context(token)
+    owner = context["owner"]
+    repo = context["repo"]
+
+    files = {f".github/workflows/{p.type}.yml": p.yaml for p in request.pipelines}
+
+    if request.include_dockerfile:
+        stack, head = await asyncio.gather(
+            repo_analyzer.analyze(token, owner, repo),
+            github_client.get_branch_head(token, owner, repo)
+        )
+        # Never overwrite the repo's own Dockerfile
+        if not stack["has_dockerfile"]:
+            from app.services.cd_generator import CDWorkflowGenerator
+            files["Dockerfile"] = CDWorkflowGenerator().generate_dockerfile(stack) + "\n"
+    else:
+        head = None
+
+    types = " + ".join(p.type.upper() for p in request.pipelines)
+    message = request.message or f"Add {types} pipeline (generated)"
+    result = await github_client.commit_files(token, owner, repo, files, message, head=head)
+
+    return {
+        "status": "success",
+        "message": "Nothing changed, nothing committed." if result["noop"] else f"{types} committed in one commit.",
+        "file_paths": result["files"],
+        "unchanged": result["unchanged"],
+        "commit": result["commit"],
+        "noop": result["noop"]
+    }
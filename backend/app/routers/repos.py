@@ -1,41 +1,42 @@
-from fastapi import APIRouter, Depends, Header, HTTPException
-from typing import List
-from app.services.github import github_client
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from typing import List, Optional
+from app.services.repo_search import repo_listing_cache, load_repo_listing, SORT_KEYS
+from app.services.session_store import session_store, SELECTED_REPO
 from app.models.schemas import RepoSelectRequest
 
 router = APIRouter()
 
 from app.dependencies import get_token
 
-# In-memory storage for selected repo context
-# Map: token (acting as session ID) -> {owner, repo}
-# WARNING: using token as key is not secure for production but fine for hackathon scope where we don't have session management
-token_repo_map = {}
-
+# Selected repo context ({owner, repo}) lives in the session store, keyed by a hash of the token
 # get_token moved to app.dependencies
 
 @router.get("/", response_model=List[dict])
-def list_repos(token: str = Depends(get_token)):
+async def list_repos(
+    response: Response,
+    q: Optional[str] = Query(None, description="Search in owner/name"),
+    sort: str = Query("updated", description="updated | pushed | name | full_name"),
+    page: int = Query(1, ge=1),
+    per_page: Optional[int] = Query(None, ge=1, le=1000, description="Omit to return every match"),
+    refresh: bool = Query(False, description="Bypass the cached listing"),
+    token: str = Depends(get_token)
+):
     """
     List all accessible repositories for the user.
+    The full listing is fetched once and cached per token; search, sort and paging run on the cached index.
+    The total number of matches is returned in the X-Total-Count header.
     """
-    repos = github_client.get_repos(token)
-    # Simplify response for frontend
-    return [
-        {
-            "id": r["id"],
-            "name": r["name"],
-            "full_name": r["full_name"],
-            "owner": r["owner"]["login"],
-            "html_url": r["html_url"],
-            "description": r["description"],
-            "private": r["private"]
-        }
-        for r in repos
-    ]
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Must be one of: {', '.join(SORT_KEYS)}")
+
+    index = await repo_listing_cache.get_index(token, lambda: load_repo_listing(token), refresh=refresh)
+    total, repos = index.search(q, sort=sort, page=page, per_page=per_page)
+
+    response.headers["X-Total-Count"] = str(total)
+    return repos
 
 @router.post("/select")
-def select_repository(request: RepoSelectRequest, token: str = Depends(get_token)):
+async def select_repository(request: RepoSelectRequest, token: str = Depends(get_token)):
     """
     Selects a repository to work on. Verify permissions (we assume if we can fetch it, needed perms are likely there, 
     or we catch it later).
@@ -44,11 +45,11 @@ def select_repository(request: RepoSelectRequest, token: str = Depends(get_token
     # We don't strictly need to call API here if we trust the list, but good to verify existence.
     # For now, just store it.
     
-    token_repo_map[token] = {"owner": request.owner, "repo": request.repo}
+    session_store.set(SELECTED_REPO, token, {"owner": request.owner, "repo": request.repo})
     return {"message": f"Selected repository {request.owner}/{request.repo}"}
 
 def get_current_repo_context(token: str):
-    context = token_repo_map.get(token)
+    context = session_store.get(SELECTED_REPO, token)
     if not context:
         raise HTTPException(status_code=400, detail="No repository selected. Please call /repos/select first.")
     return context
@@ -0,0 +1,113 @@
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.services import fast_json
+from app.services.signal_stream import signal_hub, Subscriber
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["stream"]
+)
+
+
+def _targets(urls: List[str], instances: List[str]) -> list:
+    return [("url", u) for u in urls] + [("instance", i) for i in instances]
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    url: List[str] = Query([], description="Scrape targets (Prometheus metrics URLs), repeatable"),
+    instance: List[str] = Query([], description="Pushed instances (see /ingest), repeatable")
+):
+    """
+    Server-Sent Events: metrics, signals, health and alert updates for the given targets,
+    as they are produced. Replaces polling /agents/input/prometheus and /agents/health.
+    Events: `event: <metrics|signals|health|alert|error>` with the JSON message as data.
+    """
+    targets = _targets(url, instance)
+    if not targets:
+        raise HTTPException(status_code=400, detail="Give at least one url or instance")
+    if len(targets) > settings.STREAM_MAX_TARGETS_PER_CLIENT:
+        raise HTTPException(status_code=400, detail=f"At most {settings.STREAM_MAX_TARGETS_PER_CLIENT} targets per client")
+
+    subscriber = Subscriber()
+
+    async def events():
+        # Subscribe only once the response actually streams, so a generator that never starts
+        # (client gone before the first byte) leaves no subscription or poll task behind
+        try:
+            for target in targets:
+                signal_hub.subscribe(subscriber, target)
+            yield f"retry: {int(settings.STREAM_INTERVAL * 1000)}\n\n"
+            while not await request.is_disconnected():
+                batch = await subscriber.next_batch(settings.STREAM_HEARTBEAT)
+                if not batch:
+                    yield ": keep-alive\n\n"
+                    continue
+                for message in batch:
+                    yield f"id: {message['seq']}\nevent: {message['type']}\ndata: {fast_json.dumps(message).decode()}\n\n"
+        finally:
+            signal_hub.unsubscribe_all(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket):
+    """
+    WebSocket version of /stream/events. Send
+        {"subscribe": {"urls": [...], "instances": [...]}} or {"unsubscribe": {...}}
+    and receive the same messages as JSON ({"type", "target", "seq", "ts", "data"}).
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+
+    async def receive():
+        while True:
+            command = await websocket.receive_json()
+            for action in ("subscribe", "unsubscribe"):
+                spec = command.get(action) if isinstance(command, dict) else None
+                if not isinstance(spec, dict):
+                    continue
+                for target in _targets(spec.get("urls") or [], spec.get("instances") or []):
+                    try:
+                        if action == "subscribe":
+                            signal_hub.subscribe(subscriber, target)
+                        else:
+                            signal_hub.unsubscribe(subscriber, target)
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "data": {"detail": str(e)}})
+
+    async def send():
+        while True:
+            batch = await subscriber.next_batch(settings.STREAM_HEARTBEAT)
+            # A slow client makes the send wait, meanwhile updates pile up coalesced in the subscriber
+            for message in batch or [{"type": "keep-alive"}]:
+                await websocket.send_text(fast_json.dumps(message).decode())
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        signal_hub.unsubscribe_all(subscriber)
+    for task in done:
+        error = task.exception()
+        if error and not isinstance(error, WebSocketDisconnect):
+            raise error
+
+
+@router.get("/stats")
+def get_stream_stats():
+    """Targets being evaluated and how many clients share each one."""
+    return signal_hub.stats()
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+import itertools
+from fastapi import APIRouter, HTTPException, Query, Request
 from app.services.prometheus_ingestion import prometheus_service
+from app.services.delta_tracker import delta_tracker, series_key, series_key_json, comparable
+from app.services.fast_json import json_response, ndjson_response, wants_ndjson
+from app.services.target_health import target_health, CircuitOpenError
 from typing import Optional
 
 router = APIRouter(
@@ -7,27 +11,59 @@ router = APIRouter(
     tags=["telemetry"]
 )
 
+SINCE_DESCRIPTION = "Cursor from a previous response (X-Cursor header): only return what changed since. Empty to start"
+
+
+def _series_value(metric: dict):
+    return comparable(metric["value"]), metric["type"]
+
+
 @router.get("/prometheus/raw")
-def get_raw_prometheus_metrics(url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL")):
+def get_raw_prometheus_metrics(
+    request: Request,
+    url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL"),
+    hedge: Optional[bool] = Query(None, description="Hedge slow scrapes with a second request"),
+    since: Optional[str] = Query(None, description=SINCE_DESCRIPTION),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="ndjson: one series per line, streamed (also Accept: application/x-ndjson)")
+):
     """
     Fetches and parses Prometheus metrics.
     If 'url' is provided, it fetches from there.
     Otherwise, it defaults to a known demo endpoint or raises an error if env var not set (for now just optional).
+    With `since`, returns {cursor, since, full, changed, removed} with only the changed series
+    (`since=` empty on the first request returns everything and starts the cursor).
     """
     # We'll use a public demo for easy verification if user doesn't provide one.
     target_url = url if url else "http://demo.robustperception.io:9090/metrics"
     
     try:
-        raw_text = prometheus_service.fetch_prometheus_metrics(target_url)
+        raw_text = prometheus_service.fetch_prometheus_metrics(target_url, hedge=hedge)
         metrics = prometheus_service.parse_metrics(raw_text)
-        return metrics
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_in)))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    cursor, delta = delta_tracker.changes(("raw", target_url), metrics, since, series_key, _series_value, series_key_json)
+    headers = {"X-Cursor": cursor} if cursor else None
+    if wants_ndjson(request, format):
+        if since is None:
+            return ndjson_response(metrics, headers)
+        # Removed series come last as {"name", "labels", "removed": true}
+        removed = (dict(key, removed=True) for key in delta["removed"])
+        return ndjson_response(itertools.chain(delta["changed"], removed), headers)
+    return json_response(request, delta if since is not None else metrics, headers)
+
 @router.get("/prometheus/normalized")
-def get_normalized_prometheus_metrics(url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL")):
+def get_normalized_prometheus_metrics(
+    request: Request,
+    url: Optional[str] = Query(None, description="Prometheus metrics endpoint URL"),
+    hedge: Optional[bool] = Query(None, description="Hedge slow scrapes with a second request"),
+    since: Optional[str] = Query(None, description=SINCE_DESCRIPTION)
+):
     """
     Fetches, parses, AND normalizes metrics (CPU, Memory, Disk).
+    With `since`, only the metrics whose value changed (timestamps alone don't count).
     """
     try:
         # Reuse raw fetch logic via imported service endpoint logic or direct call?
@@ -35,10 +71,33 @@ def get_normalized_prometheus_metrics(url: Optional[str] = Query(None, descripti
         from app.services.normalization import normalization_service
         
         target_url = url if url else "http://demo.robustperception.io:9090/metrics"
-        raw_text = prometheus_service.fetch_prometheus_metrics(target_url)
+        raw_text = prometheus_service.fetch_prometheus_metrics(target_url, hedge=hedge)
         raw_metrics = prometheus_service.parse_metrics(raw_text)
         
         normalized = normalization_service.normalize_metrics(raw_metrics)
-        return normalized
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_in)))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    cursor, delta = delta_tracker.changes(
+        ("normalized", target_url), normalized, since,
+        key=lambda m: m["metric"], value=lambda m: comparable(m["value"])
+    )
+    return json_response(request, delta if since is not None else normalized, {"X-Cursor": cursor} if cursor else None)
+
+@router.get("/targets")
+def get_scrape_targets(request: Request):
+    """
+    Circuit breaker state and latency of every scrape target seen so far.
+    """
+    return json_response(request, target_health.all())
+
+@router.get("/github/scheduler")
+def get_github_scheduler_metrics():
+    """
+    Queue wait and throttle metrics of the GitHub request scheduler.
+    """
+    from app.services.rate_limit import github_rate_limiter
+
+    return github_rate_limiter.get_metrics()
@@ -0,0 +1,101 @@
+import hashlib
+import hmac
+import json
+
+from fastapi import APIRouter, HTTPException, Request, Header
+from typing import Optional
+
+from app.config import settings
+from app.services.repo_cache import repo_cache
+
+router = APIRouter(
+    prefix="/webhooks",
+    tags=["webhooks"]
+)
+
+# Past this many commits a push is treated as "everything changed" (GitHub also caps the commit list at 20)
+MAX_TRACKED_COMMITS = 20
+
+
+def _verify_signature(body: bytes, signature: Optional[str]):
+    if not settings.GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="GITHUB_WEBHOOK_SECRET is not configured")
+    expected = "sha256=" + hmac.new(settings.GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(expected, signature):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+
+def _handle_push(payload: dict) -> dict:
+    owner, repo = payload["repository"]["full_name"].split("/", 1)
+    ref = payload.get("ref", "")
+    if not ref.startswith("refs/heads/"):
+        return {"ignored": f"ref {ref}"}
+    branch = ref[len("refs/heads/"):]
+
+    # Default-branch reads are cached without a ref
+    refs = [branch]
+    if branch == payload["repository"].get("default_branch"):
+        refs.append(None)
+
+    commits = payload.get("commits") or []
+    if payload.get("forced") or payload.get("created") or payload.get("deleted") or len(commits) >= MAX_TRACKED_COMMITS:
+        paths = None
+    else:
+        paths = set()
+        for commit in commits:
+            for key in ("added", "modified", "removed"):
+                paths.update(commit.get(key) or [])
+
+    removed = repo_cache.invalidate(owner, repo, refs=refs, paths=paths)
+    return {
+        "repo": f"{owner}/{repo}",
+        "refs": [r or "(default)" for r in refs],
+        "paths": sorted(paths) if paths is not None else "all",
+        "invalidated": removed,
+    }
+
+
+def _handle_repository(payload: dict) -> dict:
+    owner, repo = payload["repository"]["full_name"].split("/", 1)
+    names = [repo]
+    # Renames: drop whatever was cached under the old name as well
+    old_name = (payload.get("changes") or {}).get("repository", {}).get("name", {}).get("from")
+    if old_name:
+        names.append(old_name)
+
+    removed = sum(repo_cache.invalidate(owner, name) for name in names)
+    return {"repo": f"{owner}/{repo}", "action": payload.get("action"), "invalidated": removed}
+
+
+@router.post("/github")
+async def github_webhook(
+    request: Request,
+    x_github_event: Optional[str] = Header(None),
+    x_hub_signature_256: Optional[str] = Header(None)
+):
+    """
+    Receives GitHub push/repository webhooks and invalidates the cached contents and
+    analysis results they affect. Configure the webhook with content type application/json
+    and the same secret as GITHUB_WEBHOOK_SECRET.
+    """
+    body = await request.body()
+    _verify_signature(body, x_hub_signature_256)
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body must be JSON")
+
+    if x_github_event == "ping":
+        return {"status": "pong"}
+    if x_github_event == "push":
+        return {"status": "ok", **_handle_push(payload)}
+    if x_github_event == "repository":
+        return {"status": "ok", **_handle_repository(payload)}
+    return {"status": "ignored", "event": x_github_event}
+
+
+@router.get("/cache")
+def cache_stats():
+    """Size and hit/miss counters of the repo cache the webhooks keep fresh."""
+    return repo_cache.stats()
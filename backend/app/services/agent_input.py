@@ -1,21 +1,32 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 # In-memory store for previous values to detect trends
 # Key: metric_name, Value: float
 _last_metric_values: Dict[str, float] = {}
 
 class AgentInputService:
-    def build_agent_signals(self, normalized_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def build_agent_signals(self, normalized_metrics: List[Dict[str, Any]],
+                            target_state: Optional[Dict[str, Any]] = None,
+                            previous_values: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         Converts normalized metrics into time-windowed signals with trend detection.
+        target_state (target_health.snapshot) adds scrape_target_up / scrape_latency_p99_seconds
+        signals, so a target that's down is a signal rather than an error.
+        Trends compare against previous_values (updated in place), callers that follow one target
+        pass their own dict; by default it's the shared module-level store.
         """
+        if previous_values is None:
+            previous_values = _last_metric_values
         signals = []
+        values = [(m["metric"], m["value"]) for m in normalized_metrics]
+        if target_state is not None:
+            values.append(("scrape_target_up", 0 if target_state["state"] == "open" else 1))
+            if target_state.get("latency_p99_seconds") is not None:
+                values.append(("scrape_latency_p99_seconds", target_state["latency_p99_seconds"]))
         
-        for m in normalized_metrics:
-            name = m["metric"]
-            value = m["value"]
+        for name, value in values:
             
-            trend = self._detect_trend(name, value)
+            trend = self._detect_trend(name, value, previous_values)
             
             signals.append({
                 "name": name,
@@ -24,16 +35,19 @@ class AgentInputService:
             })
             
             # Update cache
-            _last_metric_values[name] = value
+            previous_values[name] = value
             
-        return {
+        result = {
             "source": "prometheus",
             "signals": signals,
             "window": "5m" # Hardcoded window concept for now
         }
+        if target_state is not None:
+            result["target"] = target_state
+        return result
 
-    def _detect_trend(self, name: str, current_value: float) -> str:
-        prev_value = _last_metric_values.get(name)
+    def _detect_trend(self, name: str, current_value: float, previous_values: Dict[str, float]) -> str:
+        prev_value = previous_values.get(name)
         
         if prev_value is None:
             return "stable" # No history
@@ -1,32 +1,100 @@
 from app.services.github import github_client
+from app.services.repo_cache import repo_cache, ANALYSIS, MISS
+import asyncio
 import base64
+import copy
 import json
+from typing import Dict, List, Optional
+
+# Lockfile -> package manager, in order of preference when a repo has several
+NODE_LOCKFILES = (
+    ("pnpm-lock.yaml", "pnpm"),
+    ("yarn.lock", "yarn"),
+    ("package-lock.json", "npm"),
+    ("npm-shrinkwrap.json", "npm"),
+)
+
+# Monorepo detection: root files/directories that suggest services live in subdirectories
+MONOREPO_MARKER_FILES = ("pnpm-workspace.yaml", "lerna.json", "nx.json", "turbo.json")
+MONOREPO_DIRS = {"services", "apps", "packages", "backend", "frontend"}
+
+SERVICE_MANIFESTS = ("package.json", "requirements.txt", "pom.xml")
+IGNORED_DIRS = {"node_modules", "vendor", "dist", "build", "venv", "__pycache__", "test", "tests", "examples", "docs"}
+MAX_SERVICE_DEPTH = 3
+MAX_SERVICES = 20
+
+def has_root_app(stack_info: dict) -> bool:
+    """
+    Whether the repo root is an app of its own (a root manifest), next to any monorepo services.
+    Workspace roots (npm/pnpm workspaces, lerna, nx, turbo) only tie the services together.
+    """
+    return stack_info.get("language") not in (None, "unknown") and not stack_info.get("workspace_root")
+
 
 class RepoAnalyzer:
-    def analyze(self, token: str, owner: str, repo: str) -> dict:
+    async def analyze(self, token: str, owner: str, repo: str, ref: Optional[str] = None) -> dict:
         """
         Scans the repository to infer the tech stack.
         Checks for root-level files like package.json, requirements.txt, Dockerfile.
+        Monorepos also get a "services" list: one stack per service directory, with its "path".
+        "workspace_root" marks roots that only tie services together (see has_root_app).
+        Results are cached per repo until a push to the default branch invalidates them.
+        With `ref` (a commit SHA) the repo is read at that commit, and the result never goes stale.
         """
+        cached = repo_cache.get(ANALYSIS, token, owner, repo, ref=ref)
+        if cached is not MISS:
+            return copy.deepcopy(cached)
+
+        stack_info = await self._analyze(token, owner, repo, ref)
+        repo_cache.set(ANALYSIS, token, owner, repo, stack_info, ref=ref)
+        # Deep copies: callers edit the result (and its "services" list), the cached one must not change
+        return copy.deepcopy(stack_info)
+
+    async def _analyze(self, token: str, owner: str, repo: str, ref: Optional[str] = None) -> dict:
         # We need to list the root directory contents
         # get_repo_contents with path="" returns valid array if root exists
-        contents = github_client.get_repo_contents(token, owner, repo, "")
+        contents = await github_client.get_repo_contents(token, owner, repo, "", ref=ref)
         
+        if not contents or not isinstance(contents, list):
+             return self.empty_stack()
+             
+        file_names = [item["name"] for item in contents if item["type"] == "file"]
+        stack_info = self._detect_stack(file_names)
+        
+        package_json = None
+        if stack_info["language"] == "javascript":
+            # Check for test script
+            package_json = await self._check_node_test_script(token, owner, repo, stack_info, ref=ref)
+
+        dir_names = {item["name"] for item in contents if item["type"] == "dir"}
+        if self._is_workspace_root(file_names, package_json):
+            stack_info["workspace_root"] = True
+        if self._looks_like_monorepo(stack_info, file_names, dir_names, package_json):
+            services = await self._find_services(token, owner, repo, ref)
+            if services:
+                stack_info["services"] = services
+
+        return stack_info
+
+    def empty_stack(self) -> dict:
+        """What a repo without any files (e.g. an empty repo) is detected as."""
+        return self._detect_stack([])
+
+    def _detect_stack(self, file_names: List[str]) -> dict:
+        """Infers the stack of one directory from the names of the files in it."""
         stack_info = {
             "language": "unknown",
             "framework": "unknown",
             "has_dockerfile": False,
             "dependency_file": None,
-            "detected_files": [],
-            "has_test_script": False
+            "detected_files": file_names,
+            "has_test_script": False,
+            "has_lint_script": False,
+            "workspace_root": False,
+            "package_manager": None,
+            "lockfile": None
         }
         
-        if not contents or not isinstance(contents, list):
-             return stack_info
-             
-        file_names = [item["name"] for item in contents if item["type"] == "file"]
-        stack_info["detected_files"] = file_names
-        
         if "Dockerfile" in file_names:
             stack_info["has_dockerfile"] = True
             
@@ -36,15 +104,21 @@ class RepoAnalyzer:
             # Could read package.json content to check for "next", "react", "express" etc.
             # For hackathon, assuming nodejs usage.
             stack_info["framework"] = "node" 
-            
-            # Check for test script
-            self._check_node_test_script(token, owner, repo, stack_info)
+            stack_info["package_manager"] = "npm"
+            # The lockfile decides the install command and what the CI dependency cache is keyed on
+            for lockfile, manager in NODE_LOCKFILES:
+                if lockfile in file_names:
+                    stack_info["package_manager"] = manager
+                    stack_info["lockfile"] = lockfile
+                    break
             
         elif "requirements.txt" in file_names:
             stack_info["language"] = "python"
             stack_info["dependency_file"] = "requirements.txt"
             # Could read requirements.txt to check for "fastapi", "django", "flask"
             stack_info["framework"] = "python-generic"
+            stack_info["package_manager"] = "pip"
+            stack_info["lockfile"] = "requirements.txt"
             
         elif "pom.xml" in file_names:
             stack_info["language"] = "java"
@@ -52,18 +126,81 @@ class RepoAnalyzer:
 
         return stack_info
 
-    def _check_node_test_script(self, token: str, owner: str, repo: str, stack_info: dict):
-        """Helper to check if package.json has a test script."""
+    def _looks_like_monorepo(self, stack_info: dict, file_names: List[str], dir_names: set, package_json: Optional[dict]) -> bool:
+        """
+        Cheap check on the root listing, so single-service repos never pay for the recursive tree.
+        """
+        if self._is_workspace_root(file_names, package_json):
+            return True
+        if dir_names & MONOREPO_DIRS:
+            return True
+        # No manifest at the root: the code probably lives in subdirectories
+        return stack_info["language"] == "unknown" and bool(dir_names)
+
+    def _is_workspace_root(self, file_names: List[str], package_json: Optional[dict]) -> bool:
+        if package_json and package_json.get("workspaces"):
+            return True
+        return any(name in file_names for name in MONOREPO_MARKER_FILES)
+
+    async def _find_services(self, token: str, owner: str, repo: str, ref: Optional[str] = None) -> List[dict]:
+        """
+        Finds service directories (a manifest below the root) with one recursive tree call,
+        and detects each one's stack. Services nested inside another service are skipped.
+        """
+        tree = await github_client.get_repo_tree(token, owner, repo, ref=ref)
+        if not tree:
+            return []
+
+        files_by_dir: Dict[str, List[str]] = {}
+        for entry in tree:
+            if entry["type"] != "blob":
+                continue
+            directory, _, name = entry["path"].rpartition("/")
+            files_by_dir.setdefault(directory, []).append(name)
+
+        service_dirs = []
+        for directory in sorted(files_by_dir):
+            parts = directory.split("/")
+            if not directory or len(parts) > MAX_SERVICE_DEPTH:
+                continue
+            if any(part in IGNORED_DIRS or part.startswith(".") for part in parts):
+                continue
+            if not any(name in files_by_dir[directory] for name in SERVICE_MANIFESTS):
+                continue
+            if any(directory.startswith(parent + "/") for parent in service_dirs):
+                continue
+            service_dirs.append(directory)
+            if len(service_dirs) >= MAX_SERVICES:
+                break
+
+        async def detect(directory: str) -> dict:
+            service = self._detect_stack(files_by_dir[directory])
+            service["path"] = directory
+            if service["lockfile"]:
+                service["lockfile"] = f"{directory}/{service['lockfile']}"
+            if service["language"] == "javascript":
+                await self._check_node_test_script(token, owner, repo, service, f"{directory}/package.json", ref)
+            return service
+
+        return list(await asyncio.gather(*(detect(d) for d in service_dirs)))
+
+    async def _check_node_test_script(self, token: str, owner: str, repo: str, stack_info: dict,
+                                      path: str = "package.json", ref: Optional[str] = None) -> Optional[dict]:
+        """Helper to check if package.json has test/lint scripts. Returns the parsed package.json."""
         try:
-            pkg_data = github_client.get_repo_contents(token, owner, repo, "package.json")
+            pkg_data = await github_client.get_repo_contents(token, owner, repo, path, ref=ref)
             if pkg_data and "content" in pkg_data:
                 content_str = base64.b64decode(pkg_data["content"]).decode("utf-8")
                 pkg_json = json.loads(content_str)
                 scripts = pkg_json.get("scripts", {})
                 if "test" in scripts:
                     stack_info["has_test_script"] = True
+                if "lint" in scripts:
+                    stack_info["has_lint_script"] = True
+                return pkg_json
         except Exception as e:
-            print(f"Error checking package.json: {e}")
+            print(f"Error checking {path}: {e}")
             # Fail safe, assume false
+        return None
 
 repo_analyzer = RepoAnalyzer()
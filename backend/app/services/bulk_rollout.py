@@ -0,0 +1,254 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.analyzer import repo_analyzer
+from app.services.cd_generator import CDWorkflowGenerator
+from app.services.generator import workflow_generator
+from app.services.github import github_client
+from app.services.rate_limit import priority_scope, BACKGROUND
+from app.services.secrets import GitHubSecretsService
+from app.services.session_store import session_store, BULK_JOB
+from app.services.token_hash import hash_token
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+# The worker running the job died or restarted before finishing it
+INTERRUPTED = "interrupted"
+
+# This process, as the owner of the jobs it runs (pids get reused across restarts, this doesn't)
+WORKER_ID = uuid.uuid4().hex[:12]
+
+
+class BulkRolloutJob:
+    """One bulk rollout: the same pipeline (and optionally AKS secrets + CD) applied to many repos."""
+
+    def __init__(self, token: str, repos: List[dict], steps: Optional[List[str]], deployment: Optional[dict],
+                 message: Optional[str], created_by: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        # Only a hash of the token is kept, to check that polls/retries come from the same user
+        self.owner_hash = hash_token(token)
+        self.created_by = created_by
+        self.created_at = time.time()
+        self.finished_at = None
+        self.steps = steps
+        # Non-secret deployment settings only; the Azure credentials are passed to each run
+        self.deployment = {k: v for k, v in deployment.items() if k != "azure_credentials"} if deployment else None
+        self.message = message
+        self.items = [
+            {"owner": r["owner"], "repo": r["repo"], "status": PENDING, "stage": None,
+             "error": None, "commit": None, "noop": None, "attempts": 0}
+            for r in repos
+        ]
+        self.task: Optional[asyncio.Task] = None
+        # Status, owner and last save of the worker running the job, for jobs loaded from the session store
+        self.stored_status: Optional[str] = None
+        self.stored_owner: Optional[str] = None
+        self.updated_at: Optional[float] = None
+
+    @classmethod
+    def from_state(cls, state: dict) -> "BulkRolloutJob":
+        """A job another worker started, rebuilt from its stored state (see BulkRolloutService._save)."""
+        job = cls.__new__(cls)
+        job.id = state["job_id"]
+        job.owner_hash = state["owner_hash"]
+        job.created_by = state["created_by"]
+        job.created_at = state["created_at"]
+        job.finished_at = state["finished_at"]
+        job.steps = state["steps"]
+        job.deployment = state["deployment"]
+        job.message = state["message"]
+        job.items = state["items"]
+        job.task = None
+        job.stored_status = state["status"]
+        job.stored_owner = state.get("owner")
+        job.updated_at = state.get("updated_at")
+        return job
+
+    @property
+    def status(self) -> str:
+        if self.task is not None and not self.task.done():
+            return RUNNING
+        if self.task is None and self.stored_status == RUNNING:
+            # Running elsewhere as long as that worker keeps saving it
+            # (a job this worker owns but doesn't hold in memory can't be running anymore)
+            fresh = self.updated_at and time.time() - self.updated_at < settings.BULK_STALE_AFTER_SECONDS
+            if fresh and self.stored_owner != WORKER_ID:
+                return RUNNING
+            return INTERRUPTED
+        if any(item["status"] == FAILED for item in self.items):
+            return FAILED
+        return SUCCEEDED
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        counts = {PENDING: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for item in self.items:
+            counts[item["status"]] += 1
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_by": self.created_by,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "total": len(self.items),
+            "progress": counts,
+        }
+        if include_items:
+            data["items"] = self.items
+        return data
+
+    def state(self) -> dict:
+        """Everything needed to show (and retry) the job from another worker. No credentials."""
+        return {**self.to_dict(), "owner_hash": self.owner_hash, "steps": self.steps,
+                "deployment": self.deployment, "message": self.message,
+                "owner": WORKER_ID, "updated_at": time.time()}
+
+
+class BulkRolloutService:
+    """
+    Runs bulk rollouts in the background with bounded concurrency.
+    Every GitHub call made by a rollout runs at background priority, so the rate limiter
+    keeps interactive users ahead of it and paces it to the token's remaining budget.
+    Progress is also written to the session store, so with SESSION_STORE=sqlite a poll or retry
+    that lands on another uvicorn worker still finds the job.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, BulkRolloutJob]" = OrderedDict()
+
+    def start(self, token: str, repos: List[dict], steps: Optional[List[str]] = None,
+              deployment: Optional[dict] = None, message: Optional[str] = None,
+              created_by: Optional[str] = None) -> BulkRolloutJob:
+        job = BulkRolloutJob(token, repos, steps, deployment, message, created_by)
+        self._jobs[job.id] = job
+        self._evict()
+        azure_creds = deployment["azure_credentials"] if deployment else None
+        job.task = asyncio.create_task(self._run(job, token, job.items, azure_creds))
+        self._save(job, token)
+        return job
+
+    def get(self, job_id: str, token: str) -> BulkRolloutJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            # Started by another worker (or before a restart, with the sqlite store)
+            state = session_store.get(f"{BULK_JOB}:{job_id}", token)
+            job = BulkRolloutJob.from_state(state) if state else None
+        if not job or job.owner_hash != hash_token(token):
+            raise HTTPException(status_code=404, detail="Rollout job not found")
+        return job
+
+    def _save(self, job: BulkRolloutJob, token: str):
+        session_store.set(f"{BULK_JOB}:{job.id}", token, job.state())
+
+    def retry(self, job_id: str, token: str, azure_creds: Optional[str] = None) -> BulkRolloutJob:
+        """
+        Re-runs only the repos that failed, plus the ones an interrupted job never finished.
+        Jobs with a deployment need the Azure credentials again.
+        """
+        job = self.get(job_id, token)
+        status = job.status
+        if status == RUNNING:
+            raise HTTPException(status_code=409, detail="Rollout job is still running")
+
+        unfinished = (FAILED, PENDING, RUNNING) if status == INTERRUPTED else (FAILED,)
+        failed = [item for item in job.items if item["status"] in unfinished]
+        if not failed:
+            return job
+        if job.deployment and not azure_creds:
+            raise HTTPException(status_code=400, detail="azure_credentials are required to retry a deployment rollout")
+        for item in failed:
+            item.update(status=PENDING, stage=None, error=None)
+        job.finished_at = None
+        # A job loaded from the store runs here from now on
+        job.stored_status = job.stored_owner = job.updated_at = None
+        self._jobs[job.id] = job
+        self._evict()
+        job.task = asyncio.create_task(self._run(job, token, failed, azure_creds))
+        self._save(job, token)
+        return job
+
+    def _evict(self):
+        # Keep the most recent jobs only; never drop one that's still running
+        excess = len(self._jobs) - settings.BULK_MAX_JOBS
+        for job_id in [i for i, job in self._jobs.items() if job.status != RUNNING][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    async def _run(self, job: BulkRolloutJob, token: str, items: List[dict], azure_creds: Optional[str]):
+        semaphore = asyncio.Semaphore(settings.BULK_ROLLOUT_CONCURRENCY)
+
+        async def run_item(item: dict):
+            async with semaphore:
+                item["status"] = RUNNING
+                item["attempts"] += 1
+                try:
+                    with priority_scope(BACKGROUND):
+                        await self._rollout_repo(job, token, item, azure_creds)
+                    item["status"] = SUCCEEDED
+                except HTTPException as e:
+                    item["status"], item["error"] = FAILED, f"{e.status_code}: {e.detail}"
+                except Exception as e:
+                    item["status"], item["error"] = FAILED, str(e)
+                self._save(job, token)
+
+        async def heartbeat():
+            # Repos can take long (rate limits), keep telling other workers the job is alive
+            while True:
+                await asyncio.sleep(settings.BULK_HEARTBEAT_SECONDS)
+                self._save(job, token)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            await asyncio.gather(*(run_item(item) for item in items))
+        finally:
+            beat.cancel()
+            job.finished_at = time.time()
+            job.task = None  # done: status now comes from the items (and the saved state says so)
+            self._save(job, token)
+
+    async def _rollout_repo(self, job: BulkRolloutJob, token: str, item: dict, azure_creds: Optional[str]):
+        owner, repo = item["owner"], item["repo"]
+
+        item["stage"] = "analyze"
+        stack, head = await asyncio.gather(
+            repo_analyzer.analyze(token, owner, repo),
+            github_client.get_branch_head(token, owner, repo)
+        )
+
+        item["stage"] = "generate"
+        steps = job.steps or workflow_generator.suggest_steps(stack)
+        files = {".github/workflows/ci.yml": workflow_generator.generate_yaml(steps, stack)}
+
+        if job.deployment:
+            d = job.deployment
+            files[".github/workflows/cd.yml"] = CDWorkflowGenerator().generate_aks_cd(
+                acr_name=d["acr_name"],
+                aks_cluster=d["aks_cluster"],
+                resource_group=d["resource_group"],
+                stack=stack
+            )
+
+            item["stage"] = "secrets"
+            await GitHubSecretsService(token).setup_deployment_secrets(
+                owner=owner,
+                repo=repo,
+                azure_creds=azure_creds,
+                acr_name=d["acr_name"],
+                aks_cluster=d["aks_cluster"],
+                resource_group=d["resource_group"]
+            )
+
+        item["stage"] = "commit"
+        message = job.message or "Add CI/CD pipelines generated by Hackathon Backend"
+        result = await github_client.commit_files(token, owner, repo, files, message, head=head)
+        item["commit"], item["noop"] = result["commit"], result["noop"]
+        item["stage"] = None
+
+
+bulk_rollout_service = BulkRolloutService()
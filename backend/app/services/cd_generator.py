@@ -1,56 +1,148 @@
+import re
+
+from app.services.analyzer import has_root_app
+
 class CDWorkflowGenerator:
+    def generate_dockerfile(self, stack: dict = None) -> str:
+        """
+        Returns a simple default Dockerfile for the detected language.
+        Used when the repo has no Dockerfile of its own.
+        """
+        language = stack.get("language") if stack else "unknown"
+
+        if language == "javascript" or (stack and stack.get("framework") == "node"):
+            # npm ci when there's a package-lock, so the install layer only changes with the lockfile
+            install = "npm ci" if stack and stack.get("lockfile") == "package-lock.json" else "npm install"
+            return f"""FROM node:18-alpine
+WORKDIR /app
+COPY package*.json ./
+RUN {install}
+COPY . .
+EXPOSE 3000
+CMD ["npm", "start"]"""
+        elif language == "python":
+            return """FROM python:3.11-slim
+WORKDIR /app
+COPY requirements.txt .
+RUN pip install --no-cache-dir -r requirements.txt
+COPY . .
+CMD ["python", "app/main.py"]""" # Best guess
+        else:
+             # Fallback generic
+            return """FROM alpine:latest
+CMD ["echo", "No specific language detected for Dockerfile"]"""
+
     def generate_aks_cd(self, acr_name: str, aks_cluster: str, resource_group: str, branch: str = "main", stack: dict = None) -> str:
         """
         Generates a GitHub Actions workflow for building a Docker image and deploying to AKS.
         Assuming strict usage of GitHub Secrets: AZURE_CREDENTIALS, ACR_NAME, AKS_CLUSTER, RESOURCE_GROUP
+        Monorepos (stack["services"]) get one build + deploy job per service with a Dockerfile, each
+        run only when the service's directory changed, plus the root app when it has a Dockerfile.
+        Without any service Dockerfile only the root is deployed, like a single-service repo.
         """
-        
+        # Only services with their own Dockerfile are deployable (the rest are usually libraries)
+        services = [service for service in (stack or {}).get("services") or [] if service.get("has_dockerfile")]
+        if services:
+            names = self._service_names(services)
+            jobs = self._changes_job(names) + "\n".join(
+                self._deploy_job(
+                    names[service["path"]], service, context=service["path"], image=names[service["path"]],
+                    gate=names[service["path"]]
+                )
+                for service in services
+            )
+            if has_root_app(stack) and stack.get("has_dockerfile"):
+                jobs += "\n" + self._deploy_job("deploy", stack, context=".", image="app")
+        else:
+            jobs = self._deploy_job("deploy", stack, context=".", image="app")
+
+        workflow_content = f"""name: AKS CD Pipeline
+
+on:
+  push:
+    branches: ["main", "master"]
+
+jobs:
+{jobs}"""
+        return workflow_content
+
+    def _service_names(self, services: list) -> dict:
+        """path -> name usable as job id, image repository and Kubernetes deployment name."""
+        names = {}
+        for service in services:
+            name = re.sub(r"[^a-z0-9]+", "-", service["path"].lower()).strip("-") or "app"
+            if not name[0].isalpha():
+                name = f"svc-{name}"  # job ids must start with a letter ("2024-api/")
+            # "deploy" / "app" are the root's job and image
+            while name in names.values() or name in ("changes", "deploy", "app"):
+                name += "-x"
+            names[service["path"]] = name
+        return names
+
+    def _changes_job(self, names: dict) -> str:
+        outputs = "".join(
+            f"      {name}: ${{{{ steps.filter.outputs.{name} }}}}\n" for name in names.values()
+        )
+        filters = "".join(
+            f"            {name}:\n"
+            f"              - '{path}/**'\n"
+            f"              - '.github/workflows/cd.yml'\n"
+            for path, name in names.items()
+        )
+        return f"""  changes:
+    runs-on: ubuntu-latest
+    outputs:
+{outputs}    steps:
+      - uses: actions/checkout@v4
+      - id: filter
+        uses: dorny/paths-filter@v3
+        with:
+          filters: |
+{filters}
+"""
+
+    def _deploy_job(self, job_id: str, stack: dict, context: str, image: str, gate: str = None) -> str:
+        """One build + push + deploy job. `gate` names the changes-job output that has to be true."""
         # Check if Dockerfile exists
         has_dockerfile = stack.get("has_dockerfile", False) if stack else True
         dockerfile_step = ""
+        dockerfile_path = "Dockerfile" if context == "." else f"{context}/Dockerfile"
         
         if not has_dockerfile:
             # Auto-generate a simple Dockerfile based on language
-            language = stack.get("language") if stack else "unknown"
-            
-            if language == "javascript" or stack.get("framework") == "node":
-                dockerfile_content = """FROM node:18-alpine
-WORKDIR /app
-COPY package*.json ./
-RUN npm install
-COPY . .
-EXPOSE 3000
-CMD [\\"npm\\", \\"start\\"]"""
-            elif language == "python":
-                dockerfile_content = """FROM python:3.11-slim
-WORKDIR /app
-COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
-COPY . .
-CMD [\\"python\\", \\"app/main.py\\"]""" # Best guess
-            else:
-                 # Fallback generic
-                dockerfile_content = """FROM alpine:latest
-CMD [\\"echo\\", \\"No specific language detected for Dockerfile\\"]"""
+            dockerfile_content = self.generate_dockerfile(stack)
 
             dockerfile_content_indented = dockerfile_content.replace("\n", "\n          ")
             dockerfile_step = f"""
       - name: Create Default Dockerfile
         run: |
-          cat <<EOF > Dockerfile
+          cat <<'EOF' > {dockerfile_path}
           {dockerfile_content_indented}
           EOF
 """
 
-        workflow_content = f"""name: AKS CD Pipeline
+        gate_lines = ""
+        cache_scope = ""
+        if gate:
+            gate_lines = f"""    needs: changes
+    if: needs.changes.outputs.{gate} == 'true'
+"""
+            # Separate layer caches per service, otherwise they keep evicting each other
+            cache_scope = f",scope={image}"
 
-on:
-  push:
-    branches: ["main", "master"]
+        # Content key: the source tree of the build context plus the Dockerfile actually used.
+        # Same key => same image, so reruns and commits that don't touch the service reuse it.
+        # For the repo root that's the top-level entries minus .github/, or editing a workflow
+        # (this one included) would count as a code change.
+        if context == ".":
+            source_hash = """git ls-tree HEAD | awk -F'\\t' '$2 != ".github"' | sha256sum | cut -d' ' -f1"""
+        else:
+            source_hash = f"git rev-parse HEAD:{context}"
 
-jobs:
-  deploy:
-    runs-on: ubuntu-latest
+        return f"""  {job_id}:
+{gate_lines}    runs-on: ubuntu-latest
+    env:
+      IMAGE_REPO: ${{{{ secrets.ACR_NAME }}}}.azurecr.io/{image}
     steps: 
       - uses: actions/checkout@v4
 {dockerfile_step}
@@ -62,13 +154,48 @@ jobs:
       - name: Login to ACR
         run: az acr login --name ${{{{ secrets.ACR_NAME }}}}
 
-      - name: Build Docker Image
+      - name: Compute Content Tag
+        id: tags
         run: |
-          docker build -t ${{{{ secrets.ACR_NAME }}}}.azurecr.io/app:latest .
+          SRC=$({source_hash})
+          KEY=$(echo "$SRC $(sha256sum {dockerfile_path} | cut -d' ' -f1)" | sha256sum | cut -c1-16)
+          echo "content_tag=src-$KEY" >> $GITHUB_OUTPUT
 
-      - name: Push Docker Image
+      - name: Check ACR for an Existing Image
+        id: existing
         run: |
-          docker push ${{{{ secrets.ACR_NAME }}}}.azurecr.io/app:latest
+          if az acr repository show --name ${{{{ secrets.ACR_NAME }}}} --image {image}:${{{{ steps.tags.outputs.content_tag }}}} > /dev/null 2>&1; then
+            echo "found=true" >> $GITHUB_OUTPUT
+          else
+            echo "found=false" >> $GITHUB_OUTPUT
+          fi
+
+      - name: Set up Docker Buildx
+        uses: docker/setup-buildx-action@v3
+
+      # Layers are cached in the GitHub Actions cache, so only what changed gets rebuilt
+      - name: Build and Push Docker Image
+        if: steps.existing.outputs.found != 'true'
+        uses: docker/build-push-action@v6
+        with:
+          context: {context}
+          push: true
+          tags: |
+            ${{{{ env.IMAGE_REPO }}}}:${{{{ github.sha }}}}
+            ${{{{ env.IMAGE_REPO }}}}:${{{{ steps.tags.outputs.content_tag }}}}
+          cache-from: type=gha{cache_scope}
+          cache-to: type=gha,mode=max{cache_scope}
+
+      # Same content already in ACR: just add the commit tag, no rebuild or push of layers
+      - name: Tag Existing Image
+        if: steps.existing.outputs.found == 'true'
+        run: docker buildx imagetools create -t $IMAGE_REPO:${{{{ github.sha }}}} $IMAGE_REPO:${{{{ steps.tags.outputs.content_tag }}}}
+
+      - name: Resolve Image Digest
+        id: image
+        run: |
+          DIGEST=$(az acr repository show --name ${{{{ secrets.ACR_NAME }}}} --image {image}:${{{{ github.sha }}}} --query digest -o tsv)
+          echo "ref=$IMAGE_REPO@$DIGEST" >> $GITHUB_OUTPUT
 
       - name: Get AKS Credentials
         run: |
@@ -79,12 +206,19 @@ jobs:
 
       - name: Deploy to AKS
         run: |
-          # Create a simple deployment if not exists (Hackathon shortcut)
-          # In real world, we'd use Helm or existing manifests
-          kubectl create deployment app --image=${{{{ secrets.ACR_NAME }}}}.azurecr.io/app:latest --dry-run=client -o yaml > deployment.yaml
-          kubectl apply -f deployment.yaml
-          
-          # Force restart to pick up new image
-          kubectl rollout restart deployment/app
+          # Deploy by digest, and only roll pods when the digest actually changed
+          IMAGE="${{{{ steps.image.outputs.ref }}}}"
+          if ! kubectl get deployment/{image} > /dev/null 2>&1; then
+            kubectl create deployment {image} --image="$IMAGE"
+          else
+            CURRENT=$(kubectl get deployment/{image} -o jsonpath='{{.spec.template.spec.containers[0].image}}')
+            if [ "$CURRENT" = "$IMAGE" ]; then
+              echo "Image unchanged ($IMAGE), nothing to roll out"
+              exit 0
+            fi
+            kubectl set image deployment/{image} '*'="$IMAGE"
+          fi
+
+          # Waits until the new pods are Ready; the old ones keep serving until then, and the job fails on timeout
+          kubectl rollout status deployment/{image} --timeout=5m
 """
-        return workflow_content
@@ -0,0 +1,106 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from app.config import settings
+
+_MISSING = object()
+
+
+def series_key(metric: dict):
+    return metric["name"], tuple(sorted(metric["labels"].items()))
+
+
+def series_key_json(key) -> dict:
+    return {"name": key[0], "labels": dict(key[1])}
+
+
+def comparable(value):
+    """NaN never equals itself, which would make a NaN sample look changed on every poll."""
+    return "NaN" if value != value else value
+
+
+class DeltaTracker:
+    """
+    Remembers the results of every stream (one endpoint + target) from the last DELTA_RETENTION_SECONDS
+    (at most DELTA_VERSIONS of them) as item key -> value, so a client passing back the cursor it was given gets only the items
+    that changed since then, plus the keys of the ones that disappeared.
+    Identical results share a version (and cursor). Cursors are "<stream id>.<version>": the stream
+    id is random per stream, so a cursor from another target or from before a restart is just unknown,
+    and an unknown or expired cursor gets everything back with "full": true.
+    Streams are only tracked once a client asks for a cursor (passes `since`, even empty): clients
+    that never use cursors don't pay for the snapshots.
+    """
+
+    def __init__(self):
+        self._streams: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _stream(self, stream: tuple) -> dict:
+        state = self._streams.get(stream)
+        if state is None:
+            # versions: version -> (saved at, snapshot)
+            state = self._streams[stream] = {"id": secrets.token_hex(4), "versions": OrderedDict(), "next": 1}
+            while len(self._streams) > settings.DELTA_MAX_STREAMS:
+                self._streams.popitem(last=False)
+        self._streams.move_to_end(stream)
+        return state
+
+    def record(self, stream: tuple, items: List[dict], key: Callable, value: Callable) -> Tuple[str, dict, Optional[dict]]:
+        """Stores this result, returns (cursor, snapshot, stream state) for diff()."""
+        snapshot = {key(item): value(item) for item in items}
+        with self._lock:
+            state = self._stream(stream)
+            versions = state["versions"]
+            now = time.monotonic()
+            if versions and versions[next(reversed(versions))][1] == snapshot:
+                version = next(reversed(versions))
+                # Still what clients see now: keep it as long as a fresh result would be
+                versions[version] = (now, snapshot)
+            else:
+                version = state["next"]
+                state["next"] += 1
+                versions[version] = (now, snapshot)
+                while len(versions) > settings.DELTA_VERSIONS:
+                    versions.popitem(last=False)
+            # Oldest first; the latest version always stays
+            cutoff = now - settings.DELTA_RETENTION_SECONDS
+            while len(versions) > 1 and next(iter(versions.values()))[0] < cutoff:
+                versions.popitem(last=False)
+            return f"{state['id']}.{version}", snapshot, state
+
+    def changes(self, stream: tuple, items: List[dict], since: Optional[str], key: Callable,
+                value: Callable, key_json: Callable = lambda k: k) -> Tuple[Optional[str], Optional[dict]]:
+        """
+        (cursor, delta) for `items`: {"cursor", "since", "full", "changed", "removed"}.
+        With an empty or unknown `since` "changed" is everything. Without `since`, (None, None)
+        unless some client already follows this stream.
+        """
+        if since is None:
+            with self._lock:
+                if stream not in self._streams:
+                    return None, None
+        cursor, snapshot, state = self.record(stream, items, key, value)
+        base = None
+        if since:
+            stream_id, _, version = since.partition(".")
+            with self._lock:
+                if stream_id == state["id"] and version.isdigit():
+                    base = state["versions"].get(int(version), (None, None))[1]
+        if base is None:
+            return cursor, {"cursor": cursor, "since": since, "full": True, "changed": items, "removed": []}
+        changed = [item for item in items if base.get(key(item), _MISSING) != value(item)]
+        removed = [key_json(k) for k in base if k not in snapshot]
+        return cursor, {"cursor": cursor, "since": since, "full": False, "changed": changed, "removed": removed}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "streams": len(self._streams),
+                "versions": sum(len(s["versions"]) for s in self._streams.values())
+            }
+
+
+delta_tracker = DeltaTracker()
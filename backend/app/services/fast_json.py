@@ -0,0 +1,89 @@
+import hashlib
+import json
+import math
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is a few times slower but gives the same output
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Lines per write when streaming NDJSON: big enough for few writes, small enough to start flowing right away
+NDJSON_CHUNK_LINES = 500
+
+
+def finite(obj):
+    """NaN/Inf (valid Prometheus values) become null, like orjson does."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [finite(v) for v in obj]
+    return obj
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    try:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+    except ValueError:
+        return json.dumps(finite(obj), separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x" (proxies may weaken the tag when they compress)
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def json_response(request: Request, payload, headers: Optional[dict] = None) -> Response:
+    """
+    `payload` encoded with orjson (stdlib json without it) and tagged with an ETag of the body.
+    A request whose If-None-Match has that tag gets an empty 304 instead.
+    Returning a Response also skips FastAPI's jsonable_encoder pass over every sample.
+    """
+    body = dumps(payload)
+    etag = etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def wants_ndjson(request: Request, fmt: Optional[str]) -> bool:
+    if fmt:
+        return fmt == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_lines(items: Iterable):
+    lines = []
+    for item in items:
+        lines.append(dumps(item))
+        if len(lines) >= NDJSON_CHUNK_LINES:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def ndjson_response(items: Iterable, headers: Optional[dict] = None) -> StreamingResponse:
+    """
+    One JSON document per line, encoded while the response is being sent, so the client gets the
+    first series before the last one is serialized. No ETag: that would need the whole body first.
+    """
+    return StreamingResponse(_ndjson_lines(items), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -1,97 +1,352 @@
+import copy
+import re
 import yaml
+from functools import lru_cache
 from typing import List
+from app.config import settings
+from app.services.analyzer import has_root_app
+from app.services.instrumentation import timed, yaml_render_duration
+
+
+class _Literal(str):
+    """A string emitted as a YAML literal block (|), for embedded YAML/scripts that should stay readable."""
+
+
+class _PyDumper(yaml.Dumper):
+    pass
+
+
+# LibYAML's emitter when it's installed, ~4x faster than the pure-Python Dumper
+class _FastDumper(getattr(yaml, "CDumper", yaml.Dumper)):
+    pass
+
+
+def _represent_literal(dumper, data):
+    return dumper.represent_scalar("tag:yaml.org,2002:str", data, style="|")
+
+
+for _dumper_class in (_PyDumper, _FastDumper):
+    _dumper_class.add_representer(_Literal, _represent_literal)
+
+# Steps generate_yaml understands, in the order they end up in the job. Anything else is ignored.
+STEP_ORDER = ("checkout", "install_deps", "lint", "run_tests", "docker_build", "push_image")
+
+MAX_TEST_SHARDS = 16
+
+# Every stack_info field the CI template reads. Keep in sync with _build_workflow,
+# it only gets to see these (that's what the render cache is keyed on).
+STACK_FIELDS = ("language", "has_test_script", "package_manager", "lockfile", "has_dockerfile", "workspace_root")
+# ...and per monorepo service (stack_info["services"], each also has a "path")
+SERVICE_FIELDS = STACK_FIELDS + ("has_lint_script",)
+
+# Lockfile-respecting installs (only used when the lockfile exists)
+INSTALL_COMMANDS = {
+    "npm": "npm ci",
+    "yarn": "yarn install --frozen-lockfile",
+    "pnpm": "pnpm install --frozen-lockfile",
+}
+
+def _has_multiline(value) -> bool:
+    if isinstance(value, str):
+        return "\n" in value
+    if isinstance(value, dict):
+        return any(_has_multiline(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_multiline(v) for v in value)
+    return False
 
 class WorkflowGenerator:
-    def generate_yaml(self, steps: List[str], stack_info: dict) -> str:
+    def __init__(self):
+        # The visual editor previews on every drag, so rendered workflows are memoized
+        self._render = lru_cache(maxsize=settings.WORKFLOW_CACHE_SIZE)(self._render_uncached)
+
+    def suggest_steps(self, stack_info: dict) -> List[str]:
+        """
+        Default pipeline steps for a detected stack.
+        """
+        steps = ["checkout", "install_deps"]
+
+        # Monorepos: suggest a step when any service can use it
+        stacks = [stack_info] + (stack_info.get("services") or [])
+
+        if any(stack.get("has_lint_script") for stack in stacks):
+            steps.append("lint")
+
+        steps.append("run_tests")
+
+        if any(stack["has_dockerfile"] for stack in stacks):
+            steps.append("docker_build")
+
+        return steps
+
+    def generate_yaml(self, steps: List[str], stack_info: dict, parallel_jobs: bool = False, test_shards: int = 1) -> str:
         """
         Generates a GitHub Actions YAML based on the ordered list of steps and stack info.
+        - parallel_jobs: run lint / test / build as separate jobs instead of one serial job
+        - test_shards: split the tests across this many matrix jobs (implies parallel_jobs)
+        Monorepos (stack_info["services"]) get one job per service instead, run only when the
+        service's directory changed, plus a "build" job for the root when it's an app of its
+        own (has_root_app); the parallelism options don't apply there.
         """
-        job_steps = []
-        
-        # Always checkout code
-        if "checkout" in steps:
-            job_steps.append({
-                "uses": "actions/checkout@v4"
-            })
-            
-        # Install Dependencies
-        if "install_deps" in steps:
-            if stack_info["language"] == "python":
-                job_steps.append({
-                    "name": "Set up Python",
-                    "uses": "actions/setup-python@v4",
-                    "with": {"python-version": "3.11"}
-                })
-                job_steps.append({
-                    "name": "Install Dependencies",
-                    "run": "pip install -r requirements.txt"
-                })
-            elif stack_info["language"] == "javascript":
-                job_steps.append({
-                    "name": "Set up Node",
-                    "uses": "actions/setup-node@v4",
-                    "with": {"node-version": "18"}
-                })
-                job_steps.append({
-                    "name": "Install Dependencies",
-                    "run": "npm install"
-                })
-                
-        # Run Tests
-        if "run_tests" in steps:
-            if stack_info["language"] == "python":
-                job_steps.append({
+        step_key = tuple(step for step in STEP_ORDER if step in steps)
+        fingerprint = tuple(stack_info.get(field) for field in STACK_FIELDS)
+        services = tuple(
+            (service["path"], tuple(service.get(field) for field in SERVICE_FIELDS))
+            for service in stack_info.get("services") or ()
+        )
+        test_shards = max(1, min(int(test_shards), MAX_TEST_SHARDS))
+        with timed(yaml_render_duration):
+            return self._render(step_key, fingerprint, services, parallel_jobs or test_shards > 1, test_shards)
+
+    def _render_uncached(self, steps: tuple, fingerprint: tuple, services: tuple, parallel_jobs: bool, test_shards: int) -> str:
+        stack_info = dict(zip(STACK_FIELDS, fingerprint))
+        if services:
+            stack_info["services"] = [dict(zip(SERVICE_FIELDS, values), path=path) for path, values in services]
+        workflow = self._build_workflow(steps, stack_info, parallel_jobs, test_shards)
+        # LibYAML folds long double-quoted scalars (multi-line scripts) differently,
+        # so those workflows keep the pure-Python emitter to stay byte-identical.
+        dumper = _PyDumper if _has_multiline(workflow) else _FastDumper
+        return yaml.dump(workflow, Dumper=dumper, sort_keys=False, default_flow_style=False)
+
+    def _build_workflow(self, steps, stack_info: dict, parallel_jobs: bool = False, test_shards: int = 1) -> dict:
+        if stack_info.get("services"):
+            jobs = self._service_jobs(steps, stack_info["services"])
+            if has_root_app(stack_info):
+                # Runs on every push: any change outside the services is a change to the root app
+                root_steps = [{"uses": "actions/checkout@v4"}] if "checkout" in steps else []
+                if "install_deps" in steps:
+                    root_steps += self._install_steps(stack_info)
+                if "lint" in steps:
+                    root_steps += self._lint_steps(stack_info)
+                if "run_tests" in steps:
+                    root_steps += self._test_steps(stack_info)
+                if stack_info.get("has_dockerfile"):
+                    root_steps += self._build_steps(steps)
+                jobs["build"] = {"name": "(root)", "runs-on": "ubuntu-latest", "steps": root_steps}
+            return self._workflow(jobs)
+
+        checkout = [{"uses": "actions/checkout@v4"}] if "checkout" in steps else []
+        install = self._install_steps(stack_info) if "install_deps" in steps else []
+        lint = self._lint_steps(stack_info) if "lint" in steps else []
+        tests = self._test_steps(stack_info, test_shards) if "run_tests" in steps else []
+        build = self._build_steps(steps)
+
+        if not parallel_jobs:
+            jobs = {
+                "build": {
+                    "runs-on": "ubuntu-latest",
+                    "steps": checkout + install + lint + tests + build
+                }
+            }
+        else:
+            # Lint, test and build start together; only pushing an image waits for the checks.
+            # Every job gets its own copies of the shared steps, otherwise yaml.dump emits anchors.
+            jobs = {}
+            if lint:
+                jobs["lint"] = {"runs-on": "ubuntu-latest", "steps": copy.deepcopy(checkout + install) + lint}
+            if tests:
+                jobs["test"] = {"runs-on": "ubuntu-latest"}
+                if test_shards > 1 and self._can_shard(stack_info):
+                    jobs["test"]["strategy"] = {
+                        # Let every shard finish so one run shows all failures
+                        "fail-fast": False,
+                        "matrix": {"shard": list(range(1, test_shards + 1))}
+                    }
+                jobs["test"]["steps"] = copy.deepcopy(checkout + install) + tests
+            if build:
+                jobs["build"] = {"runs-on": "ubuntu-latest"}
+                needs = [job for job in ("lint", "test") if job in jobs]
+                if "push_image" in steps and needs:
+                    jobs["build"]["needs"] = needs
+                jobs["build"]["steps"] = copy.deepcopy(checkout) + build
+            if not jobs:
+                jobs["build"] = {"runs-on": "ubuntu-latest", "steps": checkout + install}
+
+        return self._workflow(jobs)
+
+    def _workflow(self, jobs: dict) -> dict:
+        return {
+            "name": "CI Pipeline",
+            "on": ["push"],
+            # A newer push to the same branch supersedes a run that's still going
+            "concurrency": {
+                "group": "${{ github.workflow }}-${{ github.ref }}",
+                "cancel-in-progress": True
+            },
+            "jobs": jobs
+        }
+
+    def _can_shard(self, stack_info: dict) -> bool:
+        return stack_info["language"] == "python" or (
+            stack_info["language"] == "javascript" and stack_info.get("has_test_script", False)
+        )
+
+    def _lint_steps(self, stack_info: dict) -> List[dict]:
+        if stack_info["language"] == "python":
+            return [{"name": "Lint", "run": "pip install ruff && ruff check ."}]
+        if stack_info["language"] == "javascript":
+            return [{"name": "Lint", "run": "npm run lint --if-present"}]
+        return []
+
+    def _test_steps(self, stack_info: dict, test_shards: int = 1) -> List[dict]:
+        sharded = test_shards > 1 and self._can_shard(stack_info)
+
+        if stack_info["language"] == "python":
+            if sharded:
+                # pytest-split spreads the test files evenly over the matrix shards
+                return [
+                    {"name": "Install pytest-split", "run": "pip install pytest-split"},
+                    {"name": "Run Tests", "run": f"pytest --splits {test_shards} --group ${{{{ matrix.shard }}}}"}
+                ]
+            return [{
+                "name": "Run Tests",
+                "run": "pytest"
+            }]
+
+        if stack_info["language"] == "javascript":
+            has_test = stack_info.get("has_test_script", False)
+            if has_test:
+                if sharded:
+                    # Jest's built-in sharding (jest >= 28)
+                    return [{"name": "Run Tests", "run": f"npm test -- --shard=${{{{ matrix.shard }}}}/{test_shards}"}]
+                return [{
                     "name": "Run Tests",
-                    "run": "pytest"
-                })
-            elif stack_info["language"] == "javascript":
-                has_test = stack_info.get("has_test_script", False)
-                if has_test:
-                     job_steps.append({
-                        "name": "Run Tests",
-                        "run": "npm test"
-                    })
-                else:
-                    # Adaptive fallback: Check at runtime if we can run tests
-                    # This prevents the pipeline from failing on "missing script: test"
-                    job_steps.append({
-                        "name": "Run Tests (optional)",
-                        "run": """if npm run | grep -q "test"; then
+                    "run": "npm test"
+                }]
+            # Adaptive fallback: Check at runtime if we can run tests
+            # This prevents the pipeline from failing on "missing script: test"
+            return [{
+                "name": "Run Tests (optional)",
+                "run": """if npm run | grep -q "test"; then
   npm test
 else
   echo "No test script found, skipping tests"
 fi"""
-                    })
+            }]
+
+        return []
+
+    def _service_jobs(self, steps, services: List[dict]) -> dict:
+        """
+        One job per monorepo service, working in the service's directory. A "changes" job runs
+        dorny/paths-filter first, and each service job only runs when its directory changed
+        (or the workflow itself did).
+        """
+        job_ids = {}
+        for service in services:
+            job_id = re.sub(r"[^A-Za-z0-9_]", "_", service["path"])
+            if not re.match(r"[A-Za-z_]", job_id):
+                job_id = f"svc_{job_id}"  # job ids must start with a letter or _ ("2024-api/")
+            while job_id in job_ids.values() or job_id in ("changes", "build"):
+                job_id += "_"
+            job_ids[service["path"]] = job_id
+
+        filters = "".join(
+            f"{job_id}:\n  - '{path}/**'\n  - '.github/workflows/ci.yml'\n"
+            for path, job_id in job_ids.items()
+        )
+        jobs = {
+            "changes": {
+                "runs-on": "ubuntu-latest",
+                "outputs": {job_id: f"${{{{ steps.filter.outputs.{job_id} }}}}" for job_id in job_ids.values()},
+                "steps": [
+                    {"uses": "actions/checkout@v4"},
+                    {"id": "filter", "uses": "dorny/paths-filter@v3", "with": {"filters": _Literal(filters)}}
+                ]
+            }
+        }
+
+        for service in services:
+            path, job_id = service["path"], job_ids[service["path"]]
+            job_steps = []
+            if "checkout" in steps:
+                job_steps.append({"uses": "actions/checkout@v4"})
+            if "install_deps" in steps:
+                job_steps.extend(self._install_steps(service))
+            if "lint" in steps:
+                job_steps.extend(self._lint_steps(service))
+            if "run_tests" in steps:
+                job_steps.extend(self._test_steps(service))
+            if service.get("has_dockerfile"):
+                job_steps.extend(self._build_steps(steps, context=path, tag=self._image_name(job_id), cache_scope=job_id))
+
+            jobs[job_id] = {
+                "name": path,
+                "needs": "changes",
+                "if": f"needs.changes.outputs.{job_id} == 'true'",
+                "runs-on": "ubuntu-latest",
+                # run: steps execute in the service directory (uses: steps get explicit paths)
+                "defaults": {"run": {"working-directory": path}},
+                "steps": job_steps
+            }
+
+        return jobs
+
+    def _image_name(self, job_id: str) -> str:
+        # Image names are lowercase alphanumerics joined by separators, no leading/trailing "_"
+        return re.sub(r"[^a-z0-9]+", "-", job_id.lower()).strip("-") or "app"
+
+    def _build_steps(self, steps, context: str = ".", tag: str = "my-app", cache_scope: str = None) -> List[dict]:
+        build = []
 
         # Docker Build
         if "docker_build" in steps:
-            # Simple docker build
-            job_steps.append({
+            # Buildx with the GitHub Actions cache, so unchanged layers aren't rebuilt every run
+            build.append({
+                "name": "Set up Docker Buildx",
+                "uses": "docker/setup-buildx-action@v3"
+            })
+            build.append({
                 "name": "Build Docker Image",
-                "run": "docker build -t my-app ."
+                "uses": "docker/build-push-action@v6",
+                "with": {
+                    "context": context,
+                    "push": False,
+                    "tags": tag,
+                    "cache-from": f"type=gha,scope={cache_scope}" if cache_scope else "type=gha",
+                    "cache-to": f"type=gha,mode=max,scope={cache_scope}" if cache_scope else "type=gha,mode=max"
+                }
             })
-            
+
         # Docker Push (Mock - usually needs secrets)
         if "push_image" in steps:
-             job_steps.append({
+            build.append({
                 "name": "Push Docker Image",
                 "run": "echo 'Pushing to registry... (This needs authentication)'"
             })
 
-                
-        workflow = {
-            "name": "CI Pipeline",
-            "on": ["push"],
-            "jobs": {
-                "build": {
-                    "runs-on": "ubuntu-latest",
-                    "steps": job_steps
-                }
-            }
-        }
-        
-        # Use simple pyyaml / ruamel to dump
-        # Default pyyaml flow style might be ugly, but effective.
-        return yaml.dump(workflow, sort_keys=False, default_flow_style=False)
+        return build
+
+    def _install_steps(self, stack_info: dict) -> List[dict]:
+        """
+        Toolchain setup + dependency install. The setup actions cache the package manager's
+        download cache keyed on the lockfile, and installs stick to the lockfile when there is one.
+        """
+        lockfile = stack_info.get("lockfile")
+
+        if stack_info["language"] == "python":
+            setup = {"python-version": "3.11"}
+            if lockfile:
+                setup.update({"cache": "pip", "cache-dependency-path": lockfile})
+            return [
+                {"name": "Set up Python", "uses": "actions/setup-python@v4", "with": setup},
+                {"name": "Install Dependencies", "run": "pip install -r requirements.txt"}
+            ]
+
+        if stack_info["language"] == "javascript":
+            manager = stack_info.get("package_manager") or "npm"
+            setup = {"node-version": "18"}
+            if lockfile:
+                setup.update({"cache": manager, "cache-dependency-path": lockfile})
+
+            steps = []
+            if manager in ("yarn", "pnpm") and lockfile:
+                # setup-node needs the package manager on PATH before it can locate its cache
+                steps.append({"name": "Enable Corepack", "run": "corepack enable"})
+            steps.append({"name": "Set up Node", "uses": "actions/setup-node@v4", "with": setup})
+            steps.append({"name": "Install Dependencies", "run": INSTALL_COMMANDS[manager] if lockfile else "npm install"})
+            return steps
+
+        return []
 
 workflow_generator = WorkflowGenerator()
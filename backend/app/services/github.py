@@ -1,12 +1,96 @@
-import requests
+import asyncio
+import hashlib
+import posixpath
+import time
+import httpx
+from urllib.parse import urlparse, parse_qs
 from fastapi import HTTPException
 from app.config import settings
+from app.services.rate_limit import github_rate_limiter, effective_priority, RateLimitedError, INTERACTIVE, BACKGROUND
+from app.services.repo_cache import repo_cache, CONTENTS, TREE, MISS
+from app.services.instrumentation import github_endpoint, observe_upstream
+
+def git_blob_sha(content: str) -> str:
+    """The SHA git (and GitHub) assigns to a file with this content: sha1("blob <size>\\0" + bytes)."""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
 
 class GitHubClient:
     def __init__(self):
         self.base_url = settings.GITHUB_API_URL
+        self._client = None
+        self._client_loop = None
+
+    def _http(self) -> httpx.AsyncClient:
+        """
+        One pooled AsyncClient per process (keep-alive to api.github.com is reused across requests).
+        Recreated if we're running on a different event loop than the one it was built on.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=settings.GITHUB_TIMEOUT,
+                limits=httpx.Limits(max_connections=settings.GITHUB_MAX_CONNECTIONS)
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, url: str, token: str, priority: str = BACKGROUND, **kwargs):
+        """
+        Sends a GitHub API request through the per-token rate limiter.
+        Rate limit responses (403/429) are retried with backoff; if GitHub keeps
+        throttling we surface a 429 instead of a generic failure. Interactive calls
+        don't wait out long blocks, they get the 429 (with Retry-After) straight away.
+        """
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        headers.update(kwargs.pop("headers", {}))
+        priority = effective_priority(priority)
+
+        for attempt in range(github_rate_limiter.max_retries + 1):
+            try:
+                await github_rate_limiter.acquire(token, priority)
+            except RateLimitedError as e:
+                raise self._rate_limited(e.retry_in)
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await self._http().request(method, url, headers=headers, **kwargs)
+                status = response.status_code
+            finally:
+                observe_upstream("github", github_endpoint(url), status, time.perf_counter() - start)
+
+            retry_delay = github_rate_limiter.record_response(
+                token, response.status_code, response.headers, response.text if response.status_code in (403, 429) else ""
+            )
+            if retry_delay is None:
+                return response
+
+            if attempt == github_rate_limiter.max_retries:
+                break
+            delay = github_rate_limiter.backoff(attempt, retry_delay)
+            if priority == INTERACTIVE and delay > github_rate_limiter.interactive_max_wait:
+                break
+            github_rate_limiter.record_retry(priority)
+            await asyncio.sleep(delay)
 
-    def exchange_code_for_token(self, code: str) -> str:
+        raise self._rate_limited(retry_delay)
+
+    def _rate_limited(self, retry_in: float) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail="GitHub rate limit exceeded, please retry later",
+            headers={"Retry-After": str(int(retry_in) + 1)}
+        )
+
+    async def exchange_code_for_token(self, code: str) -> str:
         headers = {"Accept": "application/json"}
         payload = {
             "client_id": settings.GITHUB_CLIENT_ID,
@@ -15,101 +99,295 @@ class GitHubClient:
             "redirect_uri": settings.GITHUB_REDIRECT_URI,
         }
 
-        response = requests.post("https://github.com/login/oauth/access_token", headers=headers, data=payload)
+        response = await self._http().post("https://github.com/login/oauth/access_token", headers=headers, data=payload)
         response.raise_for_status()
 
         return response.json().get("access_token")
 
-    def validate_user(self, token: str):
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{self.base_url}/user", headers=headers)
-        
-        if response.status_code != 200:
+    async def validate_user(self, token: str):
+        try:
+            response = await self._request("GET", f"{self.base_url}/user", token, priority=INTERACTIVE)
+        except httpx.TransportError as e:
+            raise HTTPException(status_code=503, detail=f"Could not reach GitHub to validate the token: {e}")
+
+        # Only a 401 means the token is bad, anything else is GitHub's problem (rate limits are already a 429)
+        if response.status_code == 401:
             raise HTTPException(status_code=401, detail="Invalid GitHub Token")
-        
+        if response.status_code != 200:
+            raise HTTPException(status_code=502, detail=f"GitHub returned {response.status_code} while validating the token")
+
         return response.json()
 
-    def get_repos(self, token: str):
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        # Fetching all repos the user has access to (including org repos if permissions allow)
-        # Using pagination might be needed for users with many repos, but for hackathon keeping it simple (default per_page=30)
-        # We'll request 100 to be safe.
-        response = requests.get(f"{self.base_url}/user/repos?per_page=100&sort=updated", headers=headers)
-        
+    async def get_repos(self, token: str):
+        """
+        Fetches every repository the user can access.
+        The first page tells us (via the Link header) how many pages there are,
+        the remaining pages are then fetched concurrently and merged in order.
+        """
+        url = f"{self.base_url}/user/repos"
+
+        first = await self._get_repos_page(url, token, 1)
+        repos = first.json()
+
+        last_page = self._last_page(first)
+        if last_page > 1:
+            pages = range(2, min(last_page, settings.GITHUB_MAX_REPO_PAGES) + 1)
+            semaphore = asyncio.Semaphore(settings.GITHUB_PAGE_CONCURRENCY)
+
+            async def fetch(page: int):
+                async with semaphore:
+                    return await self._get_repos_page(url, token, page)
+
+            # gather() keeps page order, so the merged list stays sorted by "updated"
+            for response in await asyncio.gather(*(fetch(page) for page in pages)):
+                repos.extend(response.json())
+
+        return repos
+
+    async def _get_repos_page(self, url: str, token: str, page: int):
+        params = {"per_page": 100, "sort": "updated", "page": page}
+        response = await self._request("GET", url, token, params=params)
+
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="Failed to fetch repositories")
-            
-        return response.json()
-    
-    def get_repo_contents(self, token: str, owner: str, repo: str, path: str = ""):
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+
+        return response
+
+    def _last_page(self, response) -> int:
+        """Reads the page number of rel="last" from the Link header (1 if there is only one page)."""
+        last = response.links.get("last")
+        if not last:
+            return 1
+        page = parse_qs(urlparse(last["url"]).query).get("page")
+        return int(page[0]) if page else 1
+
+    async def get_repo_contents(self, token: str, owner: str, repo: str, path: str = "", priority: str = BACKGROUND, ref: str = None,
+                                raise_errors: bool = False):
+        """
+        The file or directory listing at `path`, None if it doesn't exist.
+        Other failures also return None, unless `raise_errors` is set: then they raise, so callers
+        that keep the result can tell "not there" from "GitHub had a problem".
+        """
+        # Served from the repo cache when possible (invalidated by our own commits and the push webhook)
+        cached = repo_cache.get(CONTENTS, token, owner, repo, path, ref)
+        if cached is not MISS:
+            return cached
+
         url = f"{self.base_url}/repos/{owner}/{repo}/contents/{path}"
-        response = requests.get(url, headers=headers)
-        
+        params = {"ref": ref} if ref else None
+        response = await self._request("GET", url, token, priority=priority, params=params)
+
         if response.status_code == 404:
+            repo_cache.set(CONTENTS, token, owner, repo, None, path, ref)
             return None # File not found
         if response.status_code != 200:
             print(f"Error fetching {path}: {response.text}")
+            if raise_errors:
+                raise HTTPException(status_code=502, detail=f"GitHub returned {response.status_code} for {owner}/{repo}/{path}")
             return None
-            
-        return response.json()
 
-    def create_or_update_file(self, token: str, owner: str, repo: str, path: str, message: str, content_b64: str, sha: str = None):
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+        data = response.json()
+        repo_cache.set(CONTENTS, token, owner, repo, data, path, ref)
+        return data
+
+    async def get_repo_tree(self, token: str, owner: str, repo: str, ref: str = None, priority: str = BACKGROUND):
+        """
+        Every path in the repo (recursive git tree) as a list of {"path", "type", ...} entries,
+        or None if the repo is empty. Very large repos come back truncated by GitHub.
+        """
+        cached = repo_cache.get(TREE, token, owner, repo, "", ref)
+        if cached is not MISS:
+            return cached
+
+        url = f"{self.base_url}/repos/{owner}/{repo}/git/trees/{ref or 'HEAD'}"
+        response = await self._request("GET", url, token, priority=priority, params={"recursive": "1"})
+
+        if response.status_code in (404, 409):  # 409 = empty repository
+            repo_cache.set(TREE, token, owner, repo, None, "", ref)
+            return None
+        if response.status_code != 200:
+            print(f"Error fetching tree of {owner}/{repo}: {response.text}")
+            return None
+
+        tree = response.json()["tree"]
+        repo_cache.set(TREE, token, owner, repo, tree, "", ref)
+        return tree
+
+    async def create_or_update_file(self, token: str, owner: str, repo: str, path: str, message: str, content_b64: str, sha: str = None):
         url = f"{self.base_url}/repos/{owner}/{repo}/contents/{path}"
-        
+
         data = {
             "message": message,
             "content": content_b64
         }
         if sha:
             data["sha"] = sha
-            
-        response = requests.put(url, headers=headers, json=data)
-        
+
+        response = await self._request("PUT", url, token, priority=INTERACTIVE, json=data)
+
         if response.status_code not in [200, 201]:
              raise HTTPException(status_code=response.status_code, detail=f"Failed to commit file: {response.text}")
-             
+
         return response.json()
 
-    def get_repo_public_key(self, owner: str, repo: str, token: str = None):
+    async def get_branch_head(self, token: str, owner: str, repo: str, branch: str = None) -> dict:
+        """
+        Resolves the head commit and root tree of a branch (the default branch if none given).
+        Returns {"branch", "commit_sha", "tree_sha"}.
+        """
+        repo_url = f"{self.base_url}/repos/{owner}/{repo}"
+
+        if not branch:
+            response = await self._request("GET", repo_url, token, priority=INTERACTIVE)
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail=f"Failed to get repository: {response.text}")
+            branch = response.json()["default_branch"]
+
+        # The branches endpoint gives us both the commit and its tree in one call
+        response = await self._request("GET", f"{repo_url}/branches/{branch}", token, priority=INTERACTIVE)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=f"Failed to get branch {branch}: {response.text}")
+        commit = response.json()["commit"]
+
+        return {
+            "branch": branch,
+            "commit_sha": commit["sha"],
+            "tree_sha": commit["commit"]["tree"]["sha"]
+        }
+
+    async def get_head_sha(self, token: str, owner: str, repo: str, etag: str = None) -> dict:
+        """
+        SHA of the default branch's head commit, in one small call (the sha media type returns just the SHA).
+        Pass the "etag" of a previous answer: if the head hasn't moved GitHub answers 304, which
+        doesn't count against the rate limit, and "not_modified" is set.
+        Returns {"sha", "etag", "not_modified"}; "sha" is None for an empty repo.
+        """
+        headers = {"Accept": "application/vnd.github.sha"}
+        if etag:
+            headers["If-None-Match"] = etag
+        response = await self._request("GET", f"{self.base_url}/repos/{owner}/{repo}/commits/HEAD", token, headers=headers)
+
+        if response.status_code == 304:
+            return {"sha": None, "etag": etag, "not_modified": True}
+        if response.status_code in (409, 422):  # empty repository, no commit to resolve HEAD to
+            return {"sha": None, "etag": None, "not_modified": False}
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=f"Failed to get head of {owner}/{repo}: {response.text}")
+        return {"sha": response.text.strip(), "etag": response.headers.get("etag"), "not_modified": False}
+
+    async def _existing_blob_shas(self, token: str, owner: str, repo: str, paths, ref: str) -> dict:
+        """
+        Blob SHAs of the given paths at `ref`, {path: sha} (missing files are left out).
+        One directory listing per distinct parent directory, fetched concurrently.
+        """
+        directories = sorted({posixpath.dirname(path) for path in paths})
+        listings = await asyncio.gather(*(
+            self.get_repo_contents(token, owner, repo, directory, priority=INTERACTIVE, ref=ref)
+            for directory in directories
+        ))
+
+        shas = {}
+        for listing in listings:
+            if isinstance(listing, list):
+                shas.update({item["path"]: item["sha"] for item in listing if item["type"] == "file"})
+        return {path: shas[path] for path in paths if path in shas}
+
+    async def commit_files(self, token: str, owner: str, repo: str, files: dict, message: str, branch: str = None, head: dict = None):
+        """
+        Commits any number of files ({path: text content}) as ONE commit using the Git Data API:
+        1. resolve the branch head (skipped if `head` is passed in, e.g. fetched concurrently by the caller)
+        2. compare the git blob SHA of each file with what's on the branch and drop unchanged files
+        3. POST a tree on top of the head tree, with the file contents inline (GitHub creates the blobs)
+        4. POST the commit
+        5. PATCH the branch ref (fast-forward only)
+        The request count doesn't depend on the number of files. If nothing changed, no write is made
+        and the result is marked as a no-op (so we don't trigger a pointless Actions run).
+        If someone else pushed in between, the ref update is rejected and we rebuild on the new head
+        instead of overwriting their commit.
+        """
+        repo_url = f"{self.base_url}/repos/{owner}/{repo}"
+        blob_shas = {path: git_blob_sha(content) for path, content in files.items()}
+
+        for attempt in range(settings.GITHUB_COMMIT_RETRIES + 1):
+            if head is None:
+                head = await self.get_branch_head(token, owner, repo, branch)
+
+            existing = await self._existing_blob_shas(token, owner, repo, list(files), head["commit_sha"])
+            changed = [path for path in files if existing.get(path) != blob_shas[path]]
+            unchanged = [path for path in files if path not in changed]
+
+            if not changed:
+                return {
+                    "commit": head["commit_sha"],
+                    "branch": head["branch"],
+                    "files": [],
+                    "unchanged": unchanged,
+                    "noop": True
+                }
+
+            tree_entries = [
+                {"path": path, "mode": "100644", "type": "blob", "content": files[path]}
+                for path in changed
+            ]
+
+            response = await self._request(
+                "POST", f"{repo_url}/git/trees", token, priority=INTERACTIVE,
+                json={"base_tree": head["tree_sha"], "tree": tree_entries}
+            )
+            if response.status_code != 201:
+                raise HTTPException(status_code=response.status_code, detail=f"Failed to create tree: {response.text}")
+            tree_sha = response.json()["sha"]
+
+            response = await self._request(
+                "POST", f"{repo_url}/git/commits", token, priority=INTERACTIVE,
+                json={"message": message, "tree": tree_sha, "parents": [head["commit_sha"]]}
+            )
+            if response.status_code != 201:
+                raise HTTPException(status_code=response.status_code, detail=f"Failed to create commit: {response.text}")
+            commit_sha = response.json()["sha"]
+
+            response = await self._request(
+                "PATCH", f"{repo_url}/git/refs/heads/{head['branch']}", token, priority=INTERACTIVE,
+                json={"sha": commit_sha, "force": False}
+            )
+            if response.status_code == 200:
+                # Don't wait for the push webhook to forget what we just overwrote
+                repo_cache.invalidate(owner, repo, refs=[None, head["branch"]], paths=changed)
+                return {
+                    "commit": commit_sha,
+                    "branch": head["branch"],
+                    "files": changed,
+                    "unchanged": unchanged,
+                    "noop": False
+                }
+            # 422 = not a fast-forward, the branch moved since we read it
+            if response.status_code != 422:
+                break
+            branch, head = head["branch"], None
+
+        raise HTTPException(status_code=response.status_code, detail=f"Failed to update branch: {response.text}")
+
+    async def get_repo_public_key(self, owner: str, repo: str, token: str = None):
         """Get the public key for a repository to encrypt secrets."""
         # Note: Added token param or use self if we refactor to instance-based token
-        # For this existing class structure, methods take 'token' as arg usually, 
+        # For this existing class structure, methods take 'token' as arg usually,
         # BUT 'exchange_code_for_token' suggests this is a utility class without state.
         # However, 'get_repos' takes token.
-        
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
+
         url = f"{self.base_url}/repos/{owner}/{repo}/actions/secrets/public-key"
-        response = requests.get(url, headers=headers)
+        response = await self._request("GET", url, token, priority=INTERACTIVE)
         if response.status_code != 200:
              raise HTTPException(status_code=response.status_code, detail=f"Failed to get public key: {response.text}")
         return response.json()
-        
-    def create_secret(self, owner: str, repo: str, secret_name: str, encrypted_value: str, key_id: str, token: str):
+
+    async def create_secret(self, owner: str, repo: str, secret_name: str, encrypted_value: str, key_id: str, token: str):
         """Create or update a repository secret."""
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
         url = f"{self.base_url}/repos/{owner}/{repo}/actions/secrets/{secret_name}"
         data = {
             "encrypted_value": encrypted_value,
             "key_id": key_id
         }
-        response = requests.put(url, headers=headers, json=data)
+        response = await self._request("PUT", url, token, priority=INTERACTIVE, json=data)
         if response.status_code not in [201, 204]:
              raise HTTPException(status_code=response.status_code, detail=f"Failed to create secret: {response.text}")
         return {"status": "created"}
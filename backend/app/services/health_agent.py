@@ -1,12 +1,17 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class HealthAgent:
-    def evaluate_health(self, normalized_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def evaluate_health(self, normalized_metrics: List[Dict[str, Any]],
+                        log_signal: Optional[Dict[str, Any]] = None,
+                        target_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Evaluates system health based on deterministic rules:
         - CPU > 80% (0.8) -> Warning
         - Memory > 85% (0.85) -> Warning
         - Disk Free < 15% (0.15) -> Critical
+        - Log error-rate spike (log_signal from log_store.error_rate) -> Warning,
+          correlated with whichever metric rules fired at the same time
+        - Scrape target circuit open -> Critical, half open (probing) -> Warning
         """
         issues = []
         health_status = "healthy"
@@ -38,9 +43,42 @@ class HealthAgent:
                     issues.append("Low disk space")
                     health_status = "critical" # Critical overrides degraded
 
-        return {
+        if target_state is not None:
+            if target_state["state"] == "open":
+                issues.append("Scrape target unreachable (circuit open)")
+                health_status = "critical"
+            elif target_state["state"] == "half_open":
+                issues.append("Scrape target recovering")
+                if health_status != "critical":
+                    health_status = "degraded"
+
+        report = {
             "health": health_status,
             "issues": issues
         }
+        if target_state is not None:
+            report["target"] = target_state
+        if log_signal is not None:
+            report["logs"] = log_signal
+            if log_signal.get("spike"):
+                report["correlation"] = self._correlate(issues, log_signal)
+                issues.append("Error-rate spike in logs")
+                if health_status != "critical":
+                    report["health"] = "degraded"
+        return report
+
+    def _correlate(self, metric_issues: List[str], log_signal: Dict[str, Any]) -> Dict[str, Any]:
+        """Links a log error spike to the metric degradation seen in the same evaluation."""
+        rate = f"{log_signal['error_rate']:.1%} errors vs {log_signal['baseline_error_rate']:.1%} baseline"
+        if metric_issues:
+            summary = f"Log error spike ({rate}) coincides with: {', '.join(metric_issues)}"
+        else:
+            summary = f"Log error spike ({rate}) without metric degradation, likely an application fault"
+        return {
+            "log_spike": True,
+            "metric_issues": list(metric_issues),
+            "correlated": bool(metric_issues),
+            "summary": summary
+        }
 
 health_agent = HealthAgent()
@@ -0,0 +1,35 @@
+import asyncio
+import httpx
+from app.config import settings
+
+class UpstreamHTTP:
+    """
+    Process-wide pooled AsyncClient for everything that isn't GitHub (metrics endpoints, exporters).
+    Keep-alive connections are reused across requests instead of a new client per call.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._client_loop = None
+
+    def client(self) -> httpx.AsyncClient:
+        # Recreated if we're running on a different event loop than the one it was built on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=settings.UPSTREAM_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.UPSTREAM_MAX_CONNECTIONS
+                )
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+upstream_http = UpstreamHTTP()
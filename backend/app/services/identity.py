@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.github import github_client
+from app.services.token_hash import hash_token
+
+class IdentityCache:
+    """
+    Caches the GitHub identity (GET /user) behind each token.
+    - valid tokens are cached for IDENTITY_CACHE_TTL
+    - invalid tokens (401) are cached for IDENTITY_NEGATIVE_TTL so they can't hammer GitHub
+    - concurrent validations of the same token share one GitHub call
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # hash -> (expires_at, user or None)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, key: str, user, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.IDENTITY_CACHE_SIZE:
+            self._entries.popitem(last=False)
+
+    async def get_user(self, token: str) -> dict:
+        """Returns the user for the token, raising 401 if GitHub rejects it."""
+        key = hash_token(token)
+
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            self._entries.move_to_end(key)
+            if entry[1] is None:
+                raise HTTPException(status_code=401, detail="Invalid GitHub Token")
+            return entry[1]
+
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.hits += 1  # shares the validation already in flight
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The caller that started the validation went away: take over unless we were cancelled too
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                self.hits -= 1
+
+        self.misses += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            user = await github_client.validate_user(token)
+        except Exception as e:
+            # Only cache a definite "invalid token", not rate limits or GitHub outages
+            if isinstance(e, HTTPException) and e.status_code == 401:
+                self._store(key, None, settings.IDENTITY_NEGATIVE_TTL)
+            future.set_exception(e)
+            future.exception()  # mark as retrieved, waiters still get it
+            raise
+        else:
+            self._store(key, user, settings.IDENTITY_CACHE_TTL)
+            future.set_result(user)
+            return user
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                # We were cancelled: waiters see a cancelled future and one of them retries
+                future.cancel()
+
+    def invalidate(self, token: str):
+        self._entries.pop(hash_token(token), None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+identity_cache = IdentityCache()
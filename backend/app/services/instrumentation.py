@@ -0,0 +1,187 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import anyio.to_thread
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import GCCollector, PlatformCollector, ProcessCollector
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.config import settings
+
+# The backend's own metrics (GET /metrics). A separate registry so nothing else in the
+# process (libraries, the parse pool) can register into it by accident.
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+PlatformCollector(registry=registry)
+GCCollector(registry=registry)
+
+SLOW_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+http_requests = Counter(
+    "backend_http_requests_total", "Requests handled, by route template and status",
+    ["method", "route", "status"], registry=registry
+)
+http_request_duration = Histogram(
+    "backend_http_request_duration_seconds", "Time from request to the end of the response body, by route template",
+    ["method", "route"], buckets=SLOW_BUCKETS, registry=registry
+)
+http_in_progress = Gauge("backend_http_requests_in_progress", "Requests being handled", registry=registry)
+
+upstream_duration = Histogram(
+    "backend_upstream_request_duration_seconds",
+    "Calls we make: GitHub API (by endpoint), scrape targets and proxied exporters (by host)",
+    ["upstream", "endpoint", "status"], buckets=SLOW_BUCKETS, registry=registry
+)
+parse_duration = Histogram(
+    "backend_parse_duration_seconds", "parse_metrics time, inline or in the process pool",
+    ["mode"], buckets=SLOW_BUCKETS, registry=registry
+)
+parse_bytes = Counter("backend_parse_bytes_total", "Exposition bytes parsed", registry=registry)
+normalize_duration = Histogram(
+    "backend_normalize_duration_seconds", "normalize_metrics time", buckets=SLOW_BUCKETS, registry=registry
+)
+yaml_render_duration = Histogram(
+    "backend_yaml_render_duration_seconds", "generate_yaml time (cache hits included)", buckets=SLOW_BUCKETS, registry=registry
+)
+
+
+def github_endpoint(url: str) -> str:
+    """
+    Low-cardinality name of a GitHub API call: /repos/octo/app/contents/src/x.py -> /repos/:owner/:repo/contents
+    (git/* and actions/* keep one more segment: /repos/:owner/:repo/git/trees).
+    """
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    if len(parts) >= 3 and parts[0] == "repos":
+        rest = parts[3:5] if len(parts) > 3 and parts[3] in ("git", "actions") else parts[3:4]
+        return "/".join(["/repos/:owner/:repo"] + rest)
+    if len(parts) >= 2 and parts[0] in ("orgs", "users"):
+        return "/".join([f"/{parts[0]}/:name"] + parts[2:3])
+    return "/" + "/".join(parts[:2])
+
+
+_hosts = set()
+_hosts_lock = threading.Lock()
+
+
+def target_host(url: str) -> str:
+    """
+    Host label of a scrape target or proxied exporter. The URLs come from clients, so only the
+    first UPSTREAM_METRIC_MAX_HOSTS hosts seen get a label of their own; the rest are "other".
+    """
+    host = urlparse(url).netloc or url
+    if host in _hosts:
+        return host
+    with _hosts_lock:
+        if len(_hosts) >= settings.UPSTREAM_METRIC_MAX_HOSTS:
+            return "other"
+        _hosts.add(host)
+    return host
+
+
+@contextmanager
+def timed(histogram, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def observe_upstream(upstream: str, endpoint: str, status, seconds: float):
+    upstream_duration.labels(upstream, endpoint, str(status)).observe(seconds)
+
+
+class _StateCollector:
+    """Read at scrape time: cache counters the caches already keep, and the threadpool limiter."""
+
+    def collect(self):
+        from app.services.generator import workflow_generator
+        from app.services.identity import identity_cache
+        from app.services.repo_cache import repo_cache
+
+        render = workflow_generator._render.cache_info()
+        repo = repo_cache.stats()
+        identity = identity_cache.stats()
+        caches = {
+            "repo": (repo["hits"], repo["misses"], repo["entries"]),
+            "identity": (identity["hits"], identity["misses"], identity["entries"]),
+            "workflow": (render.hits, render.misses, render.currsize),
+        }
+        hits = CounterMetricFamily("backend_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("backend_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("backend_cache_hit_ratio", "Hits / lookups since start", labels=["cache"])
+        entries = GaugeMetricFamily("backend_cache_entries", "Entries held", labels=["cache"])
+        for name, (h, m, size) in caches.items():
+            hits.add_metric([name], h)
+            misses.add_metric([name], m)
+            ratio.add_metric([name], h / (h + m) if h + m else 0)
+            entries.add_metric([name], size)
+        yield from (hits, misses, ratio, entries)
+
+        # Sync routes run in anyio's default threadpool: busy == max means requests queue for a thread.
+        # The limiter belongs to the event loop, so this only reports when collected on it (GET /metrics).
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except Exception:
+            return
+        statistics = limiter.statistics()
+        yield GaugeMetricFamily("backend_threadpool_max_threads", "Threadpool size for sync routes", value=limiter.total_tokens)
+        yield GaugeMetricFamily("backend_threadpool_busy_threads", "Threads running sync routes", value=statistics.borrowed_tokens)
+        yield GaugeMetricFamily("backend_threadpool_waiting_tasks", "Sync calls waiting for a thread", value=statistics.tasks_waiting)
+
+
+registry.register(_StateCollector())
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+    path = scope["path"]
+    if not route.path_regex.match(path):
+        # Routers included with a prefix (include_router(prefix=...)) may leave the un-prefixed
+        # route in the scope: the prefix is whatever leads the path before the route's segments
+        segments = path.split("/")
+        template = "/".join(segments[:len(segments) - template.count("/")]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (BaseHTTPMiddleware would buffer the SSE/NDJSON streams): times every
+    HTTP request to the end of its body. Routes are labelled by template ("/repos/{owner}/{repo}"),
+    anything that matched no route as "unmatched", so scanners can't blow up the label set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_progress.dec()
+            template = route_template(scope)
+            method = scope["method"]
+            http_requests.labels(method, template, str(status)).inc()
+            http_request_duration.labels(method, template).observe(time.perf_counter() - start)
+
+
+def exposition() -> bytes:
+    return generate_latest(registry)
@@ -0,0 +1,269 @@
+import asyncio
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.analyzer import repo_analyzer
+from app.services.github import github_client
+from app.services.rate_limit import priority_scope, BACKGROUND
+from app.services.token_hash import hash_token
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# What happened to each repo in a refresh
+ANALYZED = "analyzed"
+UNCHANGED = "unchanged"
+
+WORKFLOWS_DIR = ".github/workflows"
+
+
+def _summary(repo: dict, head: dict, stack: dict, workflows) -> dict:
+    """The queryable part of an analysis: one flat record per repo (plus its services for monorepos)."""
+    return {
+        "full_name": repo["full_name"],
+        "owner": repo["owner"],
+        "repo": repo["name"],
+        "private": repo.get("private"),
+        "pushed_at": repo.get("pushed_at"),
+        "head_sha": head["sha"],
+        "head_etag": head["etag"],
+        "language": stack["language"],
+        "framework": stack["framework"],
+        "package_manager": stack["package_manager"],
+        "has_dockerfile": stack["has_dockerfile"] or any(s["has_dockerfile"] for s in stack.get("services") or []),
+        "has_test_script": stack["has_test_script"],
+        "services": [
+            {"path": s["path"], "language": s["language"], "framework": s["framework"], "has_dockerfile": s["has_dockerfile"]}
+            for s in stack.get("services") or []
+        ],
+        "workflows": sorted(
+            item["name"] for item in workflows or []
+            if item.get("type") == "file" and item["name"].endswith((".yml", ".yaml"))
+        ),
+        "analyzed_at": time.time(),
+        "error": None,
+    }
+
+
+class InventoryJob:
+    """One inventory refresh. Results are kept in completion order so they can be streamed as they land."""
+
+    def __init__(self, token: str, total: int, truncated: bool):
+        self.id = uuid.uuid4().hex
+        self.owner_hash = hash_token(token)
+        self.created_at = time.time()
+        self.finished_at = None
+        self.total = total
+        self.truncated = truncated
+        self.results: List[dict] = []
+        self.counts = {ANALYZED: 0, UNCHANGED: 0, FAILED: 0}
+        self.task: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+
+    @property
+    def status(self) -> str:
+        if self.task is None:
+            return SUCCEEDED
+        if not self.task.done():
+            return RUNNING
+        return FAILED if self.task.cancelled() or self.task.exception() else SUCCEEDED
+
+    def add(self, full_name: str, outcome: str, summary: dict):
+        self.counts[outcome] += 1
+        self.results.append({"full_name": full_name, "outcome": outcome, "summary": summary})
+        # Wake up every follower, then arm a fresh event for the next result
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def finish(self):
+        self.finished_at = time.time()
+        self._updated.set()
+
+    async def follow(self):
+        """Every result so far, then each new one as it completes, until the job is done."""
+        sent = 0
+        while True:
+            updated = self._updated
+            while sent < len(self.results):
+                yield self.results[sent]
+                sent += 1
+            if self.finished_at is not None:
+                return
+            await updated.wait()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "total": self.total,
+            "truncated": self.truncated,
+            "done": len(self.results),
+            "progress": self.counts,
+        }
+
+
+class InventoryService:
+    """
+    Stack inventory of every repo a user can access, for planning rollouts.
+    A refresh fans analysis out over the repo listing (INVENTORY_CONCURRENCY at a time, at
+    background priority). Each repo is pinned to its head commit: an unchanged pushed_at, or a
+    head SHA we already analyzed (checked with a conditional request, free when it's a 304), reuses
+    the stored summary, so a refresh only reanalyzes the repos that changed. Analyses read the repo
+    at that SHA, which the repo cache keeps without going stale.
+    Inventories are kept per token hash, like the other per-user caches.
+    """
+
+    def __init__(self):
+        self._inventories: "OrderedDict[str, Dict[str, dict]]" = OrderedDict()
+        self._jobs: "OrderedDict[str, InventoryJob]" = OrderedDict()
+        self._running: Dict[str, InventoryJob] = {}
+
+    def refresh(self, token: str, repos: List[dict], force: bool = False) -> InventoryJob:
+        """Starts a refresh (or returns the one already running for this token)."""
+        key = hash_token(token)
+        running = self._running.get(key)
+        if running is not None and running.status == RUNNING:
+            return running
+
+        truncated = len(repos) > settings.INVENTORY_MAX_REPOS
+        repos = repos[:settings.INVENTORY_MAX_REPOS]
+        job = InventoryJob(token, len(repos), truncated)
+        self._jobs[job.id] = job
+        self._running[key] = job
+        # Drop the oldest finished jobs, a long running one doesn't hold the rest back
+        excess = len(self._jobs) - settings.INVENTORY_MAX_JOBS
+        for job_id in [i for i, j in self._jobs.items() if j.status != RUNNING][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+        job.task = asyncio.create_task(self._run(job, token, repos, force))
+        return job
+
+    def get_job(self, job_id: str, token: str) -> InventoryJob:
+        job = self._jobs.get(job_id)
+        if not job or job.owner_hash != hash_token(token):
+            raise HTTPException(status_code=404, detail="Inventory job not found")
+        return job
+
+    def _inventory(self, token: str) -> Dict[str, dict]:
+        key = hash_token(token)
+        inventory = self._inventories.get(key)
+        if inventory is None:
+            inventory = self._inventories[key] = {}
+            while len(self._inventories) > settings.INVENTORY_MAX_USERS:
+                self._inventories.popitem(last=False)
+        self._inventories.move_to_end(key)
+        return inventory
+
+    async def _run(self, job: InventoryJob, token: str, repos: List[dict], force: bool):
+        previous = dict(self._inventory(token))
+        semaphore = asyncio.Semaphore(settings.INVENTORY_CONCURRENCY)
+
+        async def run_repo(repo: dict):
+            name = repo["full_name"]
+            async with semaphore:
+                try:
+                    with priority_scope(BACKGROUND):
+                        summary, outcome = await self._inventory_repo(token, repo, previous.get(name), force)
+                except HTTPException as e:
+                    summary, outcome = self._failed(repo, previous.get(name), f"{e.status_code}: {e.detail}"), FAILED
+                except Exception as e:
+                    summary, outcome = self._failed(repo, previous.get(name), str(e)), FAILED
+            # Queries see each repo's new summary as soon as it's done
+            self._inventory(token)[name] = summary
+            job.add(name, outcome, summary)
+
+        try:
+            await asyncio.gather(*(run_repo(repo) for repo in repos))
+            # Repos that left the listing (deleted, access revoked) drop out of the inventory
+            listed = {repo["full_name"] for repo in repos}
+            inventory = self._inventory(token)
+            for name in [n for n in inventory if n not in listed]:
+                del inventory[name]
+        finally:
+            if self._running.get(job.owner_hash) is job:
+                del self._running[job.owner_hash]
+            job.finish()
+
+    async def _inventory_repo(self, token: str, repo: dict, previous: Optional[dict], force: bool):
+        usable = previous is not None and previous["error"] is None and not force
+        if usable and previous["pushed_at"] == repo.get("pushed_at"):
+            return previous, UNCHANGED
+
+        head = await github_client.get_head_sha(token, repo["owner"], repo["name"], previous["head_etag"] if usable else None)
+        if usable and (head["not_modified"] or head["sha"] == previous["head_sha"]):
+            # pushed_at also moves for pushes to other branches
+            return dict(previous, pushed_at=repo.get("pushed_at")), UNCHANGED
+        if head["sha"] is None:
+            # Empty repo: nothing to read
+            stack, workflows = repo_analyzer.empty_stack(), None
+        else:
+            # A failed listing must not pass for "no workflows": it would stay pinned to this SHA
+            stack, workflows = await asyncio.gather(
+                repo_analyzer.analyze(token, repo["owner"], repo["name"], ref=head["sha"]),
+                github_client.get_repo_contents(token, repo["owner"], repo["name"], WORKFLOWS_DIR, ref=head["sha"],
+                                                raise_errors=True)
+            )
+        return _summary(repo, head, stack, workflows if isinstance(workflows, list) else None), ANALYZED
+
+    def _failed(self, repo: dict, previous: Optional[dict], error: str) -> dict:
+        # Keep what we knew about the repo, the next refresh retries it
+        if previous is not None:
+            return dict(previous, error=error)
+        return {"full_name": repo["full_name"], "owner": repo["owner"], "repo": repo["name"],
+                "pushed_at": repo.get("pushed_at"), "head_sha": None, "error": error}
+
+    def query(self, token: str, language: Optional[str] = None, framework: Optional[str] = None,
+              has_dockerfile: Optional[bool] = None, has_workflows: Optional[bool] = None,
+              q: Optional[str] = None, page: int = 1, per_page: Optional[int] = None):
+        """(total matches, repos) from the stored inventory. `language`/`framework` also match monorepo services."""
+        q = (q or "").lower()
+        filtered = language or framework or has_dockerfile is not None or has_workflows is not None
+        matches = []
+        for summary in self._inventory(token).values():
+            if filtered and summary.get("language") is None:
+                continue  # never analyzed successfully
+            stacks = [summary] + summary.get("services", [])
+            if language and not any(s.get("language") == language for s in stacks):
+                continue
+            if framework and not any(s.get("framework") == framework for s in stacks):
+                continue
+            if has_dockerfile is not None and bool(summary.get("has_dockerfile")) != has_dockerfile:
+                continue
+            if has_workflows is not None and bool(summary.get("workflows")) != has_workflows:
+                continue
+            if q and q not in summary["full_name"].lower():
+                continue
+            matches.append(summary)
+
+        matches.sort(key=lambda s: s["full_name"].lower())
+        total = len(matches)
+        if per_page:
+            matches = matches[(page - 1) * per_page:page * per_page]
+        return total, matches
+
+    def summary(self, token: str) -> dict:
+        """Counts across the whole inventory: what a rollout plan starts from."""
+        inventory = self._inventory(token).values()
+        analyzed = [s for s in inventory if s.get("language") is not None]
+        return {
+            "repos": len(inventory),
+            "failed": sum(1 for s in inventory if s["error"] is not None),
+            "languages": dict(Counter(s["language"] for s in analyzed).most_common()),
+            "frameworks": dict(Counter(s["framework"] for s in analyzed).most_common()),
+            "monorepos": sum(1 for s in analyzed if s["services"]),
+            "with_dockerfile": sum(1 for s in analyzed if s["has_dockerfile"]),
+            "with_workflows": sum(1 for s in analyzed if s["workflows"]),
+            "without_workflows": sum(1 for s in analyzed if not s["workflows"]),
+            "last_analyzed_at": max((s["analyzed_at"] for s in analyzed), default=None),
+        }
+
+
+inventory_service = InventoryService()
@@ -0,0 +1,157 @@
+import json
+import math
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+JSON = "json"
+LOGFMT = "logfmt"
+NGINX = "nginx"
+TEXT = "text"
+FORMATS = (JSON, LOGFMT, NGINX, TEXT)
+
+# nginx "combined" log_format
+NGINX_RE = re.compile(
+    r'(?P<remote_addr>\S+) \S+ (?P<remote_user>\S+) \[(?P<time_local>[^\]]+)\] '
+    r'"(?P<request>[^"]*)" (?P<status>\d{3}) (?P<body_bytes_sent>\S+)'
+    r'(?: "(?P<http_referer>[^"]*)" "(?P<http_user_agent>[^"]*)")?'
+)
+LOGFMT_RE = re.compile(r'([\w.\-/]+)=("(?:[^"\\]|\\.)*"|\S*)')
+TEXT_LEVEL_RE = re.compile(r"\b(FATAL|PANIC|CRITICAL|CRIT|ERROR|ERR|WARNING|WARN|INFO|DEBUG|TRACE)\b", re.IGNORECASE)
+
+TIME_KEYS = ("ts", "time", "timestamp", "@timestamp", "t")
+LEVEL_KEYS = ("level", "severity", "lvl", "log.level", "levelname")
+MESSAGE_KEYS = ("msg", "message", "event", "log")
+
+LEVELS = {
+    "fatal": "error", "panic": "error", "critical": "error", "crit": "error", "error": "error", "err": "error",
+    "warning": "warn", "warn": "warn",
+    "info": "info", "notice": "info", "information": "info",
+    "debug": "debug", "trace": "debug",
+}
+
+
+def normalize_level(level) -> str:
+    return LEVELS.get(str(level).lower(), "info") if level is not None else "info"
+
+
+def parse_time(value, default: float) -> float:
+    """Epoch seconds from epoch s/ms/ns numbers, ISO 8601 strings or nginx's time_local."""
+    if value is None or value == "" or isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace(".", "", 1).isdigit()):
+        number = float(value)
+        if not math.isfinite(number):
+            return default  # 1e400, NaN: no usable time (and int(inf // 60) would blow up the store)
+        # Guess the unit from the magnitude
+        if number > 1e17:
+            return number / 1e9
+        if number > 1e11:
+            return number / 1e3
+        return number
+    text = str(value)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            parsed = datetime.strptime(text, "%d/%b/%Y:%H:%M:%S %z")  # nginx time_local
+        except ValueError:
+            return default
+    if parsed.tzinfo is None:
+        # No offset given: treat as UTC rather than the server's local time
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _record(ts: float, level: str, message: str, fields: dict) -> dict:
+    return {"ts": ts, "level": level, "message": message, "fields": fields}
+
+
+def _pop_first(data: dict, keys):
+    for key in keys:
+        if key in data:
+            return data.pop(key)
+    return None
+
+
+def parse_json(line: str, now: float) -> Optional[dict]:
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    ts = parse_time(_pop_first(data, TIME_KEYS), now)
+    level = normalize_level(_pop_first(data, LEVEL_KEYS))
+    message = _pop_first(data, MESSAGE_KEYS)
+    fields = {k: v if isinstance(v, (str, int, float, bool)) or v is None else json.dumps(v) for k, v in data.items()}
+    return _record(ts, level, str(message) if message is not None else "", fields)
+
+
+def parse_logfmt(line: str, now: float) -> Optional[dict]:
+    pairs = LOGFMT_RE.findall(line)
+    if not pairs:
+        return None
+    data = {}
+    for key, value in pairs:
+        if value.startswith('"') and value.endswith('"') and len(value) >= 2:
+            value = value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        data[key] = value
+    ts = parse_time(_pop_first(data, TIME_KEYS), now)
+    level = normalize_level(_pop_first(data, LEVEL_KEYS))
+    message = _pop_first(data, MESSAGE_KEYS)
+    return _record(ts, level, message or "", data)
+
+
+def parse_nginx(line: str, now: float) -> Optional[dict]:
+    match = NGINX_RE.match(line)
+    if not match:
+        return None
+    fields = {k: v for k, v in match.groupdict().items() if v is not None}
+    status = int(fields["status"])
+    # Access logs have no level: 5xx counts as an error, 4xx as a warning
+    level = "error" if status >= 500 else "warn" if status >= 400 else "info"
+    ts = parse_time(fields.pop("time_local"), now)
+    return _record(ts, level, f'{fields["request"]} {status}', fields)
+
+
+def parse_text(line: str, now: float) -> dict:
+    match = TEXT_LEVEL_RE.search(line)
+    return _record(now, normalize_level(match.group(1)) if match else "info", line, {})
+
+
+PARSERS = {JSON: parse_json, LOGFMT: parse_logfmt, NGINX: parse_nginx}
+
+
+def parse_line(line: str, fmt: Optional[str] = None, now: Optional[float] = None) -> Optional[dict]:
+    """
+    Parses one log line into {ts, level, message, fields}. With no format it's guessed per line
+    (JSON object, nginx combined, logfmt, then plain text). Blank lines give None.
+    """
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return None
+    now = time.time() if now is None else now
+
+    if fmt and fmt != TEXT:
+        return PARSERS[fmt](line, now) or parse_text(line, now)
+    if fmt == TEXT:
+        return parse_text(line, now)
+
+    if line.lstrip().startswith("{"):
+        record = parse_json(line, now)
+        if record:
+            return record
+    record = parse_nginx(line, now)
+    if record:
+        return record
+    # Plain text with a stray "=" shouldn't count as logfmt: require a level, msg or time key
+    if "=" in line and _looks_like_logfmt(line):
+        return parse_logfmt(line, now)
+    return parse_text(line, now)
+
+
+def _looks_like_logfmt(line: str) -> bool:
+    keys = {key for key, _ in LOGFMT_RE.findall(line)}
+    return bool(keys & set(TIME_KEYS + LEVEL_KEYS + MESSAGE_KEYS))
@@ -0,0 +1,331 @@
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from app.config import settings
+from app.services.log_parsing import parse_line
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9_]{2,64}")
+# Query words too short for the index are checked against every candidate line instead
+WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str, pattern: re.Pattern = TOKEN_RE) -> set:
+    return set(pattern.findall(text.lower()))
+
+
+def _record_tokens(record: dict, pattern: re.Pattern = TOKEN_RE) -> set:
+    tokens = tokenize(record["message"], pattern)
+    for value in record["fields"].values():
+        if isinstance(value, str):
+            tokens |= tokenize(value, pattern)
+        elif value is not None:
+            tokens.add(str(value).lower())
+    return tokens
+
+
+class _Chunk:
+    __slots__ = ("id", "source", "min_ts", "max_ts", "lines", "errors", "data", "tokens")
+
+    def __init__(self, chunk_id: int, source: str, records: List[dict]):
+        self.id = chunk_id
+        self.source = source
+        self.min_ts = min(r["ts"] for r in records)
+        self.max_ts = max(r["ts"] for r in records)
+        self.lines = len(records)
+        self.errors = sum(1 for r in records if r["level"] == "error")
+        self.data = zlib.compress(json.dumps(records, separators=(",", ":")).encode(), 6)
+        self.tokens = set()
+        for record in records:
+            self.tokens |= _record_tokens(record)
+
+    def records(self) -> List[dict]:
+        return json.loads(zlib.decompress(self.data))
+
+
+class LogStore:
+    """
+    Log lines are buffered per source and sealed into zlib-compressed chunks of up to
+    LOG_CHUNK_MAX_LINES lines (or after LOG_CHUNK_MAX_AGE seconds). Every chunk keeps its
+    time range, error count and an inverted index entry (token -> chunk ids), so a search
+    only decompresses chunks that can contain all its terms inside the requested time range.
+    Per-minute line/error counts are kept separately for error-rate signals.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._open: Dict[str, dict] = {}  # source -> {"records": [...], "opened": monotonic}
+        self._chunks: "OrderedDict[int, _Chunk]" = OrderedDict()
+        self._index: Dict[str, set] = {}
+        self._ids = itertools.count(1)
+        # minute -> source -> [lines, errors]
+        self._minutes: Dict[int, Dict[str, list]] = {}
+        self.lines_total = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def add(self, lines: Iterable[str], source: str = "default", fmt: Optional[str] = None) -> int:
+        """Parses and stores raw lines. Returns how many were stored (blank lines are skipped)."""
+        now = time.time()
+        records = []
+        raw = 0
+        for line in lines:
+            record = parse_line(line, fmt, now)
+            if record:
+                records.append(record)
+                raw += len(line)
+        if records:
+            self.add_records(records, source, raw)
+        return len(records)
+
+    def add_records(self, records: List[dict], source: str = "default", raw_bytes: int = 0):
+        with self._lock:
+            buffer = self._open.get(source)
+            if buffer is None:
+                buffer = self._open[source] = {"records": [], "opened": time.monotonic()}
+            for record in records:
+                buffer["records"].append(record)
+                minute = self._minutes.setdefault(int(record["ts"] // 60), {}).setdefault(source, [0, 0])
+                minute[0] += 1
+                if record["level"] == "error":
+                    minute[1] += 1
+                if len(buffer["records"]) >= settings.LOG_CHUNK_MAX_LINES:
+                    self._seal(source)
+                    buffer = self._open[source] = {"records": [], "opened": time.monotonic()}
+            self.lines_total += len(records)
+            self.raw_bytes += raw_bytes
+            self._seal_expired()
+
+    def _seal(self, source: str):
+        buffer = self._open.pop(source, None)
+        if not buffer or not buffer["records"]:
+            return
+        chunk = _Chunk(next(self._ids), source, buffer["records"])
+        self._chunks[chunk.id] = chunk
+        self.compressed_bytes += len(chunk.data)
+        for token in chunk.tokens:
+            self._index.setdefault(token, set()).add(chunk.id)
+
+        # Retention: drop the oldest chunks and their index entries
+        while len(self._chunks) > settings.LOG_MAX_CHUNKS:
+            _, old = self._chunks.popitem(last=False)
+            self.compressed_bytes -= len(old.data)
+            for token in old.tokens:
+                ids = self._index.get(token)
+                if ids is not None:
+                    ids.discard(old.id)
+                    if not ids:
+                        del self._index[token]
+
+        cutoff = int(time.time() // 60) - settings.LOG_RATE_HISTORY_MINUTES
+        for minute in [m for m in self._minutes if m < cutoff]:
+            del self._minutes[minute]
+
+    def _seal_expired(self):
+        deadline = time.monotonic() - settings.LOG_CHUNK_MAX_AGE
+        for source in [s for s, b in self._open.items() if b["opened"] < deadline]:
+            self._seal(source)
+
+    def search(self, query: str = "", start: Optional[float] = None, end: Optional[float] = None,
+               level: Optional[str] = None, source: Optional[str] = None, limit: int = 100) -> dict:
+        """
+        Lines containing every term of `query` (AND), newest first. Sealed chunks are picked
+        from the index and their time range before anything is decompressed, then read newest
+        first until the remaining ones can't hold anything newer than the results so far.
+        """
+        terms = tokenize(query)
+        short_terms = {w for w in tokenize(query, WORD_RE) if len(w) < 2}
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+
+        with self._lock:
+            self._seal_expired()
+            if terms:
+                postings = sorted((self._index.get(t, set()) for t in terms), key=len)
+                candidate_ids = set.intersection(*postings) if postings else set()
+            else:
+                candidate_ids = self._chunks.keys()
+            # (max_ts, source, chunk or a copy of the open buffer's records)
+            candidates = [
+                (chunk.max_ts, chunk.source, chunk) for chunk in map(self._chunks.__getitem__, candidate_ids)
+                if chunk.max_ts >= start and chunk.min_ts <= end
+                and (source is None or chunk.source == source)
+                and (level != "error" or chunk.errors)
+            ]
+            candidates.extend(
+                (max(r["ts"] for r in b["records"]), s, list(b["records"]))
+                for s, b in self._open.items() if b["records"] and (source is None or s == source)
+            )
+            chunks_total = len(self._chunks)
+        # Lines can arrive out of order across sources, so go by time range rather than chunk id
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        def matches(record: dict) -> bool:
+            if not start <= record["ts"] <= end:
+                return False
+            if level and record["level"] != level:
+                return False
+            if terms and not terms <= _record_tokens(record):
+                return False
+            return not short_terms or short_terms <= _record_tokens(record, WORD_RE)
+
+        results = []
+        scanned = 0
+        truncated = False
+        for max_ts, chunk_source, chunk in candidates:
+            if len(results) >= limit and results[limit - 1]["ts"] > max_ts:
+                # Everything left is older than the oldest result we keep
+                truncated = True
+                break
+            records = chunk if isinstance(chunk, list) else chunk.records()
+            if not isinstance(chunk, list):
+                scanned += 1
+            results.extend(dict(r, source=chunk_source) for r in records if matches(r))
+            results.sort(key=lambda r: r["ts"], reverse=True)
+            if len(results) > limit:
+                del results[limit:]
+                truncated = True
+
+        return {
+            "results": results,
+            "truncated": truncated,
+            "chunks_total": chunks_total,
+            "chunks_scanned": scanned
+        }
+
+    def error_rate(self, window: int = None, baseline: int = None, source: Optional[str] = None,
+                   now: Optional[float] = None) -> Optional[dict]:
+        """
+        Error rate over the last `window` seconds against the `baseline` seconds before it.
+        "spike" is set when the window has at least LOG_SPIKE_MIN_ERRORS errors, an error rate of
+        at least LOG_SPIKE_MIN_RATE and LOG_SPIKE_FACTOR times the baseline rate.
+        None when there were no lines in the window.
+        """
+        window = window or settings.LOG_SPIKE_WINDOW
+        baseline = baseline or settings.LOG_SPIKE_BASELINE
+        now_minute = int((now or time.time()) // 60)
+        window_start = now_minute - max(1, window // 60) + 1
+        baseline_start = window_start - max(1, baseline // 60)
+
+        current = [0, 0]
+        before = [0, 0]
+        with self._lock:
+            for minute, sources in self._minutes.items():
+                if minute > now_minute or minute < baseline_start:
+                    continue
+                bucket = current if minute >= window_start else before
+                for name, (lines, errors) in sources.items():
+                    if source is None or name == source:
+                        bucket[0] += lines
+                        bucket[1] += errors
+
+        if not current[0]:
+            return None
+        rate = current[1] / current[0]
+        baseline_rate = before[1] / before[0] if before[0] else 0.0
+        spike = (
+            current[1] >= settings.LOG_SPIKE_MIN_ERRORS
+            and rate >= settings.LOG_SPIKE_MIN_RATE
+            and rate >= settings.LOG_SPIKE_FACTOR * baseline_rate
+        )
+        return {
+            "source": source or "all",
+            "window_seconds": window,
+            "lines": current[0],
+            "errors": current[1],
+            "error_rate": round(rate, 4),
+            "baseline_error_rate": round(baseline_rate, 4),
+            "spike": spike
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "lines_total": self.lines_total,
+                "chunks": len(self._chunks),
+                "open_lines": sum(len(b["records"]) for b in self._open.values()),
+                "index_terms": len(self._index),
+                "raw_bytes": self.raw_bytes,
+                "compressed_bytes": self.compressed_bytes,
+                "sources": sorted({c.source for c in self._chunks.values()} | set(self._open))
+            }
+
+
+class LogTailer:
+    """
+    Follows the files in LOG_TAIL_PATHS (comma separated) from their current end, like `tail -F`:
+    a rotated (new inode) or truncated file is reopened from the start. Lines go into the
+    log store with the file name as the source; the format is detected per line.
+    """
+
+    def __init__(self, store: LogStore):
+        self.store = store
+        self._thread = None
+        self._stop = threading.Event()
+
+    def paths(self) -> List[str]:
+        return [p.strip() for p in settings.LOG_TAIL_PATHS.split(",") if p.strip()]
+
+    def start(self):
+        if not self.paths() or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-tailer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        files = {}  # path -> {"handle", "inode", "partial"}
+        while not self._stop.is_set():
+            for path in self.paths():
+                try:
+                    self._poll(path, files)
+                except OSError as e:
+                    logger.warning(f"Tailing {path} failed: {e}")
+                    entry = files.pop(path, None)
+                    if entry:
+                        entry["handle"].close()
+            self._stop.wait(settings.LOG_TAIL_INTERVAL)
+        for entry in files.values():
+            entry["handle"].close()
+
+    def _poll(self, path: str, files: dict):
+        entry = files.get(path)
+        if not os.path.exists(path):
+            return
+        stat = os.stat(path)
+        if entry and (entry["inode"] != stat.st_ino or stat.st_size < entry["handle"].tell()):
+            # Rotated or truncated
+            entry["handle"].close()
+            entry = files[path] = {"handle": open(path, "rb"), "inode": stat.st_ino, "partial": b""}
+        elif entry is None:
+            handle = open(path, "rb")
+            handle.seek(0, os.SEEK_END)
+            entry = files[path] = {"handle": handle, "inode": stat.st_ino, "partial": b""}
+
+        data = entry["handle"].read(settings.LOG_INGEST_MAX_BYTES)
+        if not data:
+            return
+        data = entry["partial"] + data
+        complete, _, entry["partial"] = data.rpartition(b"\n")
+        if complete:
+            lines = complete.decode("utf-8", errors="replace").split("\n")
+            self.store.add(lines, source=os.path.basename(path))
+
+
+log_store = LogStore()
+log_tailer = LogTailer(log_store)
@@ -0,0 +1,214 @@
+import math
+import multiprocessing
+import re
+import struct
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.config import settings
+
+# Separators of the shared memory text section; shards containing them are sent back pickled instead
+RECORD_SEP = "\x1e"
+FIELD_SEP = "\x1f"
+HEADER = struct.Struct("<II")  # sample count, text section length
+
+COMMENT_RE = re.compile(r"^# (?:HELP|TYPE) (\S+)", re.MULTILINE)
+
+
+def parse_text(raw_text: str) -> List[dict]:
+    """Single-threaded parse, the shape parse_metrics has always returned."""
+    return [
+        {"name": sample.name, "labels": sample.labels, "value": sample.value, "type": family.type}
+        for family in text_string_to_metric_families(raw_text)
+        for sample in family.samples
+    ]
+
+
+def _family_start(raw_text: str, pos: int):
+    """Offset of the first family header line at or after `pos`, None if there's none."""
+    match = COMMENT_RE.search(raw_text, pos)
+    if not match:
+        return None
+    if match.start() == 0:
+        return 0
+    # "# HELP x" directly followed by "# TYPE x" (or the other way round) is one family header
+    previous_start = raw_text.rfind("\n", 0, match.start() - 1) + 1
+    previous = COMMENT_RE.match(raw_text, previous_start)
+    if previous and previous_start < match.start() and previous.group(1) == match.group(1):
+        return previous_start
+    return match.start()
+
+
+def split_families(raw_text: str, shards: int) -> List[str]:
+    """
+    Splits an exposition into about `shards` pieces, only ever at the start of a metric family,
+    so no family is cut in two. Expositions without HELP/TYPE lines can't be split and come back whole.
+    """
+    target = len(raw_text) // max(shards, 1)
+    pieces = []
+    start = 0
+    for i in range(1, shards):
+        split = _family_start(raw_text, max(i * target, start + 1))
+        if split is None:
+            break
+        if split <= start:
+            continue
+        pieces.append(raw_text[start:split])
+        start = split
+    pieces.append(raw_text[start:])
+    return pieces
+
+
+def _parse_shard(text: str):
+    """
+    Runs in a pool process. Values go into shared memory as float64s and names/types/labels as
+    one separator-joined string, so the parent never unpickles a dict per sample.
+    """
+    if RECORD_SEP in text or FIELD_SEP in text:
+        return ("inline", parse_text(text))
+
+    values = array("d")
+    records = []
+    for family in text_string_to_metric_families(text):
+        metric_type = family.type
+        for sample in family.samples:
+            values.append(sample.value)
+            fields = [metric_type, sample.name]
+            for key, value in sample.labels.items():
+                fields.append(key)
+                fields.append(value)
+            records.append(FIELD_SEP.join(fields))
+
+    value_bytes = values.tobytes()
+    text_bytes = RECORD_SEP.join(records).encode()
+    size = HEADER.size + len(value_bytes) + len(text_bytes)
+    shm = SharedMemory(create=True, size=max(size, 1))
+    HEADER.pack_into(shm.buf, 0, len(values), len(text_bytes))
+    shm.buf[HEADER.size:HEADER.size + len(value_bytes)] = value_bytes
+    shm.buf[HEADER.size + len(value_bytes):size] = text_bytes
+    name = shm.name
+    shm.close()
+    # The parent unlinks it once read; don't let this process' tracker clean it up (or warn) too
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return ("shm", name)
+
+
+def _read_shard(name: str) -> List[dict]:
+    shm = SharedMemory(name=name)
+    try:
+        count, text_length = HEADER.unpack_from(shm.buf, 0)
+        values = array("d")
+        values.frombytes(shm.buf[HEADER.size:HEADER.size + count * 8])
+        offset = HEADER.size + count * 8
+        text = bytes(shm.buf[offset:offset + text_length]).decode()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if not count:
+        return []
+    metrics = []
+    for value, record in zip(values, text.split(RECORD_SEP)):
+        fields = record.split(FIELD_SEP)
+        metrics.append({
+            "name": fields[1],
+            "labels": dict(zip(fields[2::2], fields[3::2])),
+            "value": value,
+            "type": fields[0]
+        })
+    return metrics
+
+
+def _discard(name: str):
+    shm = SharedMemory(name=name)
+    shm.close()
+    shm.unlink()
+
+
+class ParsePool:
+    """
+    Parses large expositions in a process pool, so a multi-MB payload doesn't hold this worker's
+    GIL (and stall every other request) for seconds. The payload is split at family boundaries,
+    shards are parsed in parallel and the results come back through shared memory.
+    Used by parse_metrics for payloads of at least PARSE_POOL_THRESHOLD_BYTES.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                workers = settings.PARSE_POOL_WORKERS or max(2, multiprocessing.cpu_count())
+                # spawn, not fork: forking a process that runs threads (uvicorn, httpx) can deadlock the child
+                self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def should_use(self, raw_text: str) -> bool:
+        return settings.PARSE_POOL_ENABLED and len(raw_text) >= settings.PARSE_POOL_THRESHOLD_BYTES
+
+    def _discard_pool(self, executor: ProcessPoolExecutor):
+        # Another thread may already have replaced it
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def parse(self, raw_text: str) -> List[dict]:
+        # Even an unsplittable payload goes to the pool: the point is to get it off this process' GIL
+        shards = split_families(raw_text, max(2, math.ceil(len(raw_text) / settings.PARSE_POOL_SHARD_BYTES)))
+        for attempt in range(2):
+            executor = self._pool()
+            try:
+                return self._parse_shards(executor, shards)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed): a broken pool never recovers, start a new one and retry once
+                self._discard_pool(executor)
+                if attempt:
+                    raise
+
+    def _parse_shards(self, executor: ProcessPoolExecutor, shards: List[str]) -> List[dict]:
+        futures = []
+        error = None
+        for shard in shards:
+            try:
+                futures.append(executor.submit(_parse_shard, shard))
+            except BrokenProcessPool as e:
+                error = e
+                break
+        # Wait for every shard before reading any, so a failed shard can't leave the others' segments behind
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                error = error or e
+
+        metrics = []
+        for kind, payload in results:
+            if kind == "inline":
+                metrics.extend(payload)
+            elif error is None:
+                metrics.extend(_read_shard(payload))
+            else:
+                _discard(payload)
+        if error is not None:
+            raise error
+        return metrics
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+parse_pool = ParsePool()
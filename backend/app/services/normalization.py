@@ -1,4 +1,5 @@
 import time
+from app.services.instrumentation import normalize_duration
 
 class NormalizationService:
     def normalize_metrics(self, raw_metrics: list[dict]) -> list[dict]:
@@ -20,6 +21,7 @@ class NormalizationService:
         cpu_load = None
         
         timestamp = int(time.time())
+        start = time.perf_counter()
 
         for m in raw_metrics:
             name = m["name"]
@@ -81,6 +83,7 @@ class NormalizationService:
                 "timestamp": timestamp
             })
             
+        normalize_duration.observe(time.perf_counter() - start)
         return normalized
 
 normalization_service = NormalizationService()
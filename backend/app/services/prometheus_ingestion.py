@@ -1,35 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
 import requests
-from prometheus_client.parser import text_string_to_metric_families
+from app.config import settings
+from app.services.metrics_parsing import parse_text, parse_pool
+from app.services.sample_store import sample_store
+from app.services.target_health import target_health
+from app.services.instrumentation import observe_upstream, parse_bytes, parse_duration, target_host, timed
+
+# Runs the hedged scrapes (the caller already is a threadpool thread, the sync routes block on the result)
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="scrape-hedge")
 
 class PrometheusIngestionService:
-    def fetch_prometheus_metrics(self, url: str) -> str:
+    def fetch_prometheus_metrics(self, url: str, hedge: Optional[bool] = None) -> str:
         """
         Fetches raw metrics from a Prometheus endpoint.
+        Fails fast with CircuitOpenError while the target is known to be down, and times out
+        after what the target usually takes (see target_health) instead of a flat 10s.
+        With hedging (SCRAPE_HEDGE_ENABLED or hedge=True) a second request is sent when the
+        first one is slower than the target's usual (p90) latency, and whichever answers first wins.
         """
+        target_health.before_request(url)
+        timeout = target_health.timeout_for(url)
+        use_hedge = settings.SCRAPE_HEDGE_ENABLED if hedge is None else hedge
+        hedge_delay = target_health.hedge_delay(url) if use_hedge else None
+
+        start = time.perf_counter()
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.text
+            if hedge_delay is None:
+                text = self._get(url, timeout)
+            else:
+                text = self._hedged_get(url, timeout, hedge_delay)
+        except requests.HTTPError as e:
+            # A 4xx is the target answering (wrong path, auth), not the target being down
+            if e.response is not None and e.response.status_code < 500:
+                target_health.record_success(url, time.perf_counter() - start)
+            else:
+                target_health.record_failure(url, str(e))
+            raise Exception(f"Failed to fetch metrics from {url}: {str(e)}")
         except requests.RequestException as e:
+            target_health.record_failure(url, str(e))
             raise Exception(f"Failed to fetch metrics from {url}: {str(e)}")
 
+        target_health.record_success(url, time.perf_counter() - start)
+        return text
+
+    def _get(self, url: str, timeout: float) -> str:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = requests.get(url, timeout=timeout)
+            status = response.status_code
+            response.raise_for_status()
+            return response.text
+        finally:
+            observe_upstream("scrape", target_host(url), status, time.perf_counter() - start)
+
+    def _hedged_get(self, url: str, timeout: float, delay: float) -> str:
+        first = _hedge_pool.submit(self._get, url, timeout)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        pending = {first, _hedge_pool.submit(self._get, url, timeout)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    # The slower request can't be cancelled, it runs out on its own timeout
+                    return future.result()
+                except requests.RequestException as e:
+                    error = e
+        raise error
+
+    def pushed_metrics(self, instance: str) -> list[dict]:
+        """
+        Latest samples a target pushed to /ingest (remote-write or OTLP), shaped like parse_metrics.
+        For targets we can't scrape: behind NAT, short-lived jobs.
+        """
+        return sample_store.latest(instance=instance)
+
     def parse_metrics(self, raw_text: str) -> list[dict]:
         """
         Parses raw Prometheus text format into a structured list of dictionaries.
+        Payloads over PARSE_POOL_THRESHOLD_BYTES are parsed in the process pool (split at family
+        boundaries), so they don't hold the GIL for seconds while other requests wait.
         """
-        parsed_metrics = []
         try:
-            # text_string_to_metric_families returns a generator of MetricFamily objects
-            for family in text_string_to_metric_families(raw_text):
-                for sample in family.samples:
-                    metric = {
-                        "name": sample.name,
-                        "labels": sample.labels,
-                        "value": sample.value,
-                        "type": family.type
-                    }
-                    parsed_metrics.append(metric)
-            return parsed_metrics
+            parse_bytes.inc(len(raw_text))
+            if parse_pool.should_use(raw_text):
+                with timed(parse_duration, mode="pool"):
+                    return parse_pool.parse(raw_text)
+            with timed(parse_duration, mode="inline"):
+                return parse_text(raw_text)
         except Exception as e:
              raise Exception(f"Failed to parse metrics: {str(e)}")
 
@@ -0,0 +1,266 @@
+import functools
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app.config import settings
+from app.services.sample_store import sample_store
+
+REMOTE_WRITE = "remote-write"
+OTLP = "otlp"
+
+# Remote-write metadata types -> the Prometheus text format names parse_metrics reports
+REMOTE_WRITE_TYPES = {
+    "COUNTER": "counter", "GAUGE": "gauge", "HISTOGRAM": "histogram", "GAUGEHISTOGRAM": "gaugehistogram",
+    "SUMMARY": "summary", "INFO": "info", "STATESET": "stateset",
+}
+
+
+class IngestBackpressure(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Ingestion is behind, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def decode_remote_write(payload: dict) -> List[tuple]:
+    """
+    JSON form of a remote-write WriteRequest:
+        {"timeseries": [{"labels": [{"name": "__name__", "value": "up"}, ...],
+                         "samples": [{"value": 1, "timestamp": 1700000000000}]}],
+         "metadata": [{"type": "GAUGE", "metricFamilyName": "up"}]}
+    Returns sample store rows: (name, labels, timestamps, values, type).
+    """
+    types = {}
+    for meta in payload.get("metadata") or ():
+        family = meta.get("metricFamilyName") or meta.get("metric_family_name")
+        if family:
+            types[family] = REMOTE_WRITE_TYPES.get(str(meta.get("type", "")).upper(), "unknown")
+
+    now = None
+    rows = []
+    for series in payload.get("timeseries") or ():
+        labels = {label["name"]: label["value"] for label in series.get("labels") or ()}
+        name = labels.pop("__name__", None)
+        samples = series.get("samples")
+        if not name or not samples:
+            continue
+        timestamps = []
+        for sample in samples:
+            ts = sample.get("timestamp")
+            if ts is None:
+                now = now or _now_ms()
+                ts = now
+            timestamps.append(int(ts))
+        # float() also takes the "NaN"/"Infinity" strings the JSON mapping uses for special values
+        values = [float(sample["value"]) for sample in samples]
+        rows.append((name, labels, timestamps, values, types.get(name, "unknown")))
+    return rows
+
+
+@functools.lru_cache(maxsize=4096)
+def _prom_name(name: str) -> str:
+    # OTLP names/attribute keys use dots ("http.server.duration"), Prometheus needs [a-zA-Z0-9_]
+    name = re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+
+def _attributes(attributes) -> dict:
+    labels = {}
+    for attribute in attributes or ():
+        value = attribute.get("value") or {}
+        # {"stringValue": "x"} / {"intValue": "3"} / {"doubleValue": 1.5} / {"boolValue": true}
+        for kind, raw in value.items():
+            labels[_prom_name(attribute["key"])] = str(raw).lower() if kind == "boolValue" else str(raw)
+            break
+    return labels
+
+
+def _resource_labels(resource: dict) -> dict:
+    """Maps resource attributes to job/instance the way Prometheus' own OTLP receiver does."""
+    attributes = {a["key"]: a.get("value") or {} for a in (resource or {}).get("attributes") or ()}
+    labels = {}
+    service = attributes.get("service.name", {}).get("stringValue")
+    namespace = attributes.get("service.namespace", {}).get("stringValue")
+    if service:
+        labels["job"] = f"{namespace}/{service}" if namespace else service
+    instance = attributes.get("service.instance.id", {}).get("stringValue")
+    if instance:
+        labels["instance"] = instance
+    return labels
+
+
+def _point_time(point: dict, default: int) -> int:
+    nanos = point.get("timeUnixNano")
+    return int(nanos) // 1_000_000 if nanos else default
+
+
+def decode_otlp(payload: dict) -> List[tuple]:
+    """
+    OTLP/HTTP JSON metrics (ExportMetricsServiceRequest). Gauges and sums become one series per
+    data point; histograms are expanded to _bucket/_sum/_count like Prometheus exposes them.
+    """
+    now = _now_ms()
+    rows = []
+    for resource_metrics in payload.get("resourceMetrics") or ():
+        base = _resource_labels(resource_metrics.get("resource"))
+        for scope_metrics in resource_metrics.get("scopeMetrics") or ():
+            for metric in scope_metrics.get("metrics") or ():
+                name = _prom_name(metric.get("name") or "")
+                if not name:
+                    continue
+
+                if "gauge" in metric or "sum" in metric:
+                    data = metric.get("gauge") or metric.get("sum") or {}
+                    metric_type = "counter" if "sum" in metric and data.get("isMonotonic") else "gauge"
+                    for point in data.get("dataPoints") or ():
+                        value = point.get("asDouble", point.get("asInt"))  # asInt is a string in OTLP JSON
+                        if value is None:
+                            continue
+                        labels = {**base, **_attributes(point.get("attributes"))}
+                        rows.append((name, labels, (_point_time(point, now),), (float(value),), metric_type))
+
+                elif "histogram" in metric:
+                    for point in metric["histogram"].get("dataPoints") or ():
+                        labels = {**base, **_attributes(point.get("attributes"))}
+                        ts = (_point_time(point, now),)
+                        count = float(point.get("count", 0))
+                        rows.append((f"{name}_count", labels, ts, (count,), "histogram"))
+                        if "sum" in point:
+                            rows.append((f"{name}_sum", labels, ts, (float(point["sum"]),), "histogram"))
+                        cumulative = 0.0
+                        for bound, bucket in zip(point.get("explicitBounds") or (), point.get("bucketCounts") or ()):
+                            cumulative += float(bucket)
+                            rows.append((f"{name}_bucket", {**labels, "le": repr(float(bound))}, ts, (cumulative,), "histogram"))
+                        rows.append((f"{name}_bucket", {**labels, "le": "+Inf"}, ts, (count,), "histogram"))
+    return rows
+
+
+DECODERS = {REMOTE_WRITE: decode_remote_write, OTLP: decode_otlp}
+
+
+class PushIngestor:
+    """
+    Accepts pushed batches and decodes them into the sample store on a background thread,
+    so the request is acknowledged (202) as soon as the body is read.
+    Undecoded bytes are bounded by INGEST_MAX_PENDING_BYTES: past that, pushes are refused
+    with a Retry-After estimated from the observed decode rate.
+    One thread keeps batches in arrival order; decoding is CPU bound so more wouldn't help under the GIL.
+    """
+
+    def __init__(self, store=sample_store):
+        self.store = store
+        self._executor = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._batches: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending_bytes = 0
+        self._pending_batches = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.samples = 0
+        self._busy_seconds = 0.0
+        self._bytes_done = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="push-ingest")
+        return self._executor
+
+    def _retry_after(self) -> int:
+        rate = self._bytes_done / self._busy_seconds if self._busy_seconds else 0
+        if not rate:
+            return 1
+        return max(1, min(30, math.ceil(self._pending_bytes / rate)))
+
+    def submit(self, fmt: str, body: bytes, content_encoding: str = None) -> dict:
+        """Queues a batch for decoding. Raises IngestBackpressure when too much is already queued."""
+        size = len(body)
+        with self._lock:
+            # A single batch is always let through when nothing is queued, whatever its size
+            if self._pending_batches and self._pending_bytes + size > settings.INGEST_MAX_PENDING_BYTES:
+                self.rejected += 1
+                raise IngestBackpressure(self._retry_after())
+            self._pending_bytes += size
+            self._pending_batches += 1
+            self.accepted += 1
+            # pid in the id so acks from different workers never collide
+            batch_id = f"{os.getpid()}-{next(self._ids)}"
+            self._batches[batch_id] = {"batch_id": batch_id, "format": fmt, "status": "queued", "bytes": size}
+            while len(self._batches) > settings.INGEST_BATCH_HISTORY:
+                self._batches.popitem(last=False)
+            pending = self._pending_bytes
+
+        self._pool().submit(self._process, batch_id, fmt, body, content_encoding)
+        return {"batch_id": batch_id, "status": "queued", "pending_bytes": pending}
+
+    def _process(self, batch_id: str, fmt: str, body: bytes, content_encoding: str):
+        start = time.perf_counter()
+        size = len(body)
+        result = {"status": "done"}
+        try:
+            if content_encoding == "gzip":
+                decompressor = zlib.decompressobj(47)  # gzip or zlib header
+                body = decompressor.decompress(body, settings.INGEST_MAX_BATCH_BYTES)
+                if decompressor.unconsumed_tail:
+                    raise ValueError(f"Decompressed batch is larger than {settings.INGEST_MAX_BATCH_BYTES} bytes")
+            rows = DECODERS[fmt](json.loads(body))
+            result["samples"] = self.store.append_batch(rows)
+            result["series"] = len(rows)
+        except Exception as e:
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending_bytes -= size
+                self._pending_batches -= 1
+                self._busy_seconds += elapsed
+                self._bytes_done += size
+                if result["status"] == "failed":
+                    self.failed += 1
+                else:
+                    self.samples += result["samples"]
+                batch = self._batches.get(batch_id)
+                if batch is not None:
+                    batch.update(result, decode_ms=round(elapsed * 1000, 2))
+
+    def batch(self, batch_id: str):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return dict(batch) if batch else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "accepted_batches": self.accepted,
+                "rejected_batches": self.rejected,
+                "failed_batches": self.failed,
+                "pending_batches": self._pending_batches,
+                "pending_bytes": self._pending_bytes,
+                "samples_ingested": self.samples,
+                "samples_per_busy_second": round(self.samples / self._busy_seconds) if self._busy_seconds else None,
+                "store": self.store.stats()
+            }
+
+    def shutdown(self):
+        # Finishes what's already queued
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+push_ingestor = PushIngestor()
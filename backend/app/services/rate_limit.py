@@ -0,0 +1,269 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from app.config import settings
+from app.services.token_hash import hash_token
+
+# Request priorities. Interactive calls are the ones a user is actively waiting on
+# (commit, select, secrets); background calls are analysis refreshes and listings.
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Lets a whole task (e.g. a bulk rollout) run as background work, whatever priority the
+# individual client calls ask for. Context vars are per asyncio task.
+_priority_override: ContextVar[Optional[str]] = ContextVar("github_priority_override", default=None)
+
+
+@contextmanager
+def priority_scope(priority: str):
+    reset = _priority_override.set(priority)
+    try:
+        yield
+    finally:
+        _priority_override.reset(reset)
+
+
+def effective_priority(priority: str) -> str:
+    return _priority_override.get() or priority
+
+
+# Secondary limits without a (readable) Retry-After: GitHub asks for at least a minute
+DEFAULT_RETRY_AFTER = 60.0
+
+
+def retry_after_seconds(value: str) -> float:
+    """Retry-After is either delay-seconds or an HTTP-date; anything else gets the default wait."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)  # "-0000": UTC as well
+        seconds = when.timestamp() - time.time()
+    return max(seconds, 0.0) if math.isfinite(seconds) else DEFAULT_RETRY_AFTER
+
+class RateLimitedError(Exception):
+    """An interactive call would have to wait longer than GITHUB_INTERACTIVE_MAX_WAIT."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"GitHub rate limit exceeded, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class _TokenState:
+    """Budget + pacing state for a single GitHub token."""
+
+    def __init__(self, burst: int):
+        self.tokens = float(burst)          # token bucket
+        self.last_refill = time.monotonic()
+        self.remaining: Optional[int] = None  # X-RateLimit-Remaining
+        self.reset_at: Optional[float] = None  # X-RateLimit-Reset (monotonic)
+        self.blocked_until = 0.0             # set by Retry-After / exhausted budget
+        self.interactive_waiting = 0
+
+
+class GitHubRateLimiter:
+    """
+    Per-token request scheduler for the GitHub API.
+    - token bucket pacing, slowed down to spread the remaining budget until reset
+    - interactive calls go first: background calls wait while interactive ones are queued,
+      always leave a few bucket tokens spare, and pause when the hourly budget runs low
+    - 403/429 rate limit responses block the token and are retried with exponential backoff + jitter
+    - only background calls wait out a long block (e.g. until the hourly reset), interactive ones
+      give up after GITHUB_INTERACTIVE_MAX_WAIT so the user gets a 429 instead of a hanging request
+    """
+
+    MAX_POLL = 1.0
+    MAX_TRACKED_TOKENS = 1024
+
+    def __init__(self):
+        self.rate = settings.GITHUB_RATE_PER_SECOND
+        self.burst = settings.GITHUB_BURST
+        self.interactive_reserve = settings.GITHUB_INTERACTIVE_RESERVE
+        self.low_watermark = settings.GITHUB_BUDGET_LOW_WATERMARK
+        self.max_retries = settings.GITHUB_MAX_RETRIES
+        self.backoff_base = settings.GITHUB_BACKOFF_BASE
+        self.backoff_max = settings.GITHUB_BACKOFF_MAX
+        self.interactive_max_wait = settings.GITHUB_INTERACTIVE_MAX_WAIT
+
+        self._states: "OrderedDict[str, _TokenState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {
+            p: {"requests": 0, "queue_wait_total": 0.0, "queue_wait_max": 0.0, "retries": 0}
+            for p in PRIORITIES
+        }
+        self._throttle_events = {"secondary": 0, "primary": 0}
+
+    def _state(self, token: str) -> _TokenState:
+        key = hash_token(token)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _TokenState(self.burst)
+            while len(self._states) > self.MAX_TRACKED_TOKENS:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(key)
+        return state
+
+    def _refill_rate(self, state: _TokenState, now: float) -> float:
+        # Once GitHub has told us the budget, don't spend it faster than it resets
+        if state.remaining is not None and state.reset_at and state.reset_at > now:
+            return max(min(self.rate, state.remaining / (state.reset_at - now)), 0.01)
+        return self.rate
+
+    def try_acquire(self, token: str, priority: str = BACKGROUND) -> float:
+        """Takes a slot if one is free. Returns 0 on success, otherwise the seconds to wait before retrying."""
+        with self._lock:
+            state = self._state(token)
+            now = time.monotonic()
+
+            if state.reset_at and now >= state.reset_at:
+                state.remaining, state.reset_at = None, None
+
+            rate = self._refill_rate(state, now)
+            state.tokens = min(self.burst, state.tokens + (now - state.last_refill) * rate)
+            state.last_refill = now
+
+            if state.blocked_until > now:
+                return state.blocked_until - now
+            if state.remaining == 0 and state.reset_at:
+                return state.reset_at - now
+
+            floor = 0
+            if priority == BACKGROUND:
+                if state.interactive_waiting:
+                    return 1.0 / rate
+                if state.remaining is not None and state.remaining <= self.low_watermark and state.reset_at:
+                    return state.reset_at - now
+                floor = self.interactive_reserve
+
+            if state.tokens - floor < 1:
+                return (floor + 1 - state.tokens) / rate
+
+            state.tokens -= 1
+            if state.remaining is not None:
+                state.remaining = max(state.remaining - 1, 0)
+            return 0.0
+
+    @contextmanager
+    def _queued(self, token: str, priority: str):
+        if priority != INTERACTIVE:
+            yield
+            return
+        with self._lock:
+            self._state(token).interactive_waiting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                state = self._state(token)
+                state.interactive_waiting = max(state.interactive_waiting - 1, 0)
+
+    async def acquire(self, token: str, priority: str = BACKGROUND) -> float:
+        """
+        Waits (on the event loop) until the request may be sent. Returns the time spent queued.
+        Raises RateLimitedError for interactive calls that would wait past interactive_max_wait.
+        """
+        start = time.monotonic()
+        with self._queued(token, priority):
+            while True:
+                wait = self.try_acquire(token, priority)
+                if wait <= 0:
+                    break
+                if priority == INTERACTIVE and time.monotonic() - start + wait > self.interactive_max_wait:
+                    self._record_wait(priority, time.monotonic() - start)
+                    raise RateLimitedError(wait)
+                await asyncio.sleep(min(wait, self.MAX_POLL))
+        waited = time.monotonic() - start
+        self._record_wait(priority, waited)
+        return waited
+
+    def _record_wait(self, priority: str, waited: float):
+        with self._lock:
+            m = self._metrics[priority]
+            m["requests"] += 1
+            m["queue_wait_total"] += waited
+            m["queue_wait_max"] = max(m["queue_wait_max"], waited)
+
+    def record_response(self, token: str, status_code: int, headers, body: str = "") -> Optional[float]:
+        """
+        Updates the budget from the response headers.
+        Returns the minimum delay before a retry if the response was a rate limit, else None.
+        """
+        now = time.monotonic()
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        retry_after = headers.get("Retry-After")
+
+        with self._lock:
+            state = self._state(token)
+            if remaining is not None:
+                state.remaining = int(remaining)
+            if reset is not None:
+                # Reset is a unix timestamp, convert to our monotonic clock
+                state.reset_at = now + max(int(reset) - time.time(), 0)
+
+            if status_code not in (403, 429):
+                return None
+
+            if retry_after is not None:
+                delay = retry_after_seconds(retry_after)
+                kind = "secondary"
+            elif remaining == "0" and state.reset_at:
+                delay = state.reset_at - now
+                kind = "primary"
+            elif "rate limit" in (body or "").lower():
+                # Secondary limit without Retry-After: GitHub asks for at least a minute
+                delay = DEFAULT_RETRY_AFTER
+                kind = "secondary"
+            else:
+                return None  # a real permission error
+
+            state.blocked_until = max(state.blocked_until, now + delay)
+            self._throttle_events[kind] += 1
+            return delay
+
+    def backoff(self, attempt: int, min_delay: float = 0.0) -> float:
+        """Exponential backoff with full jitter, never shorter than what GitHub asked for."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return max(min_delay, random.uniform(0, cap))
+
+    def record_retry(self, priority: str):
+        with self._lock:
+            self._metrics[priority]["retries"] += 1
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            queues = {}
+            for p, m in self._metrics.items():
+                queues[p] = {
+                    "requests": m["requests"],
+                    "retries": m["retries"],
+                    "queue_wait_avg": round(m["queue_wait_total"] / m["requests"], 4) if m["requests"] else 0.0,
+                    "queue_wait_max": round(m["queue_wait_max"], 4),
+                }
+            budgets = [s.remaining for s in self._states.values() if s.remaining is not None]
+            return {
+                "queues": queues,
+                "throttle_events": dict(self._throttle_events),
+                "tracked_tokens": len(self._states),
+                "blocked_tokens": sum(1 for s in self._states.values() if s.blocked_until > now),
+                "min_remaining": min(budgets) if budgets else None,
+            }
+
+
+github_rate_limiter = GitHubRateLimiter()
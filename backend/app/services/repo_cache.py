@@ -0,0 +1,117 @@
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from app.config import settings
+from app.services.token_hash import hash_token
+
+# Namespaces of cached GitHub reads
+CONTENTS = "contents"
+TREE = "tree"
+ANALYSIS = "analysis"
+
+MISS = object()
+
+
+class RepoCache:
+    """
+    Cache for per-repo GitHub reads (file contents, directory listings, trees, analysis results).
+    Entries are grouped by repo so a push webhook can drop exactly what it touched.
+    Keys include a hash of the token, so one user's cached reads are never served to another.
+
+    `ref` is None for reads of the default branch. Reads pinned to a commit SHA never go
+    stale, so push invalidation (which names branch refs) doesn't touch them.
+    """
+
+    def __init__(self):
+        # "owner/repo" -> {(namespace, ref, path, token_hash): (expires_at, value)}
+        self._repos: "OrderedDict[str, dict]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _repo_key(self, owner: str, repo: str) -> str:
+        return f"{owner}/{repo}".lower()
+
+    def get(self, namespace: str, token: str, owner: str, repo: str, path: str = "", ref: Optional[str] = None):
+        """Returns the cached value or the MISS sentinel (None is a valid cached value)."""
+        key = (namespace, ref, path, hash_token(token))
+        repo_key = self._repo_key(owner, repo)
+        with self._lock:
+            entries = self._repos.get(repo_key)
+            entry = entries.get(key) if entries else None
+            if entry is not None and entry[0] <= time.monotonic():
+                # Expired: drop it so the size and stats only count live entries
+                del entries[key]
+                self._size -= 1
+                if not entries:
+                    del self._repos[repo_key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self._repos.move_to_end(repo_key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, namespace: str, token: str, owner: str, repo: str, value, path: str = "", ref: Optional[str] = None):
+        key = (namespace, ref, path, hash_token(token))
+        repo_key = self._repo_key(owner, repo)
+        with self._lock:
+            entries = self._repos.setdefault(repo_key, {})
+            if key not in entries:
+                self._size += 1
+            entries[key] = (time.monotonic() + settings.REPO_CACHE_TTL, value)
+            self._repos.move_to_end(repo_key)
+
+            # Evict least recently used repos as a whole
+            while self._size > settings.REPO_CACHE_MAX_ENTRIES and len(self._repos) > 1:
+                _, evicted = self._repos.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, owner: str, repo: str, refs: Optional[Iterable[Optional[str]]] = None,
+                   paths: Optional[Iterable[str]] = None) -> int:
+        """
+        Drops cached entries for a repo and returns how many were removed.
+        - refs: only entries for these refs (None in the list = default branch reads); all refs if omitted
+        - paths: only these files, their parent directory listings, and everything in TREE/ANALYSIS
+          (a changed file can change both); the whole ref if omitted
+        """
+        refs = set(refs) if refs is not None else None
+        affected = None
+        if paths is not None:
+            affected = set()
+            for path in paths:
+                affected.add(path)
+                # Every parent directory listing, up to the root ("")
+                while path:
+                    path = posixpath.dirname(path)
+                    affected.add(path)
+
+        repo_key = self._repo_key(owner, repo)
+        with self._lock:
+            entries = self._repos.get(repo_key)
+            if not entries:
+                return 0
+
+            stale = [
+                key for key in entries
+                if (refs is None or key[1] in refs)
+                and (affected is None or key[0] != CONTENTS or key[2] in affected)
+            ]
+            for key in stale:
+                del entries[key]
+            self._size -= len(stale)
+            if not entries:
+                del self._repos[repo_key]
+            return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"repos": len(self._repos), "entries": self._size, "hits": self.hits, "misses": self.misses}
+
+
+repo_cache = RepoCache()
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.github import github_client
+from app.services.token_hash import hash_token
+
+SORT_KEYS = ("updated", "pushed", "name", "full_name")
+
+
+def _grams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class RepoSearchIndex:
+    """
+    In-memory search index over a user's repository listing. A query matches repos whose
+    full_name contains it anywhere (case-insensitive), whatever its length:
+    - 1 and 2 character grams of full_name answer short queries with a single lookup
+    - trigrams of full_name narrow down longer queries, which are then confirmed as substrings
+    Sort orders are precomputed once so a query is just set intersections + a slice.
+    """
+
+    def __init__(self, repos: List[dict]):
+        # `repos` are the simplified dicts returned by /repos/, in GitHub "updated" order
+        self.repos = repos
+        self._haystack = [r["full_name"].lower() for r in repos]
+        # n -> gram -> indexes of the repos containing it
+        self._grams: Dict[int, Dict[str, Set[int]]] = {1: {}, 2: {}, 3: {}}
+
+        for idx, text in enumerate(self._haystack):
+            for n, grams in self._grams.items():
+                for gram in _grams(text, n):
+                    grams.setdefault(gram, set()).add(idx)
+
+        # order[sort] is the list of indexes in that order, rank[sort][idx] its position
+        self._order = {
+            "updated": list(range(len(repos))),
+            "pushed": sorted(range(len(repos)), key=lambda i: repos[i].get("pushed_at") or "", reverse=True),
+            "name": sorted(range(len(repos)), key=lambda i: repos[i]["name"].lower()),
+            "full_name": sorted(range(len(repos)), key=lambda i: self._haystack[i]),
+        }
+        self._rank = {}
+        for key, order in self._order.items():
+            rank = [0] * len(order)
+            for pos, idx in enumerate(order):
+                rank[idx] = pos
+            self._rank[key] = rank
+
+    def _match(self, query: str) -> Set[int]:
+        if len(query) < 3:
+            return set(self._grams[len(query)].get(query, ()))
+
+        trigrams = self._grams[3]
+        grams = sorted(_grams(query, 3), key=lambda g: len(trigrams.get(g, ())))
+        candidates = set(trigrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= trigrams.get(gram, set())
+        # Trigrams can match out of order, so confirm the real substring
+        return {idx for idx in candidates if query in self._haystack[idx]}
+
+    def search(self, query: Optional[str] = None, sort: str = "updated", page: int = 1, per_page: Optional[int] = None):
+        """Returns (total_matches, repos for the requested page)."""
+        query = (query or "").strip().lower()
+
+        if query:
+            rank = self._rank[sort]
+            ids = sorted(self._match(query), key=rank.__getitem__)
+        else:
+            ids = self._order[sort]
+
+        total = len(ids)
+        if per_page:
+            start = (page - 1) * per_page
+            ids = ids[start:start + per_page]
+
+        return total, [self.repos[idx] for idx in ids]
+
+
+class RepoListingCache:
+    """
+    Per-token cache of the merged repo listing and its search index.
+    Keyed by a hash of the token; bounded LRU with a TTL.
+    Concurrent loads for the same token share one GitHub listing.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get_index(self, token: str, loader: Callable[[], Awaitable[List[dict]]], refresh: bool = False) -> RepoSearchIndex:
+        key = hash_token(token)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and not refresh and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # A load already in flight is as fresh as a refresh would be, so join it
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The caller doing the load went away: take over unless we were cancelled too
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # Load outside the lock, a slow GitHub listing shouldn't block other users
+            index = RepoSearchIndex(await loader())
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, index)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            future.set_result(index)
+            return index
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark as retrieved, waiters still get it
+            raise
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                future.cancel()
+
+    def invalidate(self, token: str):
+        with self._lock:
+            self._entries.pop(hash_token(token), None)
+
+
+async def load_repo_listing(token: str) -> List[dict]:
+    """Every repo the token can access, trimmed to what the frontend (and the index) needs."""
+    repos = await github_client.get_repos(token)
+    return [
+        {
+            "id": r["id"],
+            "name": r["name"],
+            "full_name": r["full_name"],
+            "owner": r["owner"]["login"],
+            "html_url": r["html_url"],
+            "description": r["description"],
+            "private": r["private"],
+            "pushed_at": r.get("pushed_at")
+        }
+        for r in repos
+    ]
+
+
+repo_listing_cache = RepoListingCache(settings.REPO_LIST_CACHE_TTL, settings.REPO_LIST_CACHE_SIZE)
@@ -0,0 +1,170 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+# (name, ((label, value), ...)) with labels sorted, so the same series always maps to the same key
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Series:
+    __slots__ = ("name", "labels", "type", "timestamps", "values", "updated")
+
+    def __init__(self, name: str, labels: dict, metric_type: str):
+        self.name = name
+        self.labels = labels
+        self.type = metric_type
+        self.timestamps = array("q")  # unix milliseconds, oldest first
+        self.values = array("d")
+        self.updated = time.monotonic()  # last push, for expiry
+
+
+class SampleStore:
+    """
+    Compact in-memory store for pushed samples. Each series keeps its labels once and its
+    points in two flat arrays (8 bytes per timestamp and per value) instead of a dict per sample.
+    Series keep the newest SAMPLE_STORE_POINTS_PER_SERIES points. Series nobody pushed to for
+    SAMPLE_STORE_SERIES_TTL are expired (short-lived jobs come and go); new series past
+    SAMPLE_STORE_MAX_SERIES live ones are dropped (and counted) rather than growing without bound.
+    """
+
+    def __init__(self, points_per_series: int = None, max_series: int = None, series_ttl: float = None):
+        self.points_per_series = points_per_series or settings.SAMPLE_STORE_POINTS_PER_SERIES
+        self.max_series = max_series or settings.SAMPLE_STORE_MAX_SERIES
+        self.series_ttl = series_ttl or settings.SAMPLE_STORE_SERIES_TTL
+        # Least recently pushed first, so expired series are always at the front
+        self._series: "OrderedDict[SeriesKey, _Series]" = OrderedDict()
+        # instance label -> keys of its series, so per-target reads don't scan everything
+        self._by_instance: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.samples_total = 0
+        self.dropped_series = 0
+        self.expired_series = 0
+
+    @staticmethod
+    def key(name: str, labels: dict) -> SeriesKey:
+        return (name, tuple(sorted(labels.items())))
+
+    def append(self, name: str, labels: dict, timestamps: Iterable[int], values: Iterable[float],
+               metric_type: str = "unknown") -> int:
+        """Appends points to one series (creating it if needed). Returns how many were stored."""
+        with self._lock:
+            return self._append(self.key(name, labels), name, labels, timestamps, values, metric_type)
+
+    def append_batch(self, rows: Iterable[tuple]) -> int:
+        """
+        Appends (name, labels, timestamps, values, type) rows under a single lock acquisition.
+        Decoders build the rows straight from the request payload.
+        """
+        stored = 0
+        with self._lock:
+            for name, labels, timestamps, values, metric_type in rows:
+                stored += self._append(self.key(name, labels), name, labels, timestamps, values, metric_type)
+        return stored
+
+    def _append(self, key: SeriesKey, name: str, labels: dict, timestamps, values, metric_type: str) -> int:
+        series = self._series.get(key)
+        if series is None:
+            self._expire()
+            if len(self._series) >= self.max_series:
+                self.dropped_series += 1
+                return 0
+            series = self._series[key] = _Series(name, labels, metric_type)
+            self._by_instance.setdefault(labels.get("instance", ""), set()).add(key)
+        else:
+            series.updated = time.monotonic()
+            self._series.move_to_end(key)
+
+        before = len(series.values)
+        series.timestamps.extend(timestamps)
+        series.values.extend(values)
+        added = len(series.values) - before
+
+        # Trim in blocks (a quarter of the capacity) so the memmove isn't paid on every append
+        overflow = len(series.values) - self.points_per_series
+        if overflow > self.points_per_series // 4:
+            del series.timestamps[:overflow]
+            del series.values[:overflow]
+
+        self.samples_total += added
+        return added
+
+    def _expire(self):
+        """Drops the series nobody pushed to within series_ttl. Called with the lock held."""
+        cutoff = time.monotonic() - self.series_ttl
+        while self._series:
+            key, series = next(iter(self._series.items()))
+            if series.updated > cutoff:
+                break
+            del self._series[key]
+            instance = series.labels.get("instance", "")
+            keys = self._by_instance.get(instance)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_instance[instance]
+            self.expired_series += 1
+
+    def latest(self, instance: Optional[str] = None, job: Optional[str] = None) -> List[dict]:
+        """
+        Newest point of every matching series, in the same shape as `parse_metrics`
+        (plus the timestamp), so pushed targets go through the usual normalize/agent pipeline.
+        """
+        with self._lock:
+            self._expire()
+            if instance is not None:
+                keys = self._by_instance.get(instance, ())
+                candidates = [self._series[k] for k in keys]
+            else:
+                candidates = list(self._series.values())
+
+            metrics = []
+            for series in candidates:
+                if job is not None and series.labels.get("job") != job:
+                    continue
+                if not series.values:
+                    continue
+                metrics.append({
+                    "name": series.name,
+                    "labels": series.labels,
+                    "value": series.values[-1],
+                    "type": series.type,
+                    "timestamp": series.timestamps[-1]
+                })
+        metrics.sort(key=lambda m: m["name"])
+        return metrics
+
+    def targets(self) -> List[dict]:
+        """Pushed instances and how many series each has."""
+        with self._lock:
+            self._expire()
+            return [
+                {"instance": instance, "series": len(keys)}
+                for instance, keys in sorted(self._by_instance.items())
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            points = sum(len(s.values) for s in self._series.values())
+            return {
+                "series": len(self._series),
+                "points": points,
+                "approx_bytes": points * 16,  # one int64 timestamp + one float64 value
+                "samples_total": self.samples_total,
+                "dropped_series": self.dropped_series,
+                "expired_series": self.expired_series,
+                "max_series": self.max_series,
+                "points_per_series": self.points_per_series,
+                "series_ttl": self.series_ttl
+            }
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._by_instance.clear()
+
+
+sample_store = SampleStore()
@@ -1,39 +1,81 @@
+import asyncio
+import time
 from base64 import b64encode
+from collections import OrderedDict
+from fastapi import HTTPException
 from nacl import encoding, public
-from .github import GitHubClient
+from app.config import settings
+from .github import github_client
+
+# Repo public keys rarely rotate, so cache them (and the SealedBox built from them) per repo.
+# Key: (owner, repo), Value: (expires_at, key_id, SealedBox)
+_public_key_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_MAX_CACHED_KEYS = 1024
 
 class GitHubSecretsService:
     def __init__(self, token: str):
         self.token = token
-        self.client = GitHubClient()
+        self.client = github_client
 
-    def _encrypt(self, public_key: str, secret_value: str) -> str:
-        """Encrypt a Unicode string using the public key."""
-        public_key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
-        sealed_box = public.SealedBox(public_key)
+    def _encrypt(self, sealed_box: public.SealedBox, secret_value: str) -> str:
+        """Encrypt a Unicode string with the repo's sealed box."""
         encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
         return b64encode(encrypted).decode("utf-8")
 
-    def create_repo_secret(self, owner: str, repo: str, secret_name: str, secret_value: str):
+    async def _get_sealed_box(self, owner: str, repo: str, refresh: bool = False):
+        """Returns (key_id, SealedBox) for the repo, from cache unless expired or refresh=True."""
+        cache_key = (owner.lower(), repo.lower())
+        cached = _public_key_cache.get(cache_key)
+        if cached and not refresh and cached[0] > time.monotonic():
+            _public_key_cache.move_to_end(cache_key)
+            return cached[1], cached[2]
+
+        pub_key_response = await self.client.get_repo_public_key(owner, repo, self.token)
+        key_id = pub_key_response["key_id"]
+
+        # Reuse the box if GitHub handed us the same key again
+        if cached and cached[1] == key_id:
+            sealed_box = cached[2]
+        else:
+            public_key = public.PublicKey(pub_key_response["key"].encode("utf-8"), encoding.Base64Encoder())
+            sealed_box = public.SealedBox(public_key)
+
+        _public_key_cache[cache_key] = (time.monotonic() + settings.SECRETS_PUBLIC_KEY_TTL, key_id, sealed_box)
+        _public_key_cache.move_to_end(cache_key)
+        while len(_public_key_cache) > _MAX_CACHED_KEYS:
+            _public_key_cache.popitem(last=False)
+
+        return key_id, sealed_box
+
+    async def create_repo_secrets(self, owner: str, repo: str, secrets: dict) -> dict:
         """
-        Create or update a repository secret.
-        1. Get the repo's public key.
-        2. Encrypt the secret using LibSodium (PyNaCl).
-        3. PUT the secret to GitHub.
+        Create or update several repository secrets.
+        1. Get the repo's public key (cached per repo).
+        2. Encrypt every secret using LibSodium (PyNaCl).
+        3. PUT all the secrets to GitHub concurrently.
+        If GitHub rejects the key (it was rotated), refresh it once and retry.
         """
-        # 1. Get Public Key
-        pub_key_response = self.client.get_repo_public_key(owner, repo, self.token)
-        key_id = pub_key_response["key_id"]
-        key_material = pub_key_response["key"]
+        for refresh in (False, True):
+            key_id, sealed_box = await self._get_sealed_box(owner, repo, refresh=refresh)
+            encrypted = {name: self._encrypt(sealed_box, value) for name, value in secrets.items()}
 
-        # 2. Encrypt
-        encrypted_value = self._encrypt(key_material, secret_value)
+            try:
+                results = await asyncio.gather(*(
+                    self.client.create_secret(owner, repo, name, encrypted_value, key_id, self.token)
+                    for name, encrypted_value in encrypted.items()
+                ))
+                return dict(zip(encrypted.keys(), results))
+            except HTTPException as e:
+                # 422 = encrypted with a key id GitHub no longer accepts
+                if e.status_code != 422 or refresh:
+                    raise
 
-        # 3. Create Secret
-        result = self.client.create_secret(owner, repo, secret_name, encrypted_value, key_id, self.token)
-        return result
+    async def create_repo_secret(self, owner: str, repo: str, secret_name: str, secret_value: str):
+        """Create or update a single repository secret."""
+        results = await self.create_repo_secrets(owner, repo, {secret_name: secret_value})
+        return results[secret_name]
 
-    def setup_deployment_secrets(self, owner: str, repo: str, azure_creds: str, acr_name: str, aks_cluster: str, resource_group: str):
+    async def setup_deployment_secrets(self, owner: str, repo: str, azure_creds: str, acr_name: str, aks_cluster: str, resource_group: str):
         """Helper to set up all AKS related secrets at once."""
         secrets = {
             "AZURE_CREDENTIALS": azure_creds,
@@ -41,9 +83,5 @@ class GitHubSecretsService:
             "AKS_CLUSTER": aks_cluster,
             "RESOURCE_GROUP": resource_group
         }
-        
-        results = {}
-        for name, value in secrets.items():
-            results[name] = self.create_repo_secret(owner, repo, name, value)
-            
-        return results
+
+        return await self.create_repo_secrets(owner, repo, secrets)
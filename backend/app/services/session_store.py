@@ -0,0 +1,141 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
+from app.services.token_hash import hash_token
+
+# Namespaces of per-session state
+SELECTED_REPO = "selected_repo"
+DEPLOYMENT = "deployment"
+BULK_JOB = "bulk_job"  # + ":<job id>", progress of a bulk rollout
+
+
+class SessionStore(abc.ABC):
+    """
+    Per-user session state (selected repo, deployment settings, bulk rollout progress), keyed by a salted hash of the token.
+    Values must be JSON-serializable and must never contain secrets.
+    """
+
+    @abc.abstractmethod
+    def get(self, namespace: str, token: str) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, namespace: str, token: str, value: dict):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, token: str):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local LRU + TTL store. Fine for a single worker."""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (namespace, hash) -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, token: str) -> Optional[dict]:
+        key = (namespace, hash_token(token))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, namespace: str, token: str, value: dict):
+        key = (namespace, hash_token(token))
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, namespace: str, token: str):
+        with self._lock:
+            self._entries.pop((namespace, hash_token(token)), None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Shared store in a SQLite file (WAL mode), so every uvicorn worker on the host sees the same sessions.
+    Needs TOKEN_HASH_SALT so all workers compute the same hashes.
+    """
+
+    # Expired rows are swept every this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, ttl: int):
+        if not settings.TOKEN_HASH_SALT:
+            raise RuntimeError("SESSION_STORE=sqlite requires TOKEN_HASH_SALT to be set")
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads (routes may run in the threadpool)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, token: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT value FROM sessions WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, hash_token(token), time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, token: str, value: dict):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, hash_token(token), json.dumps(value), time.time() + self.ttl)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, namespace: str, token: str):
+        self._conn().execute(
+            "DELETE FROM sessions WHERE namespace = ? AND key = ?", (namespace, hash_token(token))
+        )
+
+
+def create_session_store() -> SessionStore:
+    if settings.SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(settings.SESSION_DB_PATH, settings.SESSION_TTL)
+    if settings.SESSION_STORE == "memory":
+        return MemorySessionStore(settings.SESSION_TTL, settings.SESSION_MAX_ENTRIES)
+    raise RuntimeError(f"Unknown SESSION_STORE: {settings.SESSION_STORE} (expected memory or sqlite)")
+
+
+session_store = create_session_store()
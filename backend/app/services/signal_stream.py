@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.agent_input import agent_input_service
+from app.services.fast_json import finite
+from app.services.health_agent import health_agent
+from app.services.log_store import log_store
+from app.services.normalization import normalization_service
+from app.services.prometheus_ingestion import prometheus_service
+from app.services.target_health import target_health, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# ("url", "http://host:9100/metrics") for scraped targets, ("instance", "node-1:9100") for pushed ones
+Target = Tuple[str, str]
+
+METRICS = "metrics"
+SIGNALS = "signals"
+HEALTH = "health"
+ALERT = "alert"
+ERROR = "error"
+
+# Breaker fields worth streaming (the counters change every round)
+STREAMED_TARGET_FIELDS = ("target", "state", "consecutive_failures", "last_error", "latency_p99_seconds")
+
+
+def target_name(target: Target) -> str:
+    return f"{target[0]}:{target[1]}"
+
+
+class Subscriber:
+    """
+    One SSE/WebSocket client. Updates are coalesced per (target, kind): a slow client that
+    misses a few rounds gets only the newest metrics/signals/health, never a growing backlog.
+    Alerts are transitions, so each is kept, up to STREAM_MAX_PENDING queued messages.
+    """
+
+    def __init__(self):
+        self.targets = set()
+        self._pending: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, key: tuple, message: dict):
+        if key in self._pending:
+            self.coalesced += 1
+            del self._pending[key]
+        self._pending[key] = message
+        while len(self._pending) > settings.STREAM_MAX_PENDING:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> list:
+        """Everything pending, oldest first. Empty list after `timeout` seconds without updates."""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return batch
+
+
+class SignalHub:
+    """
+    Fan-out of agent signals/health per target. The first subscriber of a target starts one
+    polling task (fetch -> parse -> normalize -> signals/health every STREAM_INTERVAL seconds)
+    and every subscriber of that target shares its results; the task stops with the last one.
+    Unchanged results aren't re-sent, and a health change is also published as an alert.
+    """
+
+    def __init__(self):
+        self._targets: Dict[Target, dict] = {}
+        self._seq = itertools.count(1)
+
+    def subscribe(self, subscriber: Subscriber, target: Target):
+        if target in subscriber.targets:
+            return
+        if len(subscriber.targets) >= settings.STREAM_MAX_TARGETS_PER_CLIENT:
+            raise ValueError(f"At most {settings.STREAM_MAX_TARGETS_PER_CLIENT} targets per client")
+        entry = self._targets.get(target)
+        if entry is None:
+            # "trends": this target's previous values, so targets don't mix up each other's trends
+            entry = self._targets[target] = {"subscribers": set(), "last": {}, "trends": {}, "task": None}
+            entry["task"] = asyncio.create_task(self._poll(target, entry))
+        entry["subscribers"].add(subscriber)
+        subscriber.targets.add(target)
+        # New subscribers get the current state right away instead of waiting for the next round
+        for kind, message in entry["last"].items():
+            if kind != ALERT:
+                subscriber.offer((target, kind), message)
+
+    def unsubscribe(self, subscriber: Subscriber, target: Target):
+        subscriber.targets.discard(target)
+        entry = self._targets.get(target)
+        if entry is None:
+            return
+        entry["subscribers"].discard(subscriber)
+        if not entry["subscribers"]:
+            entry["task"].cancel()
+            del self._targets[target]
+
+    def unsubscribe_all(self, subscriber: Subscriber):
+        for target in list(subscriber.targets):
+            self.unsubscribe(subscriber, target)
+
+    def _publish(self, target: Target, entry: dict, kind: str, data) -> bool:
+        previous = entry["last"].get(kind)
+        if kind != ALERT and previous is not None and previous["data"] == data:
+            return False
+        seq = next(self._seq)
+        message = {"type": kind, "target": target_name(target), "seq": seq, "ts": time.time(), "data": data}
+        entry["last"][kind] = message
+        key = (target, kind, seq) if kind == ALERT else (target, kind)
+        for subscriber in entry["subscribers"]:
+            subscriber.offer(key, message)
+        return True
+
+    async def _poll(self, target: Target, entry: dict):
+        while True:
+            try:
+                normalized, signals, health = await run_in_threadpool(self._evaluate, target, entry["trends"])
+                self._publish(target, entry, METRICS, normalized)
+                self._publish(target, entry, SIGNALS, signals)
+                previous = entry["last"].get(HEALTH)
+                self._publish(target, entry, HEALTH, health)
+                if previous is not None and self._status(previous["data"]) != self._status(health):
+                    self._publish(target, entry, ALERT, self._alert(previous["data"], health))
+                entry["last"].pop(ERROR, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stream evaluation of {target_name(target)} failed: {e}")
+                self._publish(target, entry, ERROR, {"detail": str(e)})
+            await asyncio.sleep(settings.STREAM_INTERVAL)
+
+    def _evaluate(self, target: Target, trends: dict):
+        kind, value = target
+        target_state = None
+        if kind == "instance":
+            raw_metrics = prometheus_service.pushed_metrics(value)
+        else:
+            try:
+                raw_metrics = prometheus_service.parse_metrics(prometheus_service.fetch_prometheus_metrics(value))
+            except CircuitOpenError:
+                raw_metrics = []
+            target_state = target_health.snapshot(value)
+        normalized = normalization_service.normalize_metrics(raw_metrics)
+        signals = agent_input_service.build_agent_signals(normalized, target_state, trends)
+        health = health_agent.evaluate_health(normalized, log_store.error_rate(), target_state)
+        # Drop what changes every round (timestamps, counters) so unchanged results aren't re-sent
+        normalized = [{k: v for k, v in m.items() if k != "timestamp"} for m in normalized]
+        if target_state is not None:
+            for payload in (signals, health):
+                payload["target"] = {k: target_state.get(k) for k in STREAMED_TARGET_FIELDS}
+        # NaN/Inf as null: NaN isn't valid JSON for the clients, and NaN != NaN would re-send every round
+        return finite(normalized), finite(signals), finite(health)
+
+    def _status(self, health: dict):
+        return health.get("health"), sorted(health.get("issues", []))
+
+    def _alert(self, before: dict, after: dict) -> dict:
+        old_issues = set(before.get("issues", []))
+        new_issues = set(after.get("issues", []))
+        return {
+            "from": before.get("health"),
+            "to": after.get("health"),
+            "new_issues": sorted(new_issues - old_issues),
+            "resolved_issues": sorted(old_issues - new_issues)
+        }
+
+    def stats(self) -> dict:
+        return {
+            "targets": [
+                {"target": target_name(t), "subscribers": len(e["subscribers"])}
+                for t, e in self._targets.items()
+            ]
+        }
+
+
+signal_hub = SignalHub()
@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, target: str, retry_in: float):
+        super().__init__(f"Target {target} is down (circuit open), next probe in {retry_in:.0f}s")
+        self.target = target
+        self.retry_in = retry_in
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class _Target:
+    __slots__ = ("state", "failures", "opened_at", "cooldown", "probing", "latencies",
+                 "successes_total", "failures_total", "last_error", "last_success")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0          # consecutive
+        self.opened_at = 0.0
+        self.cooldown = settings.SCRAPE_BREAKER_COOLDOWN
+        self.probing = False
+        self.latencies = deque(maxlen=settings.SCRAPE_LATENCY_WINDOW)
+        self.successes_total = 0
+        self.failures_total = 0
+        self.last_error = None
+        self.last_success = None
+
+
+class TargetHealthTracker:
+    """
+    Per scrape target: a circuit breaker plus a window of recent scrape latencies.
+    - SCRAPE_BREAKER_FAILURES consecutive failures open the circuit: calls fail fast for the
+      cooldown, then one probe is let through (half open). A failed probe doubles the cooldown
+      (up to SCRAPE_BREAKER_MAX_COOLDOWN), a successful one closes the circuit.
+    - Timeouts follow the target's observed p99 (times SCRAPE_TIMEOUT_MULTIPLIER, clamped),
+      so a hanging target costs about what that target normally takes, not a flat 10s.
+    - Hedging: the SCRAPE_HEDGE_QUANTILE latency is how long to wait before sending a second
+      request to a slow but alive target (p90: at most ~10% extra requests).
+    """
+
+    def __init__(self):
+        self._targets: Dict[str, _Target] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, target: str) -> _Target:
+        state = self._targets.get(target)
+        if state is None:
+            # Targets come from request params: forget the oldest rather than grow forever
+            if len(self._targets) >= settings.SCRAPE_MAX_TARGETS:
+                del self._targets[next(iter(self._targets))]
+            state = self._targets[target] = _Target()
+        return state
+
+    def before_request(self, target: str):
+        """Raises CircuitOpenError while the target is known to be down."""
+        with self._lock:
+            state = self._get(target)
+            if state.state == CLOSED:
+                return
+            retry_in = state.opened_at + state.cooldown - time.monotonic()
+            if state.state == OPEN and retry_in <= 0:
+                state.state = HALF_OPEN
+            if state.state == HALF_OPEN and not state.probing:
+                state.probing = True
+                return
+            raise CircuitOpenError(target, max(retry_in, 0))
+
+    def record_success(self, target: str, latency: float):
+        with self._lock:
+            state = self._get(target)
+            state.latencies.append(latency)
+            state.successes_total += 1
+            state.last_success = time.time()
+            state.failures = 0
+            state.probing = False
+            state.state = CLOSED
+            state.cooldown = settings.SCRAPE_BREAKER_COOLDOWN
+
+    def record_failure(self, target: str, error: str):
+        with self._lock:
+            state = self._get(target)
+            state.failures += 1
+            state.failures_total += 1
+            state.last_error = error
+            if state.state == HALF_OPEN:
+                state.cooldown = min(state.cooldown * 2, settings.SCRAPE_BREAKER_MAX_COOLDOWN)
+            if state.state == HALF_OPEN or state.failures >= settings.SCRAPE_BREAKER_FAILURES:
+                state.state = OPEN
+                state.opened_at = time.monotonic()
+            state.probing = False
+
+    def timeout_for(self, target: str) -> float:
+        with self._lock:
+            state = self._targets.get(target)
+            if state is None or len(state.latencies) < settings.SCRAPE_MIN_LATENCY_SAMPLES:
+                return settings.SCRAPE_TIMEOUT
+            adaptive = _percentile(state.latencies, 0.99) * settings.SCRAPE_TIMEOUT_MULTIPLIER
+        return min(settings.SCRAPE_TIMEOUT, max(settings.SCRAPE_TIMEOUT_MIN, adaptive))
+
+    def hedge_delay(self, target: str) -> Optional[float]:
+        """When to send the hedged request, None if we don't know the target well enough to hedge."""
+        with self._lock:
+            state = self._targets.get(target)
+            if state is None or state.state != CLOSED or len(state.latencies) < settings.SCRAPE_MIN_LATENCY_SAMPLES:
+                return None
+            return max(settings.SCRAPE_HEDGE_MIN_DELAY, _percentile(state.latencies, settings.SCRAPE_HEDGE_QUANTILE))
+
+    def snapshot(self, target: str) -> dict:
+        with self._lock:
+            state = self._targets.get(target)
+            if state is None:
+                return {"target": target, "state": CLOSED, "observed": False}
+            latencies = list(state.latencies)
+            retry_in = state.opened_at + state.cooldown - time.monotonic() if state.state == OPEN else 0
+            return {
+                "target": target,
+                "state": state.state,
+                "observed": True,
+                "consecutive_failures": state.failures,
+                "successes_total": state.successes_total,
+                "failures_total": state.failures_total,
+                "last_error": state.last_error,
+                "last_success": state.last_success,
+                "retry_in_seconds": round(max(retry_in, 0), 1),
+                "latency_p50_seconds": round(_percentile(latencies, 0.5), 4) if latencies else None,
+                "latency_p99_seconds": round(_percentile(latencies, 0.99), 4) if latencies else None
+            }
+
+    def all(self) -> list:
+        with self._lock:
+            targets = sorted(self._targets)
+        return [self.snapshot(t) for t in targets]
+
+
+target_health = TargetHealthTracker()
@@ -0,0 +1,14 @@
+import hashlib
+import hmac
+import secrets
+
+from app.config import settings
+
+# Salt for token hashes. Set TOKEN_HASH_SALT when running several workers so they agree on the hashes;
+# otherwise every process picks its own random salt.
+_salt = settings.TOKEN_HASH_SALT.encode("utf-8") or secrets.token_bytes(32)
+
+
+def hash_token(token: str) -> str:
+    """Salted hash used wherever we need to key state by token. The raw token is never stored."""
+    return hmac.new(_salt, (token or "").encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1 @@
+# Benchmarks for the backend hot paths. Run from backend/: python -m benchmarks.<name>
@@ -0,0 +1,93 @@
+"""
+Requests/sec of the async pipeline routes against a local mock GitHub server.
+
+    python -m benchmarks.bench_async_github --latency-ms 50 --concurrency 200 --requests 2000 --output e2e.json
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.mock_github import MockGitHubServer
+from benchmarks.results import emit, environment
+
+# name -> (path, method, body)
+ROUTES = {
+    "suggest": ("/pipeline/suggest", "GET", None),
+    "generate_and_commit": ("/pipeline/generate-and-commit", "POST", {"steps": ["checkout", "install_deps", "run_tests"]}),
+    "ci_preview": ("/pipeline/ci/preview", "POST", {"steps": ["checkout", "install_deps", "run_tests"]}),
+}
+
+
+async def _drive(app, path: str, method: str, body, tokens, total: int, concurrency: int):
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+        async def one(i: int):
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        # Select a repo for every benchmark user first
+        for token in tokens:
+            await client.post("/repos/select", json={"owner": "bench-org", "repo": "service-1"},
+                              headers={"Authorization": f"Bearer {token}"})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "route": f"{method} {path}",
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50, help="distinct tokens (the scheduler paces per token)")
+    parser.add_argument("--routes", default="generate_and_commit,ci_preview", help=f"comma separated, from {', '.join(ROUTES)}")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    with MockGitHubServer(latency=args.latency_ms / 1000) as mock:
+        # Settings are read at import time, so point the app at the mock first
+        os.environ["GITHUB_API_URL"] = mock.url
+        os.environ.setdefault("GITHUB_RATE_PER_SECOND", "100000")
+        os.environ.setdefault("GITHUB_BURST", "100000")
+        from app.main import app
+
+        tokens = [f"bench-token-{i}" for i in range(args.users)]
+        results = []
+        for name in args.routes.split(","):
+            path, method, body = ROUTES[name.strip()]
+            results.append(asyncio.run(_drive(app, path, method, body, tokens, args.requests, args.concurrency)))
+
+        emit({
+            "benchmark": "pipeline_e2e",
+            "environment": environment(),
+            "mock_latency_ms": args.latency_ms,
+            "users": args.users,
+            "github_calls": mock.calls,
+            "results": results,
+        }, args.output)
+
+
+if __name__ == "__main__":
+    main()
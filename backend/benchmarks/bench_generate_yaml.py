@@ -0,0 +1,107 @@
+"""
+Micro-benchmark for WorkflowGenerator.generate_yaml: the original build + pure-Python yaml.dump,
+a cache miss (LibYAML emitter when available) and a cache hit. Also checks that every
+steps/stack combination renders byte-identical to the original.
+
+    python -m benchmarks.bench_generate_yaml --iterations 2000
+"""
+import argparse
+import itertools
+import json
+import time
+
+import yaml
+
+from app.services.generator import WorkflowGenerator, STEP_ORDER, _FastDumper, _PyDumper
+
+STACKS = [
+    {"language": language, "has_test_script": has_test, "has_dockerfile": True,
+     "package_manager": manager, "lockfile": lockfile}
+    for language, manager, lockfile in (
+        ("python", "pip", "requirements.txt"),
+        ("javascript", "npm", None),
+        ("javascript", "npm", "package-lock.json"),
+        ("javascript", "yarn", "yarn.lock"),
+        ("javascript", "pnpm", "pnpm-lock.yaml"),
+        ("unknown", None, None),
+    )
+    for has_test in (True, False)
+]
+# A monorepo: one job per service
+STACKS.append({
+    "language": "unknown", "has_test_script": False, "has_dockerfile": False, "package_manager": None, "lockfile": None,
+    "services": [
+        {"path": "services/api", "language": "python", "has_test_script": False, "has_lint_script": False,
+         "has_dockerfile": True, "package_manager": "pip", "lockfile": "services/api/requirements.txt"},
+        {"path": "web", "language": "javascript", "has_test_script": True, "has_lint_script": True,
+         "has_dockerfile": False, "package_manager": "npm", "lockfile": "web/package-lock.json"},
+    ],
+})
+
+
+# (parallel_jobs, test_shards)
+LAYOUTS = [(False, 1), (True, 1), (True, 4)]
+
+
+def _reference(generator: WorkflowGenerator, steps, stack: dict, parallel_jobs=False, test_shards=1) -> str:
+    # What generate_yaml did before it was memoized
+    workflow = generator._build_workflow(steps, stack, parallel_jobs, test_shards)
+    return yaml.dump(workflow, Dumper=_PyDumper, sort_keys=False, default_flow_style=False)
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    generator = WorkflowGenerator()
+
+    combos = [
+        (list(steps), stack, layout)
+        for r in range(len(STEP_ORDER) + 1)
+        for steps in itertools.combinations(STEP_ORDER, r)
+        for stack in STACKS
+        for layout in LAYOUTS
+    ]
+    mismatches = [
+        {"steps": steps, "language": stack["language"], "lockfile": stack["lockfile"], "layout": layout}
+        for steps, stack, layout in combos
+        if generator.generate_yaml(steps, stack, *layout) != _reference(generator, steps, stack, *layout)
+    ]
+
+    def miss(steps, stack):
+        generator._render.cache_clear()
+        generator.generate_yaml(steps, stack)
+
+    # Full pipeline for a Python stack (LibYAML emitter) and for a JS stack without a test
+    # script (multi-line fallback script, pure-Python emitter)
+    cases = {"python": STACKS[0], "javascript_no_test_script": STACKS[5]}
+    steps = list(STEP_ORDER)
+
+    result = {
+        "dumper": _FastDumper.__mro__[1].__name__,
+        "combinations_checked": len(combos),
+        "mismatches": mismatches,
+        "cases": {
+            name: {
+                "reference_us": round(_per_call_us(lambda: _reference(generator, steps, stack), args.iterations), 2),
+                "cache_miss_us": round(_per_call_us(lambda: miss(steps, stack), args.iterations), 2),
+                "cache_hit_us": round(_per_call_us(lambda: generator.generate_yaml(steps, stack), args.iterations * 50), 3),
+            }
+            for name, stack in cases.items()
+        },
+    }
+    print(json.dumps(result, indent=2))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Speed and peak memory of the metrics pipeline stages on synthetic node_exporter payloads:
+parse_metrics -> normalize_metrics -> build_agent_signals -> evaluate_health.
+
+    python -m benchmarks.bench_hot_paths --sizes 1000,10000,100000,1000000 --output hot_paths.json
+
+Times are the best and median of --repeat runs. Peak memory is measured in a separate run under
+tracemalloc (which slows Python down, so it doesn't skew the times). Payloads of at least
+PARSE_POOL_THRESHOLD_BYTES are parsed in the process pool, like in the app: their parse memory
+is mostly in the pool processes, which tracemalloc doesn't see. --parse-pool off parses inline.
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+from app.config import settings
+from app.services.agent_input import agent_input_service
+from app.services.health_agent import health_agent
+from app.services.metrics_parsing import parse_pool
+from app.services.normalization import normalization_service
+from app.services.prometheus_ingestion import prometheus_service
+from benchmarks.results import emit, environment
+from benchmarks.synthetic_exporter import node_exporter_payload
+
+STAGES = ("parse_metrics", "normalize_metrics", "build_agent_signals", "evaluate_health")
+# Stages whose cost grows with the number of series (the others only see the few normalized metrics)
+PER_SERIES_STAGES = ("parse_metrics", "normalize_metrics")
+
+
+def _stage_calls(payload: str) -> dict:
+    """stage -> zero-argument call, each fed the previous stage's output (computed once here)."""
+    raw = prometheus_service.parse_metrics(payload)
+    normalized = normalization_service.normalize_metrics(raw)
+    return {
+        "parse_metrics": lambda: prometheus_service.parse_metrics(payload),
+        "normalize_metrics": lambda: normalization_service.normalize_metrics(raw),
+        "build_agent_signals": lambda: agent_input_service.build_agent_signals(normalized),
+        "evaluate_health": lambda: health_agent.evaluate_health(normalized),
+    }, len(raw)
+
+
+def _time(call, repeat: int, collect: bool) -> list:
+    times = []
+    for _ in range(repeat):
+        if collect:
+            gc.collect()
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _peak_bytes(call) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - baseline
+
+
+def bench_size(series: int, repeat: int) -> dict:
+    payload = node_exporter_payload(series)
+    calls, parsed = _stage_calls(payload)
+    stages = {}
+    for stage in STAGES:
+        # Sub-millisecond stages get more runs, or the numbers are just timer noise
+        per_series = stage in PER_SERIES_STAGES
+        runs = repeat if per_series else repeat * 100
+        times = _time(calls[stage], runs, collect=per_series)
+        stages[stage] = {
+            "runs": runs,
+            "best_seconds": round(min(times), 6),
+            "median_seconds": round(statistics.median(times), 6),
+            "peak_bytes": _peak_bytes(calls[stage]),
+        }
+        if per_series:
+            stages[stage]["series_per_sec"] = round(series / min(times))
+    return {
+        "series": series,
+        "payload_bytes": len(payload),
+        "parsed_samples": parsed,
+        "parse_mode": "pool" if parse_pool.should_use(payload) else "inline",
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="comma separated series counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--parse-pool", choices=("auto", "off"), default="auto")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    if args.parse_pool == "off":
+        settings.PARSE_POOL_ENABLED = False
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    try:
+        results = [bench_size(size, args.repeat) for size in sizes]
+    finally:
+        parse_pool.shutdown()
+
+    emit({
+        "benchmark": "hot_paths",
+        "environment": environment(),
+        "repeat": args.repeat,
+        "parse_pool": args.parse_pool,
+        "parse_pool_threshold_bytes": settings.PARSE_POOL_THRESHOLD_BYTES,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares two benchmark result files (from --output) metric by metric.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Times, latencies and memory are better lower, */sec numbers better higher. A change worse than
+--threshold percent is a regression; with --fail the exit status is 1 when there is one.
+"""
+import argparse
+import json
+
+# Numbers that describe the run rather than measure it
+SKIP_KEYS = {"environment", "runs", "repeat", "requests", "concurrency", "series", "users", "payload_bytes",
+             "parsed_samples", "mock_latency_ms", "parse_pool_threshold_bytes", "batches", "samples"}
+MEASURE_SUFFIXES = ("_seconds", "_ms", "_us", "_bytes", "_per_sec", "seconds")
+
+
+def _item_key(item: dict, index: int) -> str:
+    for key in ("route", "series", "name"):
+        if key in item:
+            return f"{key}={item[key]}"
+    return str(index)
+
+
+def flatten(data, prefix: str = "") -> dict:
+    """{"results[series=1000].stages.parse_metrics.best_seconds": 0.02, ...} for every measured number."""
+    values = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in SKIP_KEYS:
+                continue
+            path = f"{prefix}.{key}" if prefix else key
+            if isinstance(value, (dict, list)):
+                values.update(flatten(value, path))
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) and key.endswith(MEASURE_SUFFIXES):
+                values[path] = value
+    elif isinstance(data, list):
+        for index, item in enumerate(data):
+            key = _item_key(item, index) if isinstance(item, dict) else str(index)
+            values.update(flatten(item, f"{prefix}[{key}]"))
+    return values
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    old, new = flatten(baseline), flatten(candidate)
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        before, after = old[path], new[path]
+        if not before:
+            continue
+        change = (after - before) / before * 100
+        higher_is_better = path.endswith("_per_sec")
+        worse = -change if higher_is_better else change
+        rows.append({
+            "metric": path,
+            "baseline": before,
+            "candidate": after,
+            "change_percent": round(change, 1),
+            "regression": worse > threshold,
+            "improvement": worse < -threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change that counts")
+    parser.add_argument("--fail", action="store_true", help="exit 1 on any regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(json.dumps({
+        "baseline": baseline.get("environment", {}).get("commit"),
+        "candidate": candidate.get("environment", {}).get("commit"),
+        "threshold_percent": args.threshold,
+        "regressions": [r for r in rows if r["regression"]],
+        "improvements": [r for r in rows if r["improvement"]],
+        "unchanged": sum(1 for r in rows if not r["regression"] and not r["improvement"]),
+    }, indent=2))
+    if args.fail and any(r["regression"] for r in rows):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Load generator for the push ingestion endpoints (/ingest/remote-write, /ingest/otlp/v1/metrics).
+
+In-process (one app instance = one worker), reports pushed and ingested samples/sec:
+    python -m benchmarks.load_push_ingest --batches 200 --series 1000 --samples 10
+
+Against a running backend:
+    python -m benchmarks.load_push_ingest --url http://localhost:8000 --token $INGEST_TOKEN
+
+Batches are built once up front so the generator itself isn't what's measured.
+429 responses are retried after their Retry-After, like a remote-write client would.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import time
+
+NODE_METRICS = (
+    "node_load1", "node_memory_MemTotal_bytes", "node_memory_MemAvailable_bytes",
+    "node_filesystem_size_bytes", "node_filesystem_avail_bytes", "node_cpu_seconds_total",
+)
+
+
+def remote_write_batch(batch: int, series: int, samples: int, instances: int) -> dict:
+    base = 1_700_000_000_000 + batch * samples * 15_000
+    timeseries = []
+    for i in range(series):
+        labels = [
+            {"name": "__name__", "value": NODE_METRICS[i % len(NODE_METRICS)]},
+            {"name": "instance", "value": f"node-{i % instances}:9100"},
+            {"name": "job", "value": "node"},
+            {"name": "series", "value": str(i)},
+        ]
+        if NODE_METRICS[i % len(NODE_METRICS)].startswith("node_filesystem"):
+            labels.append({"name": "mountpoint", "value": "/"})
+        timeseries.append({
+            "labels": labels,
+            "samples": [{"value": random.random() * 100, "timestamp": base + s * 15_000} for s in range(samples)],
+        })
+    return {"timeseries": timeseries}
+
+
+def otlp_batch(batch: int, series: int, instances: int) -> dict:
+    now = (1_700_000_000 + batch * 15) * 1_000_000_000
+    resources = []
+    for instance in range(instances):
+        points = [
+            {
+                "attributes": [{"key": "series", "value": {"stringValue": str(i)}}],
+                "timeUnixNano": str(now),
+                "asDouble": random.random() * 100,
+            }
+            for i in range(instance, series, instances)
+        ]
+        resources.append({
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "load"}},
+                {"key": "service.instance.id", "value": {"stringValue": f"otel-{instance}"}},
+            ]},
+            "scopeMetrics": [{"metrics": [{"name": "system.cpu.utilization", "gauge": {"dataPoints": points}}]}],
+        })
+    return {"resourceMetrics": resources}
+
+
+async def _push(client, path: str, bodies, headers: dict, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    throttled = 0
+
+    async def one(body: bytes):
+        nonlocal throttled
+        async with semaphore:
+            while True:
+                start = time.perf_counter()
+                response = await client.post(path, content=body, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 429:
+                    response.raise_for_status()
+                    return
+                throttled += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(body) for body in bodies))
+    pushed = time.perf_counter() - start
+
+    # Acks are async: wait until everything queued has been decoded
+    while True:
+        stats = (await client.get("/ingest/stats")).json()
+        if not stats["pending_batches"]:
+            break
+        await asyncio.sleep(0.01)
+    drained = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "push_seconds": round(pushed, 3),
+        "drain_seconds": round(drained, 3),
+        "throttled": throttled,
+        "ack_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "ack_p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 2),
+        "stats": stats,
+    }
+
+
+async def _run(args, bodies, headers: dict) -> dict:
+    import httpx
+
+    path = "/ingest/otlp/v1/metrics" if args.format == "otlp" else "/ingest/remote-write"
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await _push(client, path, bodies, headers, args.concurrency)
+
+    from app.config import settings
+    from app.main import app
+
+    settings.INGEST_TOKEN = args.token
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=60) as client:
+        return await _push(client, path, bodies, headers, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="running backend; in-process when omitted")
+    parser.add_argument("--token", default="", help="INGEST_TOKEN of the backend, if set")
+    parser.add_argument("--format", choices=("remote-write", "otlp"), default="remote-write")
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--series", type=int, default=1000, help="series per batch")
+    parser.add_argument("--samples", type=int, default=10, help="samples per series (remote-write)")
+    parser.add_argument("--instances", type=int, default=20, help="distinct instance labels")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--gzip", action="store_true", help="send Content-Encoding: gzip")
+    args = parser.parse_args()
+
+    headers = {"Content-Type": "application/json"}
+    if args.token:
+        headers["Authorization"] = f"Bearer {args.token}"
+    if args.gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    bodies = []
+    for b in range(args.batches):
+        payload = otlp_batch(b, args.series, args.instances) if args.format == "otlp" else \
+            remote_write_batch(b, args.series, args.samples, args.instances)
+        body = json.dumps(payload).encode()
+        bodies.append(gzip.compress(body, 1) if args.gzip else body)
+
+    per_batch = args.series if args.format == "otlp" else args.series * args.samples
+    total = per_batch * args.batches
+    result = asyncio.run(_run(args, bodies, headers))
+    result.update({
+        "format": args.format,
+        "batches": args.batches,
+        "samples": total,
+        "mb_sent": round(sum(len(b) for b in bodies) / 1e6, 1),
+        "pushed_samples_per_sec": round(total / result["push_seconds"]),
+        "ingested_samples_per_sec": round(total / result["drain_seconds"]),
+    })
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+A tiny local stand-in for the GitHub REST API, used by the benchmarks.
+Every response is delayed by `latency` seconds to mimic a real round trip.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import socket
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from nacl import encoding, public
+
+
+class _Latency:
+    """Plain ASGI wrapper (cheaper than @app.middleware) that delays and counts every request."""
+
+    def __init__(self, app, latency: float, calls=None):
+        self.app = app
+        self.latency = latency
+        self.calls = calls if calls is not None else multiprocessing.Value("i", 0, lock=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.calls.value += 1
+            await asyncio.sleep(self.latency)
+        await self.app(scope, receive, send)
+
+
+def _blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _default_files(repo: str) -> dict:
+    if repo.startswith("mono-"):
+        # Repos named mono-* are monorepos with a Python API and a Node web app
+        return {
+            "README.md": b"# monorepo\n",
+            "services/api/requirements.txt": b"fastapi\n",
+            "services/api/Dockerfile": b"FROM python:3.11-slim\n",
+            "services/web/package.json": json.dumps({"name": "web", "scripts": {"test": "jest"}}).encode(),
+            "services/web/package-lock.json": b"{}",
+        }
+    return {
+        "package.json": json.dumps({"name": repo, "scripts": {"test": "jest"}}).encode(),
+        "Dockerfile": b"FROM node:18-alpine\n",
+    }
+
+
+def create_mock_github(latency: float = 0.05, repo_count: int = 250, calls=None) -> _Latency:
+    app = FastAPI()
+    # Just enough git state for commits to be visible to later reads:
+    # "owner/repo" -> {"head": sha, "files": {path: bytes}}, plus trees/commits by sha
+    repos_state = {}
+    objects = {}
+
+    def state(owner: str, repo: str) -> dict:
+        key = f"{owner}/{repo}"
+        if key not in repos_state:
+            repos_state[key] = {"head": hashlib.sha1(key.encode()).hexdigest(), "files": _default_files(repo)}
+        return repos_state[key]
+    private_key = public.PrivateKey.generate()
+    public_key = private_key.public_key.encode(encoding.Base64Encoder()).decode()
+
+    @app.get("/user")
+    async def user():
+        return {"login": "bench-user", "id": 1, "avatar_url": "https://example.invalid/a.png", "name": "Bench"}
+
+    @app.get("/user/repos")
+    async def repos(request: Request, response: Response, page: int = 1, per_page: int = 100):
+        last = max((repo_count + per_page - 1) // per_page, 1)
+        if last > 1:
+            base = str(request.url).split("?")[0]
+            response.headers["Link"] = f'<{base}?per_page={per_page}&page={last}>; rel="last"'
+        start = (page - 1) * per_page
+        return [
+            {
+                "id": i, "name": f"service-{i}", "full_name": f"bench-org/service-{i}",
+                "owner": {"login": "bench-org"}, "html_url": f"https://example.invalid/service-{i}",
+                "description": None, "private": False,
+                "pushed_at": repos_state.get(f"bench-org/service-{i}", {}).get("pushed_at", "2024-01-01T00:00:00Z"),
+            }
+            for i in range(start, min(start + per_page, repo_count))
+        ]
+
+    @app.get("/repos/{owner}/{repo}/actions/secrets/public-key")
+    async def secrets_key(owner: str, repo: str):
+        return {"key_id": "bench-key", "key": public_key}
+
+    @app.put("/repos/{owner}/{repo}/actions/secrets/{name}", status_code=201)
+    async def put_secret(owner: str, repo: str, name: str):
+        return {}
+
+    @app.get("/repos/{owner}/{repo}")
+    async def repo_info(owner: str, repo: str):
+        return {"full_name": f"{owner}/{repo}", "default_branch": "main"}
+
+    @app.get("/repos/{owner}/{repo}/branches/{branch}")
+    async def branch_info(owner: str, repo: str, branch: str):
+        head = state(owner, repo)["head"]
+        return {"name": branch, "commit": {"sha": head, "commit": {"tree": {"sha": f"tree-of-{head}"}}}}
+
+    @app.get("/repos/{owner}/{repo}/commits/{ref}")
+    async def commit_sha(owner: str, repo: str, ref: str, request: Request):
+        # Only the sha media type (what get_head_sha asks for), with an ETag for conditional requests
+        head = state(owner, repo)["head"]
+        etag = f'"{head}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(head, media_type="application/vnd.github.sha", headers={"ETag": etag})
+
+    @app.get("/repos/{owner}/{repo}/git/trees/{ref}")
+    async def get_tree(owner: str, repo: str, ref: str):
+        files = state(owner, repo)["files"]
+        dirs = {path.rsplit("/", 1)[0] for path in files if "/" in path}
+        tree = [{"path": path, "type": "blob", "sha": _blob_sha(data)} for path, data in files.items()]
+        tree += [{"path": path, "type": "tree"} for path in sorted(dirs)]
+        return {"sha": state(owner, repo)["head"], "tree": tree, "truncated": False}
+
+    @app.post("/repos/{owner}/{repo}/git/trees", status_code=201)
+    async def create_tree(owner: str, repo: str, request: Request):
+        body = await request.json()
+        files = dict(state(owner, repo)["files"])
+        files.update({entry["path"]: entry["content"].encode() for entry in body["tree"]})
+        sha = hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()
+        objects[sha] = files
+        return {"sha": sha}
+
+    @app.post("/repos/{owner}/{repo}/git/commits", status_code=201)
+    async def create_commit(owner: str, repo: str, request: Request):
+        body = await request.json()
+        sha = hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()
+        objects[sha] = {"parent": body["parents"][0], "files": objects[body["tree"]]}
+        return {"sha": sha}
+
+    @app.patch("/repos/{owner}/{repo}/git/refs/heads/{branch}")
+    async def update_ref(owner: str, repo: str, branch: str, request: Request):
+        body = await request.json()
+        repo_state = state(owner, repo)
+        commit = objects[body["sha"]]
+        if commit["parent"] != repo_state["head"]:
+            return Response(status_code=422)
+        repo_state["head"], repo_state["files"] = body["sha"], commit["files"]
+        repo_state["pushed_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        return {"ref": f"refs/heads/{branch}", "object": {"sha": body["sha"]}}
+
+    @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+    async def contents(owner: str, repo: str, path: str):
+        files = state(owner, repo)["files"]
+        if path in files:
+            return {"name": path.rsplit("/", 1)[-1], "path": path, "type": "file",
+                    "sha": _blob_sha(files[path]), "content": base64.b64encode(files[path]).decode()}
+
+        prefix = f"{path}/" if path else ""
+        listing = {}
+        for file_path, data in files.items():
+            if not file_path.startswith(prefix):
+                continue
+            name, _, rest = file_path[len(prefix):].partition("/")
+            listing[name] = {"name": name, "path": prefix + name, "type": "dir" if rest else "file",
+                             "sha": _blob_sha(data)}
+        return list(listing.values()) if listing else Response(status_code=404)
+
+    @app.put("/repos/{owner}/{repo}/contents/{path:path}", status_code=201)
+    async def put_contents(owner: str, repo: str, path: str, request: Request):
+        body = await request.json()
+        sha = hashlib.sha1(body["content"].encode()).hexdigest()
+        return {"content": {"path": path, "sha": sha}, "commit": {"sha": hashlib.sha1(sha.encode()).hexdigest()}}
+
+    return _Latency(app, latency, calls)
+
+
+def _serve(port: int, latency: float, repo_count: int, calls):
+    app = create_mock_github(latency, repo_count, calls)
+    uvicorn.run(app, port=port, log_level="warning", access_log=False)
+
+
+class MockGitHubServer:
+    """
+    Runs the mock API with uvicorn in a child process, so it doesn't fight
+    the code under test for the GIL.
+    """
+
+    def __init__(self, latency: float = 0.05, repo_count: int = 250):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._calls = multiprocessing.Value("i", 0)
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.port, latency, repo_count, self._calls), daemon=True
+        )
+
+    @property
+    def calls(self) -> int:
+        return self._calls.value
+
+    def __enter__(self):
+        self._process.start()
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("mock GitHub server did not start")
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join(timeout=5)
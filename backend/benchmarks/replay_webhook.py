@@ -0,0 +1,84 @@
+"""
+Replays recorded GitHub webhook payloads (benchmarks/webhooks/<event>.<name>.json) with a valid signature.
+
+Against a running backend (uses its GITHUB_WEBHOOK_SECRET):
+    python -m benchmarks.replay_webhook --url http://localhost:8000 --secret mysecret
+
+Without --url the app runs in-process against the mock GitHub server: it warms the repo cache
+by analyzing bench-org/service-1, replays every payload, and shows what each one invalidated.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import pathlib
+
+PAYLOADS = pathlib.Path(__file__).parent / "webhooks"
+
+
+def _signed(path: pathlib.Path, secret: str):
+    body = path.read_bytes()
+    event = path.name.split(".", 1)[0]
+    headers = {
+        "Content-Type": "application/json",
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": path.stem,
+        "X-Hub-Signature-256": "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest(),
+    }
+    return body, headers
+
+
+async def _replay(client, secret: str, warm=None):
+    results = []
+    for path in sorted(PAYLOADS.glob("*.json")):
+        if warm:
+            await warm()
+        body, headers = _signed(path, secret)
+        response = await client.post("/webhooks/github", content=body, headers=headers)
+        results.append({"payload": path.name, "status": response.status_code, "response": response.json()})
+    return results
+
+
+async def _run_remote(url: str, secret: str):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url) as client:
+        return await _replay(client, secret)
+
+
+async def _run_local(secret: str):
+    import httpx
+    from benchmarks.mock_github import MockGitHubServer
+
+    with MockGitHubServer(latency=0) as server:
+        os.environ["GITHUB_API_URL"] = server.url
+        os.environ["GITHUB_WEBHOOK_SECRET"] = secret
+        from app.main import app
+        from app.services.analyzer import repo_analyzer
+
+        async def warm():
+            for repo in ("service-1", "billing-service"):
+                await repo_analyzer.analyze("bench-token", "bench-org", repo)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            return await _replay(client, secret, warm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Backend to post to; runs in-process against the mock GitHub if omitted")
+    parser.add_argument("--secret", default="replay-secret", help="Webhook secret to sign with")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(_run_remote(args.url, args.secret))
+    else:
+        results = asyncio.run(_run_local(args.secret))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
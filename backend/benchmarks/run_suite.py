@@ -0,0 +1,56 @@
+"""
+Runs the hot path and end-to-end benchmarks and writes one combined JSON file.
+
+    python -m benchmarks.run_suite --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare bench-old.json bench-new.json
+
+Each benchmark runs in its own process: the app reads its settings at import time (the
+end-to-end run points GITHUB_API_URL at the mock), and a 1M series run shouldn't leave its
+heap behind for the next one.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.results import emit, environment
+
+
+def _run(module: str, args: list) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "result.json")
+        subprocess.run([sys.executable, "-m", module, *args, "--output", output],
+                       check=True, stdout=subprocess.DEVNULL)
+        with open(output) as f:
+            result = json.load(f)
+    result.pop("environment", None)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="series counts for the hot paths")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50, help="mock GitHub latency")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--routes", default="suggest,generate_and_commit,ci_preview")
+    parser.add_argument("--skip", choices=("hot_paths", "e2e"), action="append", default=[])
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = {"benchmark": "suite", "environment": environment()}
+    if "hot_paths" not in args.skip:
+        result["hot_paths"] = _run("benchmarks.bench_hot_paths", ["--sizes", args.sizes, "--repeat", str(args.repeat)])
+    if "e2e" not in args.skip:
+        result["pipeline_e2e"] = _run("benchmarks.bench_async_github", [
+            "--latency-ms", str(args.latency_ms), "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency), "--routes", args.routes,
+        ])
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Deterministic node_exporter-like expositions of any size, for benchmarking the metrics pipeline.
+
+    python -m benchmarks.synthetic_exporter --series 10000 > /tmp/node.prom
+"""
+import argparse
+import random
+import sys
+
+CPU_MODES = ("idle", "iowait", "irq", "nice", "softirq", "steal", "system", "user")
+MEMORY_FIELDS = (
+    "MemTotal", "MemFree", "MemAvailable", "Buffers", "Cached", "SwapCached", "Active", "Inactive",
+    "Active_anon", "Inactive_anon", "Active_file", "Inactive_file", "Unevictable", "Mlocked", "SwapTotal",
+    "SwapFree", "Dirty", "Writeback", "AnonPages", "Mapped", "Shmem", "KReclaimable", "Slab", "SReclaimable",
+    "SUnreclaim", "KernelStack", "PageTables", "CommitLimit", "Committed_AS", "VmallocTotal", "VmallocUsed",
+    "HugePages_Total", "HugePages_Free", "Hugepagesize",
+)
+MOUNTS = ("/", "/boot", "/var", "/home", "/tmp")
+# Per-device families; CPUs / network interfaces / disks are added until the requested size is reached
+NETWORK_FAMILIES = ("receive_bytes", "transmit_bytes", "receive_packets", "transmit_packets", "receive_errs", "transmit_errs")
+DISK_FAMILIES = ("reads_completed", "writes_completed", "read_bytes", "written_bytes", "io_time_seconds")
+
+
+def _family(name: str, kind: str, help_text: str, samples) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+
+def node_exporter_payload(series: int, seed: int = 0, memory_used: float = 0.5, disk_free: float = 0.5,
+                          load1: float = 0.3) -> str:
+    """
+    About `series` samples (exactly, unless that's smaller than the fixed families) shaped like
+    node_exporter's: load, meminfo and filesystem gauges first (what normalize_metrics reads),
+    then CPU seconds, network and disk counters for as many CPUs/devices as it takes.
+    """
+    rng = random.Random(seed)
+    total_memory = 64 * 2 ** 30
+    disk_size = 512 * 2 ** 30
+
+    families = [
+        _family("node_load1", "gauge", "1m load average.", [((), load1)]),
+        _family("node_load5", "gauge", "5m load average.", [((), round(load1 * 0.9, 2))]),
+        _family("node_load15", "gauge", "15m load average.", [((), round(load1 * 0.8, 2))]),
+    ]
+    for field in MEMORY_FIELDS:
+        if field == "MemTotal":
+            value = total_memory
+        elif field == "MemAvailable":
+            value = int(total_memory * (1 - memory_used))
+        else:
+            value = rng.randrange(total_memory)
+        families.append(_family(f"node_memory_{field}_bytes", "gauge", f"Memory information field {field}_bytes.", [((), value)]))
+    for field, fraction in (("size", 1.0), ("avail", disk_free), ("free", disk_free + 0.01)):
+        families.append(_family(
+            f"node_filesystem_{field}_bytes", "gauge", f"Filesystem {field} in bytes.",
+            [((("device", f"/dev/sda{i + 1}"), ("fstype", "ext4"), ("mountpoint", mount)),
+              int(disk_size * fraction) if mount == "/" else rng.randrange(disk_size))
+             for i, mount in enumerate(MOUNTS)]
+        ))
+
+    fixed = sum(len(f) - 2 for f in families)
+    remaining = max(series - fixed, 0)
+    # One "unit" = one CPU (8 modes) + one network interface + one disk
+    per_unit = len(CPU_MODES) + len(NETWORK_FAMILIES) + len(DISK_FAMILIES)
+    units = -(-remaining // per_unit)
+
+    families.append(_family(
+        "node_cpu_seconds_total", "counter", "Seconds the CPUs spent in each mode.",
+        [((("cpu", str(cpu)), ("mode", mode)), round(rng.uniform(0, 1e6), 2)) for cpu in range(units) for mode in CPU_MODES]
+    ))
+    for field in NETWORK_FAMILIES:
+        families.append(_family(
+            f"node_network_{field}_total", "counter", f"Network device statistic {field}.",
+            [((("device", f"eth{i}"),), rng.randrange(10 ** 12)) for i in range(units)]
+        ))
+    for field in DISK_FAMILIES:
+        families.append(_family(
+            f"node_disk_{field}_total", "counter", f"Disk statistic {field}.",
+            [((("device", f"nvme{i}n1"),), rng.randrange(10 ** 12)) for i in range(units)]
+        ))
+
+    # Trim the last families so the exposition has exactly `series` samples
+    lines = []
+    budget = max(series, fixed)
+    for family in families:
+        samples = family[2:][:budget]
+        if not samples:
+            break
+        lines.extend(family[:2])
+        lines.extend(samples)
+        budget -= len(samples)
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.stdout.write(node_exporter_payload(args.series, args.seed))
+
+
+if __name__ == "__main__":
+    main()
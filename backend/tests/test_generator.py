@@ -0,0 +1,77 @@
+import yaml
+
+from app.services.analyzer import repo_analyzer
+from app.services.cd_generator import CDWorkflowGenerator
+from app.services.generator import workflow_generator
+
+
+def _stack(files, **extra) -> dict:
+    return {**repo_analyzer._detect_stack(files), **extra}
+
+
+def _service(path, files) -> dict:
+    return _stack(files, path=path)
+
+
+def _ci(stack: dict) -> dict:
+    steps = workflow_generator.suggest_steps(stack)
+    return yaml.safe_load(workflow_generator.generate_yaml(steps, stack))
+
+
+def _cd(stack: dict) -> dict:
+    return yaml.safe_load(CDWorkflowGenerator().generate_aks_cd("acr", "aks", "rg", stack=stack))
+
+
+def _build_contexts(job: dict) -> list:
+    return [step["with"]["context"] for step in job["steps"] if "docker/build-push-action" in step.get("uses", "")]
+
+
+def test_root_app_with_frontend_dir_keeps_root_jobs():
+    # A Python app with its own Dockerfile, plus a frontend/ that has no Dockerfile
+    stack = _stack(["requirements.txt", "Dockerfile"], services=[_service("frontend", ["package.json"])])
+
+    ci = _ci(stack)
+    assert set(ci["jobs"]) == {"changes", "frontend", "build"}
+    root = ci["jobs"]["build"]
+    assert "needs" not in root  # not gated on a service directory
+    assert any(step.get("run") == "pytest" for step in root["steps"])
+    assert _build_contexts(root) == ["."]
+    assert _build_contexts(ci["jobs"]["frontend"]) == []
+
+    cd = _cd(stack)
+    # Only the root has a Dockerfile, so only the root is built and deployed
+    assert set(cd["jobs"]) == {"deploy"}
+    assert _build_contexts(cd["jobs"]["deploy"]) == ["."]
+
+
+def test_root_app_and_service_with_dockerfiles_both_deploy():
+    stack = _stack(["requirements.txt", "Dockerfile"], services=[_service("frontend", ["package.json", "Dockerfile"])])
+
+    cd = _cd(stack)
+    assert set(cd["jobs"]) == {"changes", "frontend", "deploy"}
+    assert _build_contexts(cd["jobs"]["frontend"]) == ["frontend"]
+    assert _build_contexts(cd["jobs"]["deploy"]) == ["."]
+
+
+def test_workspace_root_only_gets_service_jobs():
+    stack = _stack(
+        ["package.json", "pnpm-workspace.yaml", "pnpm-lock.yaml"], workspace_root=True,
+        services=[
+            _service("packages/api", ["package.json", "Dockerfile"]),
+            _service("packages/ui", ["package.json"]),
+        ]
+    )
+
+    ci = _ci(stack)
+    assert set(ci["jobs"]) == {"changes", "packages_api", "packages_ui"}
+    assert _build_contexts(ci["jobs"]["packages_api"]) == ["packages/api"]
+
+    cd = _cd(stack)
+    # No fallback to services without a Dockerfile, and the workspace root isn't an app
+    assert set(cd["jobs"]) == {"changes", "packages-api"}
+
+
+def test_service_job_ids_are_valid():
+    stack = _stack([], services=[_service("2024-api", ["requirements.txt"]), _service("web", ["package.json"])])
+
+    assert set(_ci(stack)["jobs"]) == {"changes", "svc_2024_api", "web"}
@@ -0,0 +1,38 @@
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.sample_store import sample_store
+
+INSTANCE = "test-nan:9100"
+
+
+def _remote_write(value) -> bytes:
+    return json.dumps({"timeseries": [{
+        "labels": [{"name": "__name__", "value": "node_load1"}, {"name": "instance", "value": INSTANCE}],
+        "samples": [{"value": value, "timestamp": 1700000000000}]
+    }]}).encode()
+
+
+def test_pushed_nan_is_served_as_null():
+    client = TestClient(app)
+
+    response = client.post("/ingest/remote-write", content=_remote_write("NaN"),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 202
+    batch_id = response.json()["batch_id"]
+    # Decoding happens in the background
+    for _ in range(100):
+        if client.get(f"/ingest/batches/{batch_id}").json()["status"] != "queued":
+            break
+        time.sleep(0.02)
+    assert client.get(f"/ingest/batches/{batch_id}").json()["status"] == "done"
+
+    response = client.get("/ingest/series", params={"instance": INSTANCE})
+
+    assert response.status_code == 200
+    series = response.json()
+    assert [(s["name"], s["value"]) for s in series] == [("node_load1", None)]
+    sample_store.clear()
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from app.config import settings
+from app.services.log_store import LogStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_CHUNK_MAX_LINES", 10)
+    return LogStore()
+
+
+def _lines(start: int, count: int, message: str = "request served") -> list:
+    return [json.dumps({"ts": ts, "level": "info", "msg": f"{message} {ts}"}) for ts in range(start, start + count)]
+
+
+def test_search_is_newest_first_across_sources(store):
+    # "late" ships old lines after "early" sealed newer chunks: chunk ids don't follow time
+    store.add(_lines(1000, 30), source="early")
+    store.add(_lines(100, 30), source="late")
+    store.add(_lines(2000, 5), source="open")  # still in an open buffer
+
+    found = store.search("request", limit=12)
+
+    assert [r["ts"] for r in found["results"]] == list(range(2004, 1999, -1)) + list(range(1029, 1022, -1))
+    assert found["truncated"]
+    # The old chunks from "late" never had to be read
+    assert found["chunks_scanned"] == 1
+
+
+def test_one_character_terms_filter_lines(store):
+    store.add([
+        json.dumps({"ts": 1, "msg": "plan a"}),
+        json.dumps({"ts": 2, "msg": "plan b"}),
+        json.dumps({"ts": 3, "msg": "plan b", "retries": 5}),
+    ])
+
+    assert [r["ts"] for r in store.search("a")["results"]] == [1]
+    assert [r["ts"] for r in store.search("plan b")["results"]] == [3, 2]
+    assert [r["ts"] for r in store.search("b 5")["results"]] == [3]
@@ -0,0 +1,76 @@
+import hashlib
+import hmac
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.repo_cache import repo_cache, CONTENTS, ANALYSIS, MISS
+from benchmarks.replay_webhook import PAYLOADS, _signed
+
+SECRET = "test-webhook-secret"
+TOKEN = "test-token"
+OWNER, REPO = "bench-org", "service-1"  # the repo in the recorded payloads
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "GITHUB_WEBHOOK_SECRET", SECRET)
+    return TestClient(app)
+
+
+@pytest.fixture
+def cached():
+    """Warms the repo cache with reads of service-1, keyed by a short name."""
+    entries = {
+        "package.json": (CONTENTS, "package.json", None),
+        "root listing": (CONTENTS, "", None),
+        "workflows listing": (CONTENTS, ".github/workflows", None),
+        "analysis": (ANALYSIS, "", None),
+        "README.md": (CONTENTS, "README.md", None),
+        "pinned package.json": (CONTENTS, "package.json", "6113728f27ae82c7b1a177c8d03f9e96e0adf246"),
+    }
+    repo_cache.invalidate(OWNER, REPO)
+    for name, (namespace, path, ref) in entries.items():
+        repo_cache.set(namespace, TOKEN, OWNER, REPO, {"cached": name}, path, ref)
+    yield entries
+    repo_cache.invalidate(OWNER, REPO)
+
+
+def _is_cached(entry) -> bool:
+    namespace, path, ref = entry
+    return repo_cache.get(namespace, TOKEN, OWNER, REPO, path, ref) is not MISS
+
+
+def test_signed_push_invalidates_touched_paths(client, cached):
+    body, headers = _signed(PAYLOADS / "push.default_branch.json", SECRET)
+
+    response = client.post("/webhooks/github", content=body, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+    # Changed files, their parent listings and the analysis are gone
+    for name in ("package.json", "root listing", "workflows listing", "analysis"):
+        assert not _is_cached(cached[name]), name
+    # Untouched files and reads pinned to a commit stay
+    assert _is_cached(cached["README.md"])
+    assert _is_cached(cached["pinned package.json"])
+
+
+def test_bad_signature_is_rejected(client, cached):
+    body, headers = _signed(PAYLOADS / "push.default_branch.json", SECRET)
+    headers["X-Hub-Signature-256"] = "sha256=" + hmac.new(b"wrong-secret", body, hashlib.sha256).hexdigest()
+
+    response = client.post("/webhooks/github", content=body, headers=headers)
+
+    assert response.status_code == 401
+    assert all(_is_cached(entry) for entry in cached.values())
+
+
+def test_missing_signature_is_rejected(client, cached):
+    body, headers = _signed(PAYLOADS / "push.default_branch.json", SECRET)
+    del headers["X-Hub-Signature-256"]
+
+    assert client.post("/webhooks/github", content=body, headers=headers).status_code == 401
+    assert all(_is_cached(entry) for entry in cached.values())
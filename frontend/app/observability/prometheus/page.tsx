@@ -8,6 +8,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/com
 import { Badge } from "@/components/ui/badge";
 import { Switch } from "@/components/ui/switch";
 import { Label } from "@/components/ui/label";
+import { API_BASE_URL } from "@/lib/api";
 
 // Mock Data for Demo Mode
 const MOCK_DATA = {
@@ -39,6 +40,23 @@ export default function ObservabilityPage() {
         setLoading(false);
     }, []);
 
+    // Live updates: subscribe to the backend's event stream instead of re-running the workflow
+    const liveSource = !isDemo && data && data.source !== "Demo Source" ? data.source : null;
+    useEffect(() => {
+        if (!liveSource) return;
+        const streamUrl = new URL(`${API_BASE_URL}/stream/events`);
+        streamUrl.searchParams.append("url", liveSource);
+        const events = new EventSource(streamUrl.toString());
+
+        const update = (key: "health" | "metrics") => (event: MessageEvent) => {
+            const message = JSON.parse(event.data);
+            setData((prev: any) => prev && ({ ...prev, [key]: message.data, timestamp: new Date(message.ts * 1000).toISOString() }));
+        };
+        events.addEventListener("health", update("health"));
+        events.addEventListener("metrics", update("metrics"));
+        return () => events.close();
+    }, [liveSource]);
+
     // Toggle Handler
     const handleDemoToggle = (checked: boolean) => {
         setIsDemo(checked);
@@ -34,7 +34,9 @@ import {
     CheckCircle2,
     Box,
     Download,
-    Share2
+    Share2,
+    ListChecks,
+    GitFork
 } from "lucide-react";
 import Link from "next/link";
 
@@ -58,6 +60,7 @@ function SortableItem({ id }: SortableItemProps) {
 
     const getIcon = (stepId: string) => {
         if (stepId.includes("checkout")) return <Download className="size-5 text-blue-500" />;
+        if (stepId.includes("lint")) return <ListChecks className="size-5 text-orange-500" />;
         if (stepId.includes("install")) return <Box className="size-5 text-yellow-500" />;
         if (stepId.includes("test")) return <CheckCircle2 className="size-5 text-green-500" />;
         if (stepId.includes("docker")) return <Container className="size-5 text-cyan-500" />;
@@ -69,6 +72,7 @@ function SortableItem({ id }: SortableItemProps) {
         const map: Record<string, string> = {
             "checkout": "Checkout Code",
             "install_deps": "Install Dependencies",
+            "lint": "Lint",
             "run_tests": "Run Tests",
             "docker_build": "Build Docker Image",
             "push_image": "Push to Registry"
@@ -97,27 +101,39 @@ function SortableItem({ id }: SortableItemProps) {
 }
 
 import { DeploymentModal } from "@/components/deployment-modal";
-import { generateCDPipeline, commitPipeline } from "@/lib/api";
+import { generateCDPipeline, commitPipeline, commitPipelines, previewCD, previewCI } from "@/lib/api";
 import { Cloud, Check } from "lucide-react";
 import { YamlPreviewModal } from "@/components/yaml-preview-modal";
 
+// How the CI workflow runs: one serial job, parallel lint/test/build jobs, or parallel jobs with sharded tests
+const PARALLELISM_OPTIONS: { label: string; parallel_jobs: boolean; test_shards: number }[] = [
+    { label: "Single job", parallel_jobs: false, test_shards: 1 },
+    { label: "Parallel jobs", parallel_jobs: true, test_shards: 1 },
+    { label: "2 test shards", parallel_jobs: true, test_shards: 2 },
+    { label: "4 test shards", parallel_jobs: true, test_shards: 4 },
+    { label: "8 test shards", parallel_jobs: true, test_shards: 8 },
+];
+
 export default function PipelinePage() {
     const router = useRouter();
     const [loading, setLoading] = useState(true);
     const [generating, setGenerating] = useState(false);
     const [stack, setStack] = useState<StackInfo | null>(null);
     const [steps, setSteps] = useState<string[]>([]);
+    const [parallelism, setParallelism] = useState(0); // index into PARALLELISM_OPTIONS
 
     // Deployment states
     const [isConfigured, setIsConfigured] = useState(false);
     const [cdGenerating, setCdGenerating] = useState(false);
 
-    // Preview states
-    const [previewModal, setPreviewModal] = useState<{ open: boolean, type: string, yaml: string }>({
+    // Preview states. With `bundle`, CI and CD are reviewed one after the other and committed together:
+    // bundle.cd is the CD preview waiting its turn, bundle.ci the CI YAML already approved
+    const [previewModal, setPreviewModal] = useState<{ open: boolean, type: string, yaml: string, bundle?: { ci?: string, cd: string } }>({
         open: false,
         type: "ci",
         yaml: ""
     });
+    const [bundleGenerating, setBundleGenerating] = useState(false);
     const [isCommitting, setIsCommitting] = useState(false);
 
     const sensors = useSensors(
@@ -162,7 +178,8 @@ export default function PipelinePage() {
     const handleGenerate = async () => {
         setGenerating(true);
         try {
-            const { data } = await api.post("/pipeline/ci/preview", { steps });
+            const { parallel_jobs, test_shards } = PARALLELISM_OPTIONS[parallelism];
+            const { data } = await previewCI(steps, { parallel_jobs, test_shards });
             setPreviewModal({
                 open: true,
                 type: "ci",
@@ -193,7 +210,62 @@ export default function PipelinePage() {
         }
     };
 
+    const handleGenerateBoth = async () => {
+        setBundleGenerating(true);
+        try {
+            const { parallel_jobs, test_shards } = PARALLELISM_OPTIONS[parallelism];
+            const [ci, cd] = await Promise.all([previewCI(steps, { parallel_jobs, test_shards }), previewCD()]);
+            setPreviewModal({
+                open: true,
+                type: "ci",
+                yaml: ci.data.yaml,
+                bundle: { cd: cd.data.yaml }
+            });
+        } catch (err) {
+            console.error(err);
+            alert("Failed to generate previews.");
+        } finally {
+            setBundleGenerating(false);
+        }
+    };
+
+    // Last step of the CI + CD flow: both workflows (and a Dockerfile if the repo has none) in one commit
+    const commitBundle = async (ciYaml: string, cdYaml: string) => {
+        setIsCommitting(true);
+        try {
+            const { data } = await commitPipelines(
+                [{ type: "ci", yaml: ciYaml }, { type: "cd", yaml: cdYaml }],
+                !stack?.has_dockerfile
+            );
+
+            const query = new URLSearchParams({
+                path: data.file_paths.join(", ") || ".github/workflows/ci.yml, .github/workflows/cd.yml",
+                commit: data.commit,
+                yaml: `${ciYaml}\n---\n${cdYaml}`
+            }).toString();
+
+            router.push(`/commit?${query}`);
+
+            setPreviewModal({ ...previewModal, open: false });
+        } catch (err) {
+            console.error(err);
+            alert("Failed to commit.");
+        } finally {
+            setIsCommitting(false);
+        }
+    };
+
     const handleCommit = async (finalYaml: string) => {
+        const bundle = previewModal.bundle;
+        if (bundle && previewModal.type === "ci") {
+            // CI approved, review CD next
+            setPreviewModal({ open: true, type: "cd", yaml: bundle.cd, bundle: { ...bundle, ci: finalYaml } });
+            return;
+        }
+        if (bundle?.ci !== undefined) {
+            return commitBundle(bundle.ci, finalYaml);
+        }
+
         setIsCommitting(true);
         try {
             // Use type assertion properly if needed, mostly "ci" | "cd" matches string
@@ -262,6 +334,22 @@ export default function PipelinePage() {
                                             "Generate CD Pipeline"
                                         )}
                                     </Button>
+                                    <Button
+                                        size="sm"
+                                        variant="outline"
+                                        className="w-full"
+                                        onClick={handleGenerateBoth}
+                                        disabled={bundleGenerating || steps.length === 0}
+                                    >
+                                        {bundleGenerating ? (
+                                            <>
+                                                <Loader2 className="mr-2 size-4 animate-spin" />
+                                                Generating CI + CD...
+                                            </>
+                                        ) : (
+                                            "Commit CI + CD Together"
+                                        )}
+                                    </Button>
                                 </div>
                             ) : (
                                 <div className="space-y-2">
@@ -304,6 +392,17 @@ export default function PipelinePage() {
                                     {stack?.has_dockerfile ? "Detected" : "None"}
                                 </Badge>
                             </div>
+                            {stack?.services && stack.services.length > 0 && (
+                                <div className="space-y-2 pt-2 border-t">
+                                    <span className="text-sm text-muted-foreground">Services (built only when changed)</span>
+                                    {stack.services.map(service => (
+                                        <div key={service.path} className="flex items-center justify-between text-xs">
+                                            <span className="font-mono">{service.path}</span>
+                                            <Badge variant="outline" className="uppercase">{service.language}</Badge>
+                                        </div>
+                                    ))}
+                                </div>
+                            )}
                         </CardContent>
 
                     </Card>
@@ -366,6 +465,29 @@ export default function PipelinePage() {
                     </CardContent>
                 </Card>
 
+                <Card>
+                    <CardHeader className="py-4">
+                        <CardTitle className="text-base flex items-center gap-2">
+                            <GitFork className="size-4" /> Parallelism
+                        </CardTitle>
+                        <CardDescription>
+                            Run lint, tests and the image build as parallel jobs, and optionally split tests across shards.
+                        </CardDescription>
+                    </CardHeader>
+                    <CardContent className="flex flex-wrap gap-2">
+                        {PARALLELISM_OPTIONS.map((option, index) => (
+                            <Button
+                                key={option.label}
+                                size="sm"
+                                variant={parallelism === index ? "default" : "outline"}
+                                onClick={() => setParallelism(index)}
+                            >
+                                {option.label}
+                            </Button>
+                        ))}
+                    </CardContent>
+                </Card>
+
                 <div className="flex justify-end gap-4">
                     <Button variant="outline" disabled={generating}>
                         Reset
@@ -386,10 +508,13 @@ export default function PipelinePage() {
             <YamlPreviewModal
                 open={previewModal.open}
                 onOpenChange={(open) => setPreviewModal({ ...previewModal, open })}
-                title={`Preview ${previewModal.type.toUpperCase()} Pipeline`}
+                title={previewModal.bundle
+                    ? `Preview ${previewModal.type.toUpperCase()} Pipeline (${previewModal.type === "ci" ? 1 : 2} of 2)`
+                    : `Preview ${previewModal.type.toUpperCase()} Pipeline`}
                 initialYaml={previewModal.yaml}
                 onCommit={handleCommit}
                 isCommitting={isCommitting}
+                confirmLabel={previewModal.bundle && previewModal.type === "ci" ? "Next: Review CD" : "Confirm & Commit"}
             />
         </div>
     );
@@ -20,6 +20,7 @@ interface YamlPreviewModalProps {
     initialYaml: string;
     onCommit: (finalYaml: string) => Promise<void>;
     isCommitting: boolean;
+    confirmLabel?: string;
 }
 
 export function YamlPreviewModal({
@@ -29,6 +30,7 @@ export function YamlPreviewModal({
     initialYaml,
     onCommit,
     isCommitting,
+    confirmLabel = "Confirm & Commit",
 }: YamlPreviewModalProps) {
     const [yaml, setYaml] = useState(initialYaml);
 
@@ -74,7 +76,7 @@ export function YamlPreviewModal({
                                 Committing...
                             </>
                         ) : (
-                            "Confirm & Commit"
+                            confirmLabel
                         )}
                     </Button>
                 </DialogFooter>
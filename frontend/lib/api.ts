@@ -43,6 +43,8 @@ export interface StackInfo {
     has_dockerfile: boolean;
     dependency_file: string | null;
     detected_files: string[];
+    // Monorepos: one entry per service directory, each CI/CD job only runs when its path changed
+    services?: (Omit<StackInfo, "services"> & { path: string })[];
 }
 
 export interface PipelineSuggestion {
@@ -67,8 +69,13 @@ export const generateCDPipeline = async () => {
     return api.post("/pipeline/generate-cd");
 };
 
-export const previewCI = async (steps: string[]) => {
-    return api.post("/pipeline/ci/preview", { steps });
+export interface CIParallelism {
+    parallel_jobs: boolean;
+    test_shards: number;
+}
+
+export const previewCI = async (steps: string[], parallelism?: CIParallelism) => {
+    return api.post("/pipeline/ci/preview", { steps, ...parallelism });
 };
 
 export const previewCD = async () => {
@@ -78,3 +85,11 @@ export const previewCD = async () => {
 export const commitPipeline = async (type: "ci" | "cd", yaml: string) => {
     return api.post("/pipeline/commit", { type, yaml });
 };
+
+// Commits several pipelines (and optionally a generated Dockerfile) in one commit
+export const commitPipelines = async (
+    pipelines: { type: "ci" | "cd"; yaml: string }[],
+    includeDockerfile = false
+) => {
+    return api.post("/pipeline/commit-all", { pipelines, include_dockerfile: includeDockerfile });
+};